@@ -1,31 +1,64 @@
 import os
 import uuid
 import json
+import time
+import hashlib
+import secrets
 import datetime
+import socket
+import cProfile
+import threading
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, session, flash, jsonify, Response
+    url_for, session, flash, jsonify, Response, g, abort, make_response, has_request_context
 )
+from markupsafe import Markup
 from config import Config
 
 # Import utility modules
 from utils.resume_parser import extract_text_from_pdf, extract_skills
-from utils.question_generator import generate_questions
-from utils.evaluator import evaluate_answers
+from utils.question_generator import generate_questions, generate_question_sets, request_refill
+from utils.evaluator import evaluate_answers, evaluate_answers_stream, configure_batching
+from utils.reference_scoring import get_scorer
+from utils.questions_bank import question_id, configure_sampler, configure_bank
+from utils.question_difficulty import QuestionStats, DifficultySampler, target_for_score
+from utils.interview_timer import DeadlineScheduler
+# Optional mail (won't crash if not configured); Flask-Mail is imported on first send
+from utils.integrations import get_mail
+from utils import metrics, generated_bank, similarity
+from utils.skill_index import SkillIndex, last_score
+from utils.answer_similarity import AnswerSimilarityIndex
+from utils.text_index import TextIndex, documents_from_store, resume_document, answer_documents
+from utils.notifier import BulkNotifier, job_counts
+from utils.password_hashing import PasswordHasher, HashPoolBusy
+from utils.result_stream import EvaluationStreams, sse
+from utils.result_pages import ResultPages, evaluation_of
+from utils.leaderboard import CohortBoards
+from utils.static_assets import StaticAssets
+from utils.rate_limit import Limiter, RateLimited, make_backend
+from utils.backends import LockTimeout, make_store, make_locks, make_queue, make_cache
 
 app = Flask(__name__)
 app.config.from_object(Config)
-
-# Optional mail (won't crash if not configured)
-try:
-    from flask_mail import Mail, Message
-    mail = Mail(app)
-    MAIL_AVAILABLE = True
-except Exception:
-    MAIL_AVAILABLE = False
+if app.config['STATIC_FINGERPRINTING']:
+    StaticAssets(app)   # fingerprinted, precompressed static URLs; see utils/static_assets.py
+metrics.configure(app.config['METRICS_ENABLED'])
+configure_bank(app.config['QUESTION_BANK_FILE'], app.config['QUESTION_BANK_RELOAD_SECONDS'])
+generated_bank.configure(app.config['GENERATED_QUESTIONS_FILE'],
+                         app.config['GENERATED_QUESTIONS_MIN_STOCK'],
+                         app.config['GENERATED_QUESTIONS_BATCH'])
+similarity.configure(app.config['QUESTION_SIMILARITY_THRESHOLD'], app.config['QUESTION_SIMILARITY_CACHE'])
+get_scorer()    # precompute reference key-point vectors for offline scoring
+configure_batching(app.config['EVAL_BATCHING_ENABLED'], app.config['EVAL_BATCH_WINDOW'],
+                   app.config['EVAL_BATCH_MAX'], app.config['EVAL_BATCH_TOKEN_BUDGET'])
+limiter = Limiter(make_backend(app.config['RATE_LIMIT_BACKEND'], app.config['RATE_LIMIT_DB'],
+                               app.config['RATE_LIMIT_LEASE']),
+                  app.config['RATE_LIMITS'], app.config['RATE_LIMIT_ENABLED'])
+passwords = PasswordHasher(app.config['PASSWORD_HASH_METHOD'],
+                           workers=app.config['PASSWORD_HASH_WORKERS'] or max(1, (os.cpu_count() or 2) // 2),
+                           max_pending=app.config['PASSWORD_HASH_MAX_PENDING'])
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -33,20 +66,373 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # -------------------------------------------------------------------
 # JSON Data Manager
 # -------------------------------------------------------------------
-DATA_FILE = 'data.json'
-
-def load_data():
-    if not os.path.exists(DATA_FILE):
+store = make_store(app.config)
+locks = make_locks(app.config)
+_store_lock = threading.local()
+
+def _store_size(*_):
+    return store.size()
+
+@metrics.instrument('load_data', size=_store_size)
+def load_data(for_update=False):
+    """
+    The whole store. for_update=True also takes the store lock, which is held
+    until save_data() or the end of the request (release_store() outside
+    one), so the read-modify-write can't interleave with another worker's or
+    node's. Do slow work (LLM calls, parsing, hashing) before taking it.
+    """
+    if for_update and getattr(_store_lock, 'token', None) is None:
+        _store_lock.token = locks.acquire('store', app.config['STORE_LOCK_TIMEOUT'], app.config['STORE_LOCK_LEASE'])
+    _, text = store.read()
+    return parse_store(text)
+
+def parse_store(text):
+    """The store document as a dict; empty if there is none yet or it is unreadable."""
+    if not text:
         return {'users': {}, 'candidates': {}}
     try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, ValueError):
+        return json.loads(text)
+    except ValueError:
         return {'users': {}, 'candidates': {}}
 
+def release_store():
+    token = getattr(_store_lock, 'token', None)
+    if token is not None:
+        _store_lock.token = None
+        locks.release('store', token)
+
+def _store_version():
+    """Version of the store (changes on every write), or None if it is empty."""
+    return store.version()
+
+@metrics.instrument('save_data', size=_store_size)
 def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    try:
+        # Labels the change in the 'wal' store's log: the route, or the background thread
+        label = request.endpoint if has_request_context() else threading.current_thread().name
+        before, after = store.write_data(data, label)
+    finally:
+        release_store()
+    note_store_write(before, after)
+
+def note_store_write(before, after):
+    """
+    Routes keep the in-process indexes up to date for their own writes, so
+    an index that was current before this write is still current after it.
+    Writes from other processes change the version and trigger a rebuild.
+    """
+    for index in STORE_INDEXES:
+        if index.synced_version == before:
+            index.synced_version = after
+
+@app.teardown_request
+def _release_store_lock(exc):
+    release_store()
+
+# -------------------------------------------------------------------
+# Search Indexes (in-process, rebuilt when another process writes the store)
+# -------------------------------------------------------------------
+skill_index = SkillIndex()
+answer_index = AnswerSimilarityIndex(app.config['ANSWER_SIMILARITY_THRESHOLD'],
+                                     app.config['ANSWER_SIGNATURES_FILE'])
+question_stats = QuestionStats()
+result_pages = ResultPages(make_cache(app.config, app.config['RESULT_PAGE_CACHE_SIZE']))
+cohort_boards = CohortBoards()
+STORE_INDEXES = [skill_index, answer_index, question_stats, result_pages, cohort_boards]
+if app.config['ADAPTIVE_DIFFICULTY_ENABLED']:
+    configure_sampler(DifficultySampler(question_stats))
+
+def _fresh(index):
+    version = _store_version()
+    if version is None or index.synced_version != version:
+        index.build(load_data(), version)
+    return index
+
+_text_index = None
+_text_index_lock = threading.Lock()
+
+def text_index():
+    """The on-disk BM25 index, built from the store the first time it is opened."""
+    global _text_index
+    if _text_index is not None:
+        return _text_index
+    with _text_index_lock:
+        if _text_index is None:
+            index = TextIndex(app.config['SEARCH_INDEX_DIR'])
+            if not os.path.exists(os.path.join(index.directory, 'manifest.json')):
+                index.add(documents_from_store(load_data()))
+            _text_index = index
+    return _text_index
+
+_notifier = None
+
+def notifier():
+    """Bulk result mailer; its worker threads and SMTP connections start with the first job."""
+    global _notifier
+    if _notifier is None:
+        _notifier = BulkNotifier(app, app.config['NOTIFY_STATUS_FILE'], workers=app.config['NOTIFY_WORKERS'],
+                                 rate=app.config['NOTIFY_RATE'])
+    return _notifier
+
+# -------------------------------------------------------------------
+# Metrics & Profiling
+# -------------------------------------------------------------------
+@app.before_request
+def _start_request_instrumentation():
+    if metrics.ENABLED:
+        g._request_started = time.perf_counter()
+    # Opt-in cProfile dump of a single request: ?_profile=1 as an admin
+    if (app.config['PROFILING_ENABLED'] and request.args.get('_profile') == '1'
+            and session.get('user_role') == 'admin'):
+        g._profiler = cProfile.Profile()
+        g._profiler.enable()
+
+@app.after_request
+def _finish_request_instrumentation(response):
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = os.path.join(app.config['PROFILE_DIR'], f"{stamp}-{request.endpoint or 'unknown'}.prof")
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+    started = g.pop('_request_started', None)
+    if started is not None:
+        metrics.observe(request.endpoint or 'unknown', time.perf_counter() - started, metric='request')
+    return response
+
+@app.teardown_request
+def _stop_request_profiler(exc):
+    # after_request is skipped when a view raises: don't leave the profiler running on this thread
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        abort(404)
+    token = app.config['METRICS_TOKEN']
+    authorised = session.get('user_role') == 'admin' or (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorised:
+        abort(403)
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# -------------------------------------------------------------------
+# Interview Deadlines
+# -------------------------------------------------------------------
+deadlines = DeadlineScheduler(lambda data: _store_deadlines(data))
+_sweeper_started = False
+_sweeper_lock = threading.Lock()
+_HOST = socket.gethostname()
+
+def _interview_deadline(iv):
+    """Epoch deadline of an interview (derived from its date for legacy records)."""
+    if iv.get('deadline'):
+        return datetime.datetime.fromisoformat(iv['deadline']).timestamp()
+    started = datetime.datetime.fromisoformat(iv['date']).timestamp()
+    return started + app.config['INTERVIEW_SECONDS_PER_QUESTION'] * len(iv['questions'])
+
+def _record_duration(iv):
+    deadline = _interview_deadline(iv)
+    started = datetime.datetime.fromisoformat(iv.get('started_at') or iv['date']).timestamp()
+    iv['duration_seconds'] = int(max(0, min(time.time(), deadline) - started))
+
+def _apply_evaluation(candidate_id, iv, scores, feedback):
+    iv['scores'] = scores
+    iv['feedback'] = feedback
+
+    # FIX: Correct threshold — scores are 0-100
+    iv['result'] = 'selected' if scores['overall'] >= 60 else 'rejected'
+    iv['evaluation'] = evaluation_of(iv) + 1     # versions the cached result page
+    deadlines.cancel(iv['id'])
+    result_pages.set_evaluated(candidate_id, iv)
+    skill_index.set_score(candidate_id, scores['overall'])
+    if iv.get('cohort'):
+        cohort_boards.set_score(iv['cohort'], candidate_id, scores['overall'])
+    answer_index.add_interview(candidate_id, iv)
+    question_stats.add_interview(iv)
+
+def _lease_evaluation(iv):
+    """Record which process queued the interview's evaluation, and when; see _lease_expiry."""
+    iv['evaluation_lease'] = {'owner': f'{_HOST}:{os.getpid()}', 'since': time.time()}
+
+def _process_stopped(owner):
+    """True if owner (host:pid) is a process on this host that no longer runs."""
+    host, _, pid = owner.rpartition(':')
+    if host != _HOST or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+def _lease_expiry(iv):
+    """
+    When an 'evaluating' interview's job may be presumed lost and queued again:
+    EVAL_LEASE_SECONDS after it was queued, or right away if it was queued in
+    the in-process queue of a process on this host that has stopped.
+    """
+    lease = iv.get('evaluation_lease') or {'owner': '', 'since': 0}    # queued before leases were recorded
+    if jobs.local and _process_stopped(lease['owner']):
+        return lease['since']
+    return lease['since'] + app.config['EVAL_LEASE_SECONDS']
+
+def _store_deadlines(data):
+    """(interview_id, candidate_id, when) for every pending interview and every evaluation's lease."""
+    for cid, cand in data['candidates'].items():
+        for iv in cand.get('interviews', []):
+            if iv.get('result') == 'pending' and iv.get('questions'):
+                yield iv['id'], cid, _interview_deadline(iv) + app.config['INTERVIEW_GRACE_SECONDS']
+            elif iv.get('result') == 'evaluating':
+                yield iv['id'], cid, _lease_expiry(iv)
+
+def _find_interview(data, candidate_id, interview_id):
+    candidate = data['candidates'].get(candidate_id)
+    if not candidate:
+        return None
+    return next((x for x in candidate.get('interviews', []) if x['id'] == interview_id), None)
+
+def _auto_submit(candidate_id, interview_id):
+    """Sweeper callback: submit an interview whose deadline has passed; the evaluation workers score it."""
+    try:
+        data = load_data(for_update=True)
+        iv = _find_interview(data, candidate_id, interview_id)
+        if not iv or iv.get('result') not in ('pending', 'evaluating'):
+            return  # deleted or already evaluated
+        if iv['result'] == 'pending':
+            _record_duration(iv)
+            iv['result'] = 'evaluating'
+            iv['auto_submitted'] = True
+        elif _lease_expiry(iv) > time.time():
+            # Still within its lease (e.g. queued again by another process): look again when it runs out
+            deadlines.schedule(interview_id, candidate_id, _lease_expiry(iv))
+            return
+        # else its lease ran out: the job is presumed lost with the process running it
+        _lease_evaluation(iv)
+        if jobs.local:
+            evaluation_streams.open(interview_id)
+        save_data(data)
+        deadlines.schedule(interview_id, candidate_id, _lease_expiry(iv))
+        questions = iv['questions']
+    finally:
+        release_store()
+    jobs.put('evaluate', {'candidate_id': candidate_id, 'interview_id': interview_id, 'questions': questions})
+
+def _evaluate_in_one_go(candidate_id, interview_id):
+    """Fallback for a failed streamed evaluation: score the interview with one evaluate_answers call."""
+    iv = _find_interview(load_data(), candidate_id, interview_id)
+    if not iv or iv.get('result') != 'evaluating':
+        return
+    # Evaluated before taking the store lock; an evaluating interview no longer changes
+    scores, feedback = evaluate_answers(iv['questions'])
+    try:
+        data = load_data(for_update=True)
+        current = _find_interview(data, candidate_id, interview_id)
+        if current is not None and current.get('result') == 'evaluating':
+            _apply_evaluation(candidate_id, current, scores, feedback)
+            save_data(data)
+            text_index().add(answer_documents(candidate_id, current))
+    finally:
+        release_store()
+
+def _start_deadline_sweeper():
+    """Load the store's deadlines into the heap and start the sweeper, which reloads them as the store changes."""
+    _fresh(deadlines)
+    deadlines.start(_auto_submit, max_sleep=app.config['INTERVIEW_SWEEP_MAX_SLEEP'], logger=app.logger,
+                    refresh=lambda: _fresh(deadlines))
+
+@app.before_request
+def _ensure_deadline_sweeper():
+    # Started lazily so the debug reloader's parent process never runs one
+    global _sweeper_started
+    if _sweeper_started or not app.config['INTERVIEW_SWEEPER_ENABLED']:
+        return
+    with _sweeper_lock:
+        if not _sweeper_started:
+            _start_deadline_sweeper()
+            _sweeper_started = True
+
+# -------------------------------------------------------------------
+# Streamed Evaluation
+# -------------------------------------------------------------------
+evaluation_streams = EvaluationStreams()
+jobs = make_queue(app.config)
+_job_workers_started = False
+_job_workers_lock = threading.Lock()
+
+def _run_evaluation_jobs():
+    while True:
+        try:
+            job = jobs.get('evaluate', timeout=5)
+            if job is not None:
+                _evaluate_in_background(job['candidate_id'], job['interview_id'], job['questions'])
+        except Exception:
+            app.logger.exception('Evaluation job failed')
+            time.sleep(1)   # e.g. the state server is unreachable
+
+@app.before_request
+def _ensure_job_workers():
+    global _job_workers_started
+    if _job_workers_started:
+        return
+    with _job_workers_lock:
+        if not _job_workers_started:
+            for i in range(app.config['EVAL_STREAM_WORKERS']):
+                threading.Thread(target=_run_evaluation_jobs, name=f'evaluation-{i}', daemon=True).start()
+            _job_workers_started = True
+
+def _question_event(questions, index, pq):
+    return dict(pq, index=index, answered=bool((questions[index].get('answer') or '').strip()))
+
+def _done_event(iv):
+    return {
+        'result': iv['result'],
+        'technical': iv['scores']['technical'],
+        'communication': iv['scores']['communication'],
+        'overall': iv['scores']['overall'],
+        'feedback': iv['feedback']
+    }
+
+def _stored_events(iv):
+    for i, pq in enumerate(iv['scores'].get('per_question', [])):
+        yield 'question', _question_event(iv['questions'], i, pq)
+    yield 'done', _done_event(iv)
+
+def _evaluate_in_background(candidate_id, interview_id, questions):
+    """Evaluate a submitted interview, publishing each question's result for /results/<id>/stream."""
+    if not evaluation_streams.active(interview_id):
+        evaluation_streams.open(interview_id)   # queued by another node or process
+    try:
+        scores = feedback = None
+        for kind, *payload in evaluate_answers_stream(questions):
+            if kind == 'question':
+                evaluation_streams.publish(interview_id, 'question', _question_event(questions, *payload))
+            else:
+                scores, feedback = payload
+        data = load_data(for_update=True)
+        iv = _find_interview(data, candidate_id, interview_id)
+        if iv is not None and iv.get('result') == 'evaluating':
+            _apply_evaluation(candidate_id, iv, scores, feedback)
+            save_data(data)
+            evaluation_streams.publish(interview_id, 'done', _done_event(iv))
+            text_index().add(answer_documents(candidate_id, iv))
+    except Exception:
+        app.logger.exception('Streamed evaluation of %s failed; evaluating in one go', interview_id)
+        release_store()
+        try:
+            _evaluate_in_one_go(candidate_id, interview_id)
+        finally:
+            evaluation_streams.publish(interview_id, 'failed', {})   # the page reloads the stored result
+    finally:
+        release_store()
+        evaluation_streams.close(interview_id)
 
 # -------------------------------------------------------------------
 # Auth Helpers
@@ -68,6 +454,49 @@ def login_required(role=None):
         return decorated_function
     return decorator
 
+@app.errorhandler(HashPoolBusy)
+def _password_pool_busy(e):
+    # Login storm: shed load instead of queueing more CPU-bound hashes behind the pool
+    flash('We are handling a lot of sign-ins right now. Please try again in a few seconds.', 'warning')
+    template = 'register.html' if request.endpoint == 'register' else 'login.html'
+    response = make_response(render_template(template), 503)
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.errorhandler(LockTimeout)
+def _store_busy(e):
+    # Another worker or node held the store lock for the whole timeout
+    response = make_response(render_template('rate_limited.html', retry_after=1, busy=True), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.errorhandler(RateLimited)
+def _rate_limited(e):
+    # Refused before any parsing, LLM call or store write: answering is as cheap as a static page
+    response = make_response(render_template('rate_limited.html', retry_after=e.retry_after,
+                                             busy=e.reason == 'server busy'), 429)
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def _rehash_password(user_id, password):
+    """Re-hash a password stored under an older hash policy, off the login request."""
+    future = passwords.hash_async(password)
+    if future is None:
+        return      # pool is busy; try again at the next login
+
+    def store(f):
+        if f.exception() is not None:
+            return
+        try:
+            data = load_data(for_update=True)
+            user = data['users'].get(user_id)
+            if user and passwords.needs_rehash(user['password_hash']):
+                user['password_hash'] = f.result()
+                save_data(data)
+        finally:
+            release_store()
+    future.add_done_callback(store)
+
 # -------------------------------------------------------------------
 # Routes
 # -------------------------------------------------------------------
@@ -87,9 +516,15 @@ def register():
             flash('All fields are required.', 'danger')
             return redirect(url_for('register'))
 
-        data = load_data()
+        # Hash before loading the store so the slow part isn't inside the load/save window
+        password_hash = passwords.hash(password)
+        data = load_data(for_update=True)
         for uid, u in data['users'].items():
             if u['email'] == email:
+                if u['role'] == 'candidate' and role == 'candidate' and not u.get('password_hash'):
+                    # Created by a bulk resume import (utils/bulk_import.py). Anyone can type the
+                    # address, so only a link mailed to it can set the password
+                    return _send_claim_link(data, u)
                 flash('Email already registered.', 'danger')
                 return redirect(url_for('register'))
 
@@ -98,7 +533,7 @@ def register():
             'id': user_id,
             'name': name,
             'email': email,
-            'password_hash': generate_password_hash(password),
+            'password_hash': password_hash,
             'role': role,
             'created_at': datetime.datetime.now().isoformat()
         }
@@ -110,11 +545,74 @@ def register():
                 'interviews': [],
                 'asked_questions': []   # ← Track all asked questions to avoid repeats
             }
+            skill_index.upsert(user_id, data['users'][user_id], [])
         save_data(data)
         flash('Registration successful. Please log in.', 'success')
         return redirect(url_for('login'))
     return render_template('register.html')
 
+def _claim_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _send_claim_link(data, user):
+    """Mail the owner of an imported account a one-time link to set its password."""
+    mail_client = get_mail(app)
+    if mail_client is None:
+        flash('An account was created for this email from an imported resume, but email is not '
+              'configured to verify it. Please contact HR.', 'danger')
+        return redirect(url_for('register'))
+    token = secrets.token_urlsafe(32)
+    user['claim'] = {'token_hash': _claim_hash(token),
+                     'expires': time.time() + app.config['ACCOUNT_CLAIM_SECONDS']}
+    save_data(data)
+
+    body = render_template('email/claim.txt', name=user['name'], email=user['email'],
+                           link=url_for('claim_account', token=token, _external=True),
+                           hours=app.config['ACCOUNT_CLAIM_SECONDS'] // 3600)
+    try:
+        mail, Message = mail_client
+        msg = Message('SmartHire AI: Set your password', recipients=[user['email']], body=body)
+        mail.send(msg)
+        flash(f"An account was created for {user['email']} from your resume. "
+              "We've emailed you a link to set its password.", 'info')
+    except Exception as e:
+        flash(f'Failed to send email: {str(e)}', 'danger')
+    return redirect(url_for('login'))
+
+def _claimant(data, token):
+    """The imported, unclaimed user whose unexpired claim link carries this token."""
+    token_hash = _claim_hash(token)
+    for u in data['users'].values():
+        claim = u.get('claim')
+        if claim and claim['token_hash'] == token_hash and claim['expires'] > time.time() \
+                and not u.get('password_hash'):
+            return u
+    return None
+
+@app.route('/claim/<token>', methods=['GET', 'POST'])
+def claim_account(token):
+    user = _claimant(load_data(), token)
+    if user is None:
+        flash('This link is invalid or has expired. Register again to get a new one.', 'danger')
+        return redirect(url_for('register'))
+    if request.method == 'POST':
+        password = request.form['password']
+        if not password:
+            flash('Password is required.', 'danger')
+            return redirect(url_for('claim_account', token=token))
+        password_hash = passwords.hash(password)
+        data = load_data(for_update=True)
+        user = _claimant(data, token)
+        if user is None:
+            flash('This link is invalid or has expired. Register again to get a new one.', 'danger')
+            return redirect(url_for('register'))
+        user['password_hash'] = password_hash
+        del user['claim']
+        save_data(data)
+        flash('Your password is set. Your imported resume is on your profile. Please log in.', 'success')
+        return redirect(url_for('login'))
+    return render_template('claim.html', email=user['email'])
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -126,7 +624,9 @@ def login():
             if u['email'] == email:
                 user = u
                 break
-        if user and check_password_hash(user['password_hash'], password):
+        if user and passwords.verify(user['password_hash'], password):
+            if passwords.needs_rehash(user['password_hash']):
+                _rehash_password(user['id'], password)
             session['user_id'] = user['id']
             session['user_name'] = user['name']
             session['user_role'] = user['role']
@@ -141,6 +641,10 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
+def _evaluated(interviews):
+    """The interviews with scores; scheduled, in-progress and evaluating ones have none yet."""
+    return [iv for iv in interviews if iv.get('result') in ('selected', 'rejected')]
+
 @app.route('/dashboard')
 @login_required()
 def dashboard():
@@ -159,7 +663,7 @@ def dashboard():
         all_scores = [
             iv['scores']['overall']
             for c in candidates.values()
-            for iv in c.get('interviews', [])
+            for iv in _evaluated(c.get('interviews', []))
         ]
         avg_score = round(sum(all_scores) / len(all_scores), 1) if all_scores else 0
         stats = {'total_candidates': total_candidates, 'total_interviews': total_interviews, 'avg_score': avg_score}
@@ -168,13 +672,15 @@ def dashboard():
         candidate = data['candidates'].get(user_id, {'interviews': [], 'skills': []})
         interviews = candidate.get('interviews', [])
         total_interviews = len(interviews)
+        evaluated = _evaluated(interviews)
         avg_score = 0
-        if interviews:
-            avg_score = round(sum(iv['scores']['overall'] for iv in interviews) / total_interviews, 1)
+        if evaluated:
+            avg_score = round(sum(iv['scores']['overall'] for iv in evaluated) / len(evaluated), 1)
         stats = {'total_interviews': total_interviews, 'avg_score': avg_score}
         return render_template('dashboard.html', role=role, stats=stats, candidate=candidate)
 
 @app.route('/upload_resume', methods=['POST'])
+@limiter.limit('upload_resume')
 @login_required(role='candidate')
 def upload_resume():
     if 'resume' not in request.files:
@@ -193,7 +699,7 @@ def upload_resume():
         text = extract_text_from_pdf(filepath)
         skills = extract_skills(text)
 
-        data = load_data()
+        data = load_data(for_update=True)
         candidate = data['candidates'].get(session['user_id'])
         if candidate is None:
             # Create candidate record if missing
@@ -208,13 +714,18 @@ def upload_resume():
 
         candidate['resume_text'] = text
         candidate['skills'] = skills
+        skill_index.upsert(session['user_id'], data['users'].get(session['user_id'], {}), skills, last_score(candidate))
         save_data(data)
+        text_index().add([resume_document(session['user_id'], text)])
+        # Stock up niche-skill questions before the candidate starts an interview
+        request_refill(skills)
         flash(f'Resume uploaded! Found {len(skills)} skills: {", ".join(skills[:6])}{"..." if len(skills) > 6 else ""}', 'success')
     else:
         flash('Please upload a PDF file only.', 'danger')
     return redirect(url_for('dashboard'))
 
 @app.route('/start_interview', methods=['POST'])
+@limiter.limit('start_interview')
 @login_required(role='candidate')
 def start_interview():
     interview_type = request.form.get('interview_type', 'technical')
@@ -234,36 +745,72 @@ def start_interview():
 
     # Get all previously asked questions to avoid repeats
     asked = candidate.get('asked_questions', [])
+    _fresh(question_stats)
     questions = generate_questions(
         candidate['skills'],
         interview_type,
         used_questions=asked,
-        count=question_count
+        count=question_count,
+        target_difficulty=target_for_score(last_score(candidate))
     )
 
     if not questions:
         flash('Could not generate questions. Please try again.', 'danger')
         return redirect(url_for('dashboard'))
 
+    # Generated before taking the store lock; re-read under it to record the interview
+    data = load_data(for_update=True)
+    candidate = data['candidates'].get(session['user_id'])
+    if not candidate:
+        flash('Candidate profile not found.', 'danger')
+        return redirect(url_for('dashboard'))
+
     # Record these questions as asked
     candidate.setdefault('asked_questions', []).extend(questions)
 
     interview_id = str(uuid.uuid4())
+    now = datetime.datetime.now()
+    deadline = now + datetime.timedelta(seconds=app.config['INTERVIEW_SECONDS_PER_QUESTION'] * len(questions))
     interview = {
         'id': interview_id,
-        'date': datetime.datetime.now().isoformat(),
+        'date': now.isoformat(),
+        'started_at': now.isoformat(),
+        'deadline': deadline.isoformat(),
         'type': interview_type,
-        'questions': [{'question': q, 'answer': '', 'score': 0} for q in questions],
+        'questions': [{'id': question_id(q), 'question': q, 'answer': '', 'score': 0} for q in questions],
         'scores': {'technical': 0, 'communication': 0, 'overall': 0},
         'result': 'pending',
         'feedback': '',
-        'duration_seconds': 0
+        'duration_seconds': 0,
+        'revision': 0
     }
     candidate['interviews'].append(interview)
     save_data(data)
+    return _enter_interview(interview_id, deadline.timestamp())
 
+@app.route('/start_interview/<interview_id>', methods=['POST'])
+@limiter.limit('start_interview')
+@login_required(role='candidate')
+def start_scheduled_interview(interview_id):
+    """Start an interview scheduled for a cohort (see admin_create_cohort); its questions are ready."""
+    data = load_data(for_update=True)
+    iv = _find_interview(data, session['user_id'], interview_id)
+    if not iv or iv.get('result') != 'scheduled':
+        flash('This interview is not available to start.', 'warning')
+        return redirect(url_for('dashboard'))
+
+    now = datetime.datetime.now()
+    deadline = now + datetime.timedelta(seconds=app.config['INTERVIEW_SECONDS_PER_QUESTION'] * len(iv['questions']))
+    iv['date'] = iv['started_at'] = now.isoformat()
+    iv['deadline'] = deadline.isoformat()
+    iv['result'] = 'pending'
+    save_data(data)
+    return _enter_interview(interview_id, deadline.timestamp())
+
+def _enter_interview(interview_id, deadline):
+    deadlines.schedule(interview_id, session['user_id'], deadline + app.config['INTERVIEW_GRACE_SECONDS'])
     session['current_interview_id'] = interview_id
-    session['interview_start_time'] = datetime.datetime.now().isoformat()
+    session['interview_deadline'] = deadline
     return redirect(url_for('interview'))
 
 @app.route('/interview')
@@ -284,24 +831,71 @@ def interview():
     if not iv:
         flash('Interview not found.', 'danger')
         return redirect(url_for('dashboard'))
-
-    # Time per question: 3 minutes = 180 seconds
-    time_per_question = 180
-    total_time = time_per_question * len(iv['questions'])
-
-    interview_json = json.dumps(iv)
+    if iv.get('result') != 'pending':
+        # Auto-submitted by the deadline sweeper while the candidate was away
+        session.pop('current_interview_id', None)
+        session.pop('interview_deadline', None)
+        return redirect(url_for('results', interview_id=interview_id))
+
+    # The page only needs the shape of the interview; questions and draft
+    # answers are fetched by script.js from /api/interview/<id>.
     return render_template(
         'interview.html',
         interview=iv,
-        interview_json=interview_json,
-        total_time=total_time,
-        time_per_question=time_per_question
+        question_count=len(iv['questions']),
+        time_per_question=app.config['INTERVIEW_SECONDS_PER_QUESTION'],
+        remaining_seconds=max(0, int(_interview_deadline(iv) - time.time()))
     )
 
+@app.route('/api/interview/<interview_id>')
+@login_required(role='candidate')
+def api_interview(interview_id):
+    data = load_data()
+    candidate = data['candidates'].get(session['user_id'])
+    iv = None
+    if candidate:
+        iv = next((x for x in candidate['interviews'] if x['id'] == interview_id), None)
+    if not iv or iv.get('result') == 'scheduled':    # questions stay hidden until it is started
+        return jsonify({'error': 'Interview not found'}), 404
+
+    # The revision counter is bumped by every saved answer, so the ETag can be
+    # checked before the payload is built or serialised.
+    etag = f"{interview_id}.{iv.get('revision', 0)}"
+    if request.if_none_match.contains(etag):
+        metrics.record_cache('interview_payload', hit=True)
+        response = Response(status=304)
+    else:
+        metrics.record_cache('interview_payload', hit=False)
+        response = jsonify(_interview_payload(iv))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _interview_payload(iv):
+    """Minimal client view of an interview: ids, question texts and drafts."""
+    return {
+        'id': iv['id'],
+        'type': iv['type'],
+        'time_per_question': app.config['INTERVIEW_SECONDS_PER_QUESTION'],
+        'questions': [
+            {
+                'id': q.get('id') or question_id(q['question']),
+                'question': q['question'],
+                'answer': q.get('answer', '')
+            }
+            for q in iv['questions']
+        ]
+    }
+
 @app.route('/save_answer', methods=['POST'])
 @login_required(role='candidate')
 def save_answer():
-    data = load_data()
+    # Reject late saves from the session alone, before touching the store
+    deadline = session.get('interview_deadline')
+    if deadline and time.time() > deadline + app.config['INTERVIEW_GRACE_SECONDS']:
+        return jsonify({'error': 'Interview time is over'}), 409
+
+    data = load_data(for_update=True)
     candidate = data['candidates'].get(session['user_id'])
     if not candidate:
         return jsonify({'error': 'Candidate not found'}), 404
@@ -314,15 +908,20 @@ def save_answer():
     q_index = int(request.form.get('q_index', 0))
     answer = request.form.get('answer', '').strip()
 
+    if iv.get('result') != 'pending':
+        return jsonify({'error': 'Interview already submitted'}), 409
+
     if 0 <= q_index < len(iv['questions']):
         iv['questions'][q_index]['answer'] = answer
+        iv['revision'] = iv.get('revision', 0) + 1
         save_data(data)
     return jsonify({'status': 'ok'})
 
 @app.route('/submit_interview', methods=['POST'])
+@limiter.limit('submit_interview')
 @login_required(role='candidate')
 def submit_interview():
-    data = load_data()
+    data = load_data(for_update=True)
     candidate = data['candidates'].get(session['user_id'])
     if not candidate:
         flash('Candidate not found.', 'danger')
@@ -334,64 +933,175 @@ def submit_interview():
         flash('Interview not found.', 'danger')
         return redirect(url_for('dashboard'))
 
-    # Calculate duration
-    start_time_str = session.get('interview_start_time')
-    if start_time_str:
-        start_time = datetime.datetime.fromisoformat(start_time_str)
-        duration = int((datetime.datetime.now() - start_time).total_seconds())
-        iv['duration_seconds'] = duration
-
-    # Evaluate answers
-    scores, feedback = evaluate_answers(iv['questions'])
-    iv['scores'] = scores
-    iv['feedback'] = feedback
-
-    # FIX: Correct threshold — scores are 0-100
-    iv['result'] = 'selected' if scores['overall'] >= 60 else 'rejected'
-
-    save_data(data)
+    if iv.get('result') == 'pending':
+        # Scored in the background; the results page streams it in question by question
+        _record_duration(iv)
+        iv['result'] = 'evaluating'
+        _lease_evaluation(iv)
+        deadlines.schedule(iv['id'], session['user_id'], _lease_expiry(iv))
+        if jobs.local:
+            evaluation_streams.open(interview_id)   # before the redirect, so the page gets the live stream
+        save_data(data)
+        jobs.put('evaluate', {'candidate_id': session['user_id'], 'interview_id': interview_id,
+                              'questions': iv['questions']})
     session.pop('current_interview_id', None)
-    session.pop('interview_start_time', None)
+    session.pop('interview_deadline', None)
     return redirect(url_for('results', interview_id=interview_id))
 
+def _viewable_interview(data, user, interview_id):
+    """(interview, candidate name) if the user may see the interview, else (None, None)."""
+    if user['role'] == 'admin':
+        for cid, cand in data['candidates'].items():
+            for x in cand.get('interviews', []):
+                if x['id'] == interview_id:
+                    return x, data['users'].get(cid, {}).get('name', 'Candidate')
+        return None, None
+    candidate = data['candidates'].get(user['id'])
+    iv = None
+    if candidate:
+        iv = next((x for x in candidate.get('interviews', []) if x['id'] == interview_id), None)
+    if iv and iv.get('result') == 'scheduled':
+        return None, None   # not started: its questions are only shown by the interview page
+    return iv, user['name']
+
+@app.template_global()
+def results_url(interview_id):
+    """Link to a result page; evaluated ones carry their evaluation, so the page can be cached for good."""
+    evaluated = _fresh(result_pages).lookup(interview_id)
+    if evaluated is None:
+        return url_for('results', interview_id=interview_id)
+    return url_for('results', interview_id=interview_id, v=evaluated[1])
+
 @app.route('/results/<interview_id>')
 @login_required()
 def results(interview_id):
-    data = load_data()
     user_id = session['user_id']
+    evaluated = _fresh(result_pages).lookup(interview_id)
+    if evaluated and (evaluated[0] == user_id or result_pages.is_admin(user_id)):
+        response = _evaluated_results(interview_id, *evaluated)
+        if response is not None:
+            return response
+
+    data = load_data()
     user = data['users'].get(user_id)
     if not user:
         return redirect(url_for('login'))
 
-    iv = None
-    candidate_name = None
-
-    if user['role'] == 'admin':
-        for cid, cand in data['candidates'].items():
-            for x in cand.get('interviews', []):
-                if x['id'] == interview_id:
-                    iv = x
-                    candidate_name = data['users'].get(cid, {}).get('name', 'Candidate')
-                    break
-            if iv:
-                break
-    else:
-        candidate = data['candidates'].get(user_id)
-        if candidate:
-            iv = next((x for x in candidate.get('interviews', []) if x['id'] == interview_id), None)
-        candidate_name = user['name']
-
+    iv, candidate_name = _viewable_interview(data, user, interview_id)
     if not iv:
         flash('Interview not found.', 'danger')
         return redirect(url_for('dashboard'))
+    return render_template('results.html', **_result_context(data, user, iv, candidate_name))
+
+def _result_context(data, user, iv, candidate_name):
+    # Cross-candidate answer similarity is for reviewers only
+    similarity_flags = {}
+    if user['role'] == 'admin':
+        similarity_flags = _similarity_flags(iv['id'], lambda cid: data['users'].get(cid, {}).get('name'))
 
     first_name = candidate_name.split()[0] if candidate_name else 'Candidate'
-    return render_template('results.html', interview=iv, candidate_name=candidate_name, first_name=first_name)
+    return {'interview': iv, 'candidate_name': candidate_name, 'first_name': first_name,
+            'similarity_flags': similarity_flags, 'streaming': iv.get('result') == 'evaluating'}
+
+def _similarity_flags(interview_id, name_of):
+    flags = _fresh(answer_index).flags_for_interview(interview_id)
+    for matches in flags.values():
+        for m in matches:
+            m['candidate_name'] = name_of(m['candidate_id']) or 'Candidate'
+    return flags
+
+def _evaluated_results(interview_id, candidate_id, evaluation):
+    """
+    Result page of an evaluated interview, answered from the in-process
+    indexes: a matching If-None-Match costs no store read and no rendering,
+    and the rendered body is reused until the interview is re-evaluated.
+    None if the store doesn't have that evaluation saved yet.
+    """
+    admin = result_pages.is_admin(session['user_id'])
+    flags = {}
+    if admin:
+        flags = _similarity_flags(interview_id, lambda cid: (_fresh(skill_index).info(cid) or (None,))[0])
+    # The body differs per viewer role and (for reviewers) per set of similarity flags
+    variant = hashlib.sha1(json.dumps([admin, flags], sort_keys=True).encode()).hexdigest()[:12]
+    key = (interview_id, evaluation, variant)
+    # ... and the page around it per signed-in user (the navbar greets them by name)
+    viewer = hashlib.sha1(f"{session['user_id']}\0{session.get('user_name', '')}".encode()).hexdigest()[:8]
+    etag = f'{interview_id}.{evaluation}.{variant}.{viewer}'
+    pending_flashes = '_flashes' in session
+
+    if not pending_flashes and request.if_none_match.contains(etag):
+        metrics.record_cache('result_page', hit=True)
+        response = Response(status=304)
+    else:
+        metrics.record_cache('result_page', hit=False)
+        body = result_pages.body(key)
+        metrics.record_cache('result_body', hit=body is not None)
+        if body is None:
+            data = load_data()
+            user = data['users'].get(session['user_id'])
+            iv, candidate_name = _viewable_interview(data, user, interview_id) if user else (None, None)
+            if not iv or evaluation_of(iv) != evaluation:
+                return None     # evaluated in this process, not saved yet
+            context = _result_context(data, user, iv, candidate_name)
+            context['similarity_flags'] = flags
+            body = render_template('result_body.html', **context)
+            result_pages.store(key, body)
+        response = make_response(render_template('results.html', body=Markup(body)))
+    if pending_flashes:
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    response.set_etag(etag)
+    # Only versioned links (see results_url) are immutable: a re-evaluation
+    # changes the link. Reviewers revalidate, since new similar answers from
+    # other candidates can add flags to the page.
+    if not admin and request.args.get('v') == str(evaluation):
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/results/<interview_id>/stream')
+@login_required()
+def results_stream(interview_id):
+    """Server-Sent Events: one 'question' event per scored question, then 'done'."""
+    data = load_data()
+    user = data['users'].get(session['user_id'])
+    iv = _viewable_interview(data, user, interview_id)[0] if user else None
+    if not iv:
+        abort(404)
+    timeout = app.config['RESULT_STREAM_TIMEOUT']
+
+    def events():
+        current = iv
+        if current.get('result') == 'evaluating':
+            if evaluation_streams.active(interview_id):
+                for item in evaluation_streams.subscribe(interview_id):
+                    yield ': keepalive\n\n' if item is None else sse(*item)
+                return
+            # Being evaluated by another worker process: wait for it to reach the store
+            waited = 0.0
+            while current.get('result') == 'evaluating' and waited < timeout:
+                time.sleep(0.5)
+                waited += 0.5
+                current, _ = _viewable_interview(load_data(), user, interview_id)
+                if current is None:
+                    return
+                if waited % 15 == 0:
+                    yield ': keepalive\n\n'
+            if current.get('result') == 'evaluating':
+                yield sse('failed', {})
+                return
+        for event, payload in _stored_events(current):
+            yield sse(event, payload)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/send_result_email/<interview_id>', methods=['POST'])
 @login_required(role='admin')
 def send_result_email(interview_id):
-    if not MAIL_AVAILABLE:
+    mail_client = get_mail(app)
+    if mail_client is None:
         flash('Email service not configured.', 'danger')
         return redirect(url_for('admin_panel'))
 
@@ -415,20 +1125,9 @@ def send_result_email(interview_id):
         return redirect(url_for('admin_panel'))
 
     subject = f"SmartHire AI: Your Interview Result - {iv['result'].title()}"
-    body = f"""Dear {candidate_name},
-
-Thank you for participating in the SmartHire AI mock interview.
-
-Your Overall Score: {iv['scores']['overall']}%
-Result: {iv['result'].title()}
-
-Feedback:
-{iv['feedback']}
-
-Best regards,
-SmartHire AI Team
-"""
+    body = render_template('email/result.txt', **_result_recipient(iv, candidate_email, candidate_name))
     try:
+        mail, Message = mail_client
         msg = Message(subject, recipients=[candidate_email], body=body)
         mail.send(msg)
         flash('Email sent successfully.', 'success')
@@ -436,16 +1135,106 @@ SmartHire AI Team
         flash(f'Failed to send email: {str(e)}', 'danger')
     return redirect(url_for('admin_panel'))
 
+def _result_recipient(iv, email, name):
+    return {
+        'interview_id': iv['id'],
+        'email': email,
+        'name': name,
+        'result': iv['result'],
+        'overall': iv['scores']['overall'],
+        'feedback': iv['feedback']
+    }
+
+def _result_recipients(data, result='all', min_score=None, skills=None, only_unnotified=True):
+    """One recipient per candidate: their latest evaluated interview, filtered."""
+    matching_ids = _fresh(skill_index).candidate_ids(skills, None) if skills else None
+    notified = notifier().notified_ids() if only_unnotified else set()
+    recipients = []
+    for cid, cand in data['candidates'].items():
+        user = data['users'].get(cid)
+        if not user or not user.get('email') or (matching_ids is not None and cid not in matching_ids):
+            continue
+        evaluated = [iv for iv in cand.get('interviews', []) if iv.get('result') in ('selected', 'rejected')]
+        if not evaluated:
+            continue
+        iv = evaluated[-1]
+        if result != 'all' and iv['result'] != result:
+            continue
+        if min_score is not None and iv['scores']['overall'] < min_score:
+            continue
+        if iv['id'] in notified:
+            continue
+        recipients.append(_result_recipient(iv, user['email'], user.get('name', 'Candidate')))
+    return recipients
+
+@app.route('/admin/notify', methods=['POST'])
+@login_required(role='admin')
+def admin_notify():
+    result = request.form.get('result', 'all')
+    min_score = request.form.get('min_score', type=float)
+    skills = _split_skills(request.form.get('skills', ''))
+    recipients = _result_recipients(load_data(), result, min_score, skills,
+                                    only_unnotified=request.form.get('only_unnotified') == '1')
+    if not recipients:
+        flash('No evaluated interviews match those filters.', 'info')
+        return redirect(url_for('admin_panel'))
+    parts = [f'result: {result}']
+    if min_score is not None:
+        parts.append(f'score >= {min_score:g}')
+    if skills:
+        parts.append('skills: ' + ', '.join(skills))
+    job_id = notifier().submit(recipients, '; '.join(parts))
+    flash(f'Sending {len(recipients)} result emails.', 'success')
+    return redirect(url_for('admin_notify_status', job_id=job_id))
+
+@app.route('/admin/notify/<job_id>')
+@login_required(role='admin')
+def admin_notify_status(job_id):
+    job = notifier().job(job_id)
+    if job is None:
+        flash('Notification job not found.', 'danger')
+        return redirect(url_for('admin_panel'))
+    return render_template('notify.html', job_id=job_id, job=job, counts=job_counts(job))
+
+@app.route('/admin/notify/<job_id>/retry', methods=['POST'])
+@login_required(role='admin')
+def admin_notify_retry(job_id):
+    job = notifier().job(job_id)
+    if job is None:
+        flash('Notification job not found.', 'danger')
+        return redirect(url_for('admin_panel'))
+    failed = {iid for iid, item in job['items'].items() if item['status'] == 'failed'}
+    data = load_data()
+    recipients = {}
+    for cid, cand in data['candidates'].items():
+        user = data['users'].get(cid, {})
+        for iv in cand.get('interviews', []):
+            if iv['id'] in failed and user.get('email'):
+                recipients[iv['id']] = _result_recipient(iv, user['email'], user.get('name', 'Candidate'))
+    count = notifier().retry_failed(job_id, recipients)
+    flash(f'Retrying {count} failed emails.', 'success' if count else 'info')
+    return redirect(url_for('admin_notify_status', job_id=job_id))
+
 @app.route('/admin')
 @login_required(role='admin')
 def admin_panel():
+    search_skills = _split_skills(request.args.get('skills', ''))
+    min_score = request.args.get('min_score', type=float)
+    matching_ids = None
+    if search_skills or min_score is not None:
+        matching_ids = _fresh(skill_index).candidate_ids(search_skills, min_score)
+
+    flagged = _fresh(answer_index).flagged_counts()
     data = load_data()
     candidates_list = []
     for uid, user in data['users'].items():
+        if matching_ids is not None and uid not in matching_ids:
+            continue
         if user['role'] == 'candidate':
             cand = data['candidates'].get(uid, {})
             interviews = cand.get('interviews', [])
-            last_interview = interviews[-1] if interviews else None
+            evaluated = _evaluated(interviews)
+            last_interview = evaluated[-1] if evaluated else None
             candidates_list.append({
                 'id': uid,
                 'name': user['name'],
@@ -454,18 +1243,207 @@ def admin_panel():
                 'total_interviews': len(interviews),
                 'last_score': last_interview['scores']['overall'] if last_interview else 'N/A',
                 'result': last_interview['result'] if last_interview else 'N/A',
-                'interview_id': last_interview['id'] if last_interview else None
+                'interview_id': last_interview['id'] if last_interview else None,
+                'similar_answers': flagged.get(last_interview['id'], 0) if last_interview else 0
             })
-    return render_template('admin.html', candidates=candidates_list)
+    return render_template('admin.html', candidates=candidates_list,
+                           search_skills=', '.join(search_skills), min_score=min_score,
+                           notify_jobs=notifier().jobs()[:5], cohorts=_fresh(cohort_boards).cohorts())
+
+def _split_skills(raw):
+    return [s.strip().lower() for s in raw.replace(';', ',').split(',') if s.strip()]
+
+@app.route('/admin/search')
+@login_required(role='admin')
+def admin_search():
+    """Boolean skill search: ?skills=java,spring,sql&min_score=70&limit=100"""
+    started = time.perf_counter()
+    total, rows = _fresh(skill_index).query(
+        _split_skills(request.args.get('skills', '')),
+        min_score=request.args.get('min_score', type=float),
+        limit=request.args.get('limit', default=100, type=int)
+    )
+    return jsonify({
+        'count': total,
+        'candidates': rows,
+        'took_ms': round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.route('/admin/text_search')
+@login_required(role='admin')
+def admin_text_search():
+    query = request.args.get('q', '').strip()
+    results = []
+    took_ms = 0
+    if query:
+        started = time.perf_counter()
+        results = text_index().search(query, limit=request.args.get('limit', default=25, type=int))
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+        index = _fresh(skill_index)
+        for r in results:
+            info = index.info(r['meta']['candidate_id'])
+            r['candidate_name'] = info[0] if info else 'Unknown'
+    return render_template('search.html', query=query, results=results, took_ms=took_ms)
+
+# Cohorts: one interview configuration for a group of candidates, scheduled
+# in one pass over the bank and one store write, and ranked on a leaderboard
+@app.route('/admin/cohorts', methods=['POST'])
+@login_required(role='admin')
+def admin_create_cohort():
+    """
+    Form or JSON: name, interview_type, question_count and members (emails
+    or user ids; a list, or one string separated by commas or new lines).
+    """
+    payload = request.get_json(silent=True) or request.form
+    interview_type = 'management' if payload.get('interview_type') == 'management' else 'technical'
+    try:
+        question_count = max(5, min(15, int(payload.get('question_count', 10))))
+    except (ValueError, TypeError):
+        question_count = 10
+    entries = payload.get('members') or ''
+    if isinstance(entries, str):
+        entries = entries.replace(',', '\n').splitlines()
+    entries = list(dict.fromkeys(e.strip() for e in entries if e.strip()))
+    if len(entries) > app.config['COHORT_MAX_MEMBERS']:
+        return _cohort_error(f"A cohort can have at most {app.config['COHORT_MAX_MEMBERS']} members.")
+
+    data = load_data()
+    member_ids, skipped = _cohort_members(data, entries)
+    if not member_ids:
+        return _cohort_error('None of those members are candidates with an uploaded resume.')
+
+    # Every member's questions in one pass over the bank, before taking the store lock
+    _fresh(question_stats)
+    candidates = [data['candidates'][uid] for uid in member_ids]
+    question_sets = generate_question_sets(
+        [(c['skills'], c.get('asked_questions', []), target_for_score(last_score(c))) for c in candidates],
+        interview_type, question_count)
+
+    data = load_data(for_update=True)
+    now = datetime.datetime.now().isoformat()
+    cohort = {
+        'id': str(uuid.uuid4()),
+        'name': (payload.get('name') or '').strip() or f'Cohort {now[:10]}',
+        'interview_type': interview_type,
+        'question_count': question_count,
+        'created': now,
+        'members': {}
+    }
+    for uid, questions in zip(member_ids, question_sets):
+        candidate = data['candidates'].get(uid)
+        if not candidate or not questions:
+            skipped.append(uid)
+            continue
+        candidate.setdefault('asked_questions', []).extend(questions)
+        interview = {
+            'id': str(uuid.uuid4()),
+            'date': now,
+            'type': interview_type,
+            'cohort': cohort['id'],
+            'questions': [{'id': question_id(q), 'question': q, 'answer': '', 'score': 0} for q in questions],
+            'scores': {'technical': 0, 'communication': 0, 'overall': 0},
+            'result': 'scheduled',      # started by the candidate (start_scheduled_interview)
+            'feedback': '',
+            'duration_seconds': 0,
+            'revision': 0
+        }
+        candidate['interviews'].append(interview)
+        cohort['members'][uid] = interview['id']
+    data.setdefault('cohorts', {})[cohort['id']] = cohort
+    cohort_boards.add_cohort(cohort)
+    save_data(data)
+
+    if request.is_json:
+        return jsonify({'id': cohort['id'], 'invited': len(cohort['members']), 'skipped': skipped}), 201
+    flash(f"Scheduled {len(cohort['members'])} interviews."
+          + (f' Skipped {len(skipped)}: ' + ', '.join(skipped[:10]) if skipped else ''),
+          'success' if not skipped else 'warning')
+    return redirect(url_for('admin_cohort', cohort_id=cohort['id']))
+
+def _cohort_members(data, entries):
+    """(candidate ids with skills, skipped entries) for member emails or user ids."""
+    by_email = {u['email'].lower(): uid for uid, u in data['users'].items() if u.get('email')}
+    member_ids, skipped = {}, []
+    for entry in entries:
+        uid = entry if entry in data['users'] else by_email.get(entry.lower())
+        user = data['users'].get(uid)
+        if user and user['role'] == 'candidate' and data['candidates'].get(uid, {}).get('skills'):
+            member_ids[uid] = None
+        else:
+            skipped.append(entry)
+    return list(member_ids), skipped
+
+def _cohort_error(message):
+    if request.is_json:
+        return jsonify({'error': message}), 400
+    flash(message, 'danger')
+    return redirect(url_for('admin_panel'))
+
+@app.route('/admin/cohorts/<cohort_id>')
+@login_required(role='admin')
+def admin_cohort(cohort_id):
+    boards = _fresh(cohort_boards)
+    cohort = boards.cohort(cohort_id)
+    if cohort is None:
+        flash('Cohort not found.', 'danger')
+        return redirect(url_for('admin_panel'))
+    page_size = app.config['COHORT_PAGE_SIZE']
+    page = max(1, request.args.get('page', default=1, type=int))
+    rows = _leaderboard_rows(cohort_id, (page - 1) * page_size, page_size)
+    return render_template('cohort.html', cohort=cohort, rows=rows, page=page,
+                           pages=max(1, -(-cohort['scored'] // page_size)))
+
+@app.route('/admin/cohorts/<cohort_id>/leaderboard')
+@login_required(role='admin')
+def admin_cohort_leaderboard(cohort_id):
+    """Leaderboard rows as JSON: ?offset=0&limit=50"""
+    started = time.perf_counter()
+    cohort = _fresh(cohort_boards).cohort(cohort_id)
+    if cohort is None:
+        return jsonify({'error': 'Cohort not found'}), 404
+    rows = _leaderboard_rows(cohort_id, max(0, request.args.get('offset', default=0, type=int)),
+                             request.args.get('limit', default=app.config['COHORT_PAGE_SIZE'], type=int))
+    return jsonify({
+        'cohort': cohort,
+        'candidates': rows,
+        'took_ms': round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.route('/admin/cohorts/<cohort_id>/rank/<candidate_id>')
+@login_required(role='admin')
+def admin_cohort_rank(cohort_id, candidate_id):
+    ranked = _fresh(cohort_boards).rank(cohort_id, candidate_id)
+    if ranked is None:
+        return jsonify({'error': 'Not a scored member of this cohort'}), 404
+    rank, score, of = ranked
+    return jsonify({'candidate_id': candidate_id, 'rank': rank, 'score': score, 'of': of})
+
+def _leaderboard_rows(cohort_id, offset, limit):
+    index = _fresh(skill_index)
+    rows = []
+    for rank, cid, score, iid in cohort_boards.page(cohort_id, offset, limit):
+        info = index.info(cid)
+        rows.append({'rank': rank, 'id': cid, 'name': info[0] if info else 'Unknown',
+                     'email': info[1] if info else '', 'score': score, 'interview_id': iid})
+    return rows
 
 @app.route('/delete_candidate/<user_id>', methods=['POST'])
 @login_required(role='admin')
 def delete_candidate(user_id):
-    data = load_data()
+    data = load_data(for_update=True)
     if user_id in data['users'] and data['users'][user_id]['role'] == 'candidate':
         del data['users'][user_id]
-        data['candidates'].pop(user_id, None)
+        for iv in data['candidates'].pop(user_id, {}).get('interviews', []):
+            deadlines.cancel(iv['id'])
+            answer_index.remove_interview(iv['id'])
+            question_stats.remove_interview(iv)
+        for cohort in data.get('cohorts', {}).values():
+            cohort['members'].pop(user_id, None)
+        skill_index.remove(user_id)
+        result_pages.remove_candidate(user_id)
+        cohort_boards.remove_candidate(user_id)
         save_data(data)
+        text_index().delete_where(candidate_id=user_id)
         flash('Candidate deleted successfully.', 'success')
     else:
         flash('Candidate not found.', 'danger')
@@ -483,6 +1461,8 @@ def export_results():
         if user['role'] == 'candidate':
             cand = data['candidates'].get(uid, {})
             for iv in cand.get('interviews', []):
+                if iv.get('result') not in ('selected', 'rejected'):
+                    continue    # scheduled, in progress or still being evaluated: no scores yet
                 duration_min = round(iv.get('duration_seconds', 0) / 60, 1)
                 output.append({
                     'Name': user['name'],
@@ -0,0 +1,452 @@
+"""
+asgi.py
+Optional ASGI entry point. The candidate endpoints that spend their time
+waiting on the store, the store lock or an evaluation run as coroutines on
+one event loop:
+
+    POST /save_answer               autosave of a draft answer
+    GET  /api/interview/<id>        questions and drafts (ETag-checked)
+    GET  /results/<id>/stream       Server-Sent Events of the evaluation
+
+so a candidate waiting on a result stream, or a save queued behind the
+store lock, costs a coroutine rather than a worker. Every other route, and
+any request to these three that isn't their plain case (no session, wrong
+role, unknown result, ...), is served by the unchanged Flask app on a pool
+of ASYNC_WSGI_THREADS threads, exactly as under a WSGI server.
+
+The coroutines share the Flask app's state: its store and locks (through
+utils/async_backends.py), session cookies, evaluation streams and the
+indexes save_data keeps current. LLM calls are already off the request
+path, on the evaluation workers behind the job queue, so no request waits
+on one. Read-only coroutines share one parsed copy of the store per store
+version instead of parsing it per request.
+
+Usage:
+    uvicorn asgi:application           # or any ASGI server
+    python asgi.py --port 8000         # the same, through uvicorn
+"""
+import argparse
+import asyncio
+import io
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from itsdangerous import BadSignature
+from werkzeug.formparser import parse_form_data
+from werkzeug.http import parse_cookie, parse_etags, quote_etag
+
+import app as appmod
+from utils import metrics
+from utils.async_backends import make_async_backends
+from utils.backends import LockTimeout
+from utils.result_stream import sse
+
+flask_app = appmod.app
+config = flask_app.config
+
+_wsgi_pool = ThreadPoolExecutor(config['ASYNC_WSGI_THREADS'], thread_name_prefix='wsgi')
+_store_pool = ThreadPoolExecutor(config['ASYNC_STORE_THREADS'], thread_name_prefix='async-store')
+astore, alocks = make_async_backends(appmod.store, appmod.locks, config, _store_pool)
+_sessions = flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+async def _run(fn, *args):
+    """CPU-bound or blocking work (JSON of the whole store) off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_store_pool, fn, *args)
+
+
+class _Snapshot:
+    """The parsed store at its latest version, shared by the read-only coroutines: never mutate it."""
+
+    def __init__(self):
+        self.version = None
+        self.data = None
+        self._checked = 0.0
+        self._loading = None    # (version, task) being read and parsed
+
+    def put(self, version, data):
+        self.version, self.data, self._checked = version, data, time.monotonic()
+
+    async def get(self, max_age: float = 0):
+        """The document; max_age > 0 accepts one whose version was checked that recently."""
+        if self.data is not None and time.monotonic() - self._checked < max_age:
+            return self.data
+        version = await astore.version()
+        if version is None:
+            return appmod.parse_store(None)
+        if version == self.version:
+            self._checked = time.monotonic()
+            return self.data
+        if self._loading is None or self._loading[0] != version:
+            self._loading = (version, asyncio.ensure_future(self._load()))
+        return await asyncio.shield(self._loading[1])
+
+    async def _load(self):
+        version, text = await astore.read()
+        data = await _run(appmod.parse_store, text)
+        self.put(version, data)
+        return data
+
+
+snapshot = _Snapshot()
+
+
+# ------------------------------------------------------------------ requests
+class Request:
+    def __init__(self, scope, body: bytes):
+        self.scope = scope
+        self.body = body
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        self.session = self._session()
+
+    def _session(self):
+        """The Flask session from its signed cookie, read-only; {} if missing or invalid."""
+        value = parse_cookie(self.headers.get('cookie', '')).get(config['SESSION_COOKIE_NAME'])
+        if not value:
+            return {}
+        try:
+            return _sessions.loads(value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    def form(self):
+        _, form, _ = parse_form_data(_environ(self.scope, self.body))
+        return form
+
+
+def _json(payload, status=200, headers=()):
+    body = (flask_app.json.dumps(payload) + '\n').encode('utf-8')   # as jsonify() renders it
+    return status, [('Content-Type', 'application/json')] + list(headers), body
+
+
+def _has_role(data, user_id, role):
+    user = data['users'].get(user_id) if user_id else None
+    return user is not None and user['role'] == role
+
+
+# ----------------------------------------------------------------- endpoints
+# Each returns (status, headers, body) or None to leave the request to Flask.
+# body is bytes, or an async iterator of str for a streamed response.
+async def save_answer(request):
+    session = request.session
+    user_id = session.get('user_id')
+    if not _has_role(await snapshot.get(), user_id, 'candidate'):
+        return None
+    deadline = session.get('interview_deadline')
+    if deadline and time.time() > deadline + config['INTERVIEW_GRACE_SECONDS']:
+        return _json({'error': 'Interview time is over'}, 409)
+    form = request.form()
+    try:
+        q_index = int(form.get('q_index', 0))
+    except ValueError:
+        return None
+    answer = form.get('answer', '').strip()
+
+    token = await alocks.acquire('store', config['STORE_LOCK_TIMEOUT'], config['STORE_LOCK_LEASE'])
+    try:
+        # Under the lock the snapshot is the current document: no re-read or re-parse
+        status, payload, data = _apply_answer(await snapshot.get(), user_id, session.get('current_interview_id'),
+                                              q_index, answer)
+        if data is not None:
+            before, after = await astore.write_data(data, 'save_answer')
+            appmod.note_store_write(before, after)
+            snapshot.put(after, data)
+    finally:
+        await alocks.release('store', token)
+    return _json(payload, status)
+
+
+def _apply_answer(data, user_id, interview_id, q_index, answer):
+    """
+    app.save_answer's change as (status, reply, new document or None). The
+    new document copies only the path down to the answer: `data` is the
+    shared snapshot and stays untouched.
+    """
+    candidate = data['candidates'].get(user_id)
+    if not candidate:
+        return 404, {'error': 'Candidate not found'}, None
+    pos = next((i for i, x in enumerate(candidate['interviews']) if x['id'] == interview_id), None)
+    if pos is None:
+        return 404, {'error': 'Interview not found'}, None
+    iv = candidate['interviews'][pos]
+    if iv.get('result') != 'pending':
+        return 409, {'error': 'Interview already submitted'}, None
+    if not 0 <= q_index < len(iv['questions']):
+        return 200, {'status': 'ok'}, None
+    iv = dict(iv, questions=list(iv['questions']), revision=iv.get('revision', 0) + 1)
+    iv['questions'][q_index] = dict(iv['questions'][q_index], answer=answer)
+    interviews = list(candidate['interviews'])
+    interviews[pos] = iv
+    data = dict(data, candidates=dict(data['candidates']))
+    data['candidates'][user_id] = dict(candidate, interviews=interviews)
+    return 200, {'status': 'ok'}, data
+
+
+async def api_interview(request, interview_id):
+    user_id = request.session.get('user_id')
+    data = await snapshot.get()
+    if not _has_role(data, user_id, 'candidate'):
+        return None
+    iv = appmod._find_interview(data, user_id, interview_id)
+    if not iv or iv.get('result') == 'scheduled':
+        return _json({'error': 'Interview not found'}, 404)
+
+    etag = f"{interview_id}.{iv.get('revision', 0)}"
+    headers = [('ETag', quote_etag(etag)), ('Cache-Control', 'private, no-cache')]
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        metrics.record_cache('interview_payload', hit=True)
+        return 304, headers, b''
+    metrics.record_cache('interview_payload', hit=False)
+    return _json(appmod._interview_payload(iv), headers=headers)
+
+
+async def results_stream(request, interview_id):
+    user_id = request.session.get('user_id')
+    data = await snapshot.get()
+    user = data['users'].get(user_id) if user_id else None
+    iv = appmod._viewable_interview(data, user, interview_id)[0] if user else None
+    if not iv or (iv.get('result') != 'evaluating' and 'scores' not in iv):
+        return None
+    headers = [('Content-Type', 'text/event-stream; charset=utf-8'), ('Cache-Control', 'no-cache'),
+               ('X-Accel-Buffering', 'no')]
+    return 200, headers, _result_events(user, interview_id, iv)
+
+
+async def _result_events(user, interview_id, iv):
+    """app.results_stream's events, waiting on the event loop instead of in a worker."""
+    current = iv
+    if current.get('result') == 'evaluating':
+        if appmod.evaluation_streams.active(interview_id):
+            async for chunk in _live_events(interview_id):
+                yield chunk
+            return
+        # Being evaluated by another worker process: wait for it to reach the store
+        waited = 0.0
+        while current.get('result') == 'evaluating' and waited < config['RESULT_STREAM_TIMEOUT']:
+            await asyncio.sleep(0.5)
+            waited += 0.5
+            current, _ = appmod._viewable_interview(await snapshot.get(max_age=0.25), user, interview_id)
+            if current is None:
+                return
+            if waited % 15 == 0:
+                yield ': keepalive\n\n'
+        if current.get('result') == 'evaluating':
+            yield sse('failed', {})
+            return
+    for event, payload in appmod._stored_events(current):
+        yield sse(event, payload)
+
+
+async def _live_events(key, keepalive: float = 15):
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    streams = appmod.evaluation_streams
+
+    def notify():
+        loop.call_soon_threadsafe(wake.set)
+
+    if not streams.watch(key, notify):
+        return
+    try:
+        sent = 0
+        while True:
+            wake.clear()
+            state = streams.snapshot(key, sent)
+            if state is None:
+                return
+            pending, closed = state
+            sent += len(pending)
+            for item in pending:
+                yield sse(*item)
+            if closed:
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        streams.unwatch(key, notify)
+
+
+ROUTES = (
+    ('POST', re.compile(r'/save_answer'), save_answer),
+    ('GET', re.compile(r'/api/interview/([^/]+)'), api_interview),
+    ('GET', re.compile(r'/results/([^/]+)/stream'), results_stream),
+)
+
+
+# ------------------------------------------------------------- the Flask app
+def _environ(scope, body: bytes) -> dict:
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+async def _wsgi(scope, body: bytes, send):
+    """Serve the request with the Flask app on the WSGI thread pool."""
+    loop = asyncio.get_running_loop()
+    environ = _environ(scope, body)
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(' ', 1)[0]), headers]
+        return lambda data: None
+
+    result = await loop.run_in_executor(_wsgi_pool, flask_app, environ, start_response)
+    try:
+        chunks = iter(result)
+        chunk = await loop.run_in_executor(_wsgi_pool, next, chunks, None)
+        await _start(send, *started)
+        while chunk is not None:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await loop.run_in_executor(_wsgi_pool, next, chunks, None)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(_wsgi_pool, result.close)
+
+
+def _flask_response(environ, exc):
+    """The Flask app's error handler's page for an exception raised by a coroutine endpoint."""
+    with flask_app.request_context(environ):
+        response = flask_app.make_response(flask_app.handle_user_exception(exc))
+        return response.status_code, response.headers.to_wsgi_list(), response.get_data()
+
+
+# ---------------------------------------------------------------- ASGI glue
+async def _start(send, status, headers):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+
+
+async def _respond(send, receive, status, headers, body):
+    await _start(send, status, headers)
+    if isinstance(body, bytes):
+        await send({'type': 'http.response.body', 'body': body})
+        return
+
+    async def pump():
+        async for chunk in body:
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    # A client that leaves mid-stream stops its generator instead of leaving it waiting
+    streaming, gone = asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())
+    await asyncio.wait((streaming, gone), return_when=asyncio.FIRST_COMPLETED)
+    for task in (streaming, gone):
+        task.cancel()
+    if streaming.done() and not streaming.cancelled() and streaming.exception() is not None:
+        raise streaming.exception()
+
+
+async def _read_body(scope, receive) -> bytes:
+    # Larger bodies are left unread: the Flask app answers 413 from the Content-Length alone
+    length = dict(scope['headers']).get(b'content-length', b'0')
+    if length.isdigit() and int(length) > config['MAX_CONTENT_LENGTH']:
+        return b''
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+_started = False
+
+
+def _startup():
+    # The Flask app starts its sweeper and evaluation workers from before_request hooks,
+    # which the coroutine endpoints bypass
+    global _started
+    if not _started:
+        _started = True
+        appmod._ensure_deadline_sweeper()
+        appmod._ensure_job_workers()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.get_running_loop().run_in_executor(_wsgi_pool, _startup)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    if not _started:
+        await asyncio.get_running_loop().run_in_executor(_wsgi_pool, _startup)
+    body = await _read_body(scope, receive)
+    for method, pattern, endpoint in ROUTES:
+        match = pattern.fullmatch(scope['path'])
+        if match is None or scope['method'] != method:
+            continue
+        started = time.perf_counter()
+        try:
+            response = await endpoint(Request(scope, body), *match.groups())
+        except LockTimeout as e:
+            response = await asyncio.get_running_loop().run_in_executor(
+                _wsgi_pool, _flask_response, _environ(scope, body), e)
+        if response is None:
+            break
+        if metrics.ENABLED:
+            metrics.observe(endpoint.__name__, time.perf_counter() - started, metric='request')
+        return await _respond(send, receive, *response)
+    await _wsgi(scope, body, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve SmartHire through uvicorn with the async endpoints.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('uvicorn is not installed (pip install uvicorn); any ASGI server can run asgi:application')
+    uvicorn.run(application, host=args.host, port=args.port, lifespan='on')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+bench_admission.py
+Overload test of the expensive candidate routes with and without admission control.
+
+A synthetic store of `--candidates` candidates is generated (see datagen.py).
+`--users` of them then POST /upload_resume `--per-user` times each, as fast
+as they can, while a probe requests the cheap /login page every 20 ms. All
+requests go through a fixed pool of `--workers` threads, standing in for a
+server's worker threads, so queueing behind slow requests shows up in the
+latencies. Per mode (limiter off, in-process counters, shared SQLite file),
+it reports uploads done and refused (429), upload latency and probe latency
+percentiles.
+
+Usage:
+    python benchmarks/bench_admission.py --candidates 2000 --users 40 --per-user 5 --workers 8
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_flow import summarise
+from benchmarks.datagen import generate_dataset, make_resume_pdf, resume_text, TECH_SKILLS
+
+
+def overload(appmod, users: list, per_user: int, workers: int) -> dict:
+    app = appmod.app
+    pdf = make_resume_pdf(resume_text(random.Random(1), TECH_SKILLS[:4]))
+    server = ThreadPoolExecutor(max_workers=workers)
+    clients = {}
+    for uid in users:
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'], s['user_role'] = uid, 'candidate'
+        clients[uid] = client
+
+    def upload(uid):
+        started = time.perf_counter()
+        r = clients[uid].post('/upload_resume', data={'resume': (io.BytesIO(pdf), 'cv.pdf')},
+                              content_type='multipart/form-data')
+        return r.status_code, time.perf_counter() - started
+
+    def login_page(queued):
+        app.test_client().get('/login')
+        return time.perf_counter() - queued
+
+    stop = threading.Event()
+    probes = []
+
+    def probe():
+        while not stop.is_set():
+            probes.append(server.submit(login_page, time.perf_counter()))
+            time.sleep(0.02)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    futures = [server.submit(upload, uid) for _ in range(per_user) for uid in users]
+    results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    probe_times = [f.result() for f in probes]
+    server.shutdown()
+    done = [t for code, t in results if code == 302]
+    return {'elapsed_s': round(elapsed, 2), 'uploads': len(done),
+            'refused': sum(1 for code, _ in results if code == 429),
+            'upload': summarise(done), 'refused_ms': summarise([t for code, t in results if code == 429]),
+            'probe': summarise(probe_times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--candidates', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--per-user', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='smarthire-admission-')
+    os.chdir(workdir)
+    import app as appmod
+    from utils.rate_limit import make_backend
+
+    appmod.app.config.update(TESTING=True, INTERVIEW_SWEEPER_ENABLED=False,
+                             UPLOAD_FOLDER=os.path.join(workdir, 'uploads'))
+    os.makedirs(appmod.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    appmod.store.path = os.path.join(workdir, 'data.json')
+    data = generate_dataset(args.candidates)
+    users = [uid for uid, u in data['users'].items() if u['role'] == 'candidate'][:args.users]
+
+    print(f'{len(users)} users x {args.per_user} uploads, {args.workers} server threads, '
+          f'{args.candidates} candidates in the store')
+    print(f"{'mode':<8}{'wall s':>8}{'done':>6}{'429':>6}{'upload p50':>12}{'p99 ms':>9}"
+          f"{'429 p50 ms':>12}{'probe p50':>11}{'p99 ms':>9}")
+    for mode in ('off', 'memory', 'sqlite'):
+        with open(appmod.store.path, 'w') as f:
+            json.dump(data, f)
+        limiter = appmod.limiter
+        limiter.backend = make_backend('memory' if mode == 'off' else mode, os.path.join(workdir, f'{mode}.db'))
+        limiter.enabled = mode != 'off'
+        r = overload(appmod, users, args.per_user, args.workers)
+        print(f"{mode:<8}{r['elapsed_s']:>8.2f}{r['uploads']:>6}{r['refused']:>6}{r['upload']['p50_ms']:>12.1f}"
+              f"{r['upload']['p99_ms']:>9.1f}{r['refused_ms']['p50_ms']:>12.1f}{r['probe']['p50_ms']:>11.1f}"
+              f"{r['probe']['p99_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+bench_asgi.py
+Concurrent in-progress interviews per core: gunicorn-style sync workers vs the ASGI mode (asgi.py).
+
+For each count K in `--interviews` a store of K candidates, each with a
+started interview of `--questions` questions, is generated (see
+datagen.py), and K simulated candidates run at once:
+    GET /api/interview/<id> -> (think, POST /save_answer) xN
+    -> POST /submit_interview -> GET /results/<id>/stream until 'done'
+thinking `--think` seconds (+-50%) before each autosave. Submissions are
+evaluated through the job queue by `--eval-workers` workers calling
+benchmarks/llm_stub.py with `--llm-latency` seconds per call.
+
+  sync   the WSGI app on `--sync-workers` threads serving one request at a
+         time, like gunicorn's sync workers (default 2 x cores + 1): an open
+         result stream holds its worker until the evaluation is done.
+  async  asgi.application on one event loop; the routes it doesn't serve
+         natively (here only submit) run on its WSGI thread pool.
+
+Requests are made in-process, without sockets, so both modes pay the same
+client-side cost. Each run is a fresh process. Reports, per mode and K, the
+wall time, autosave latency percentiles, submit-to-result time, interviews
+completed per second and per core, and for each mode the largest K whose
+autosave p99 stayed within `--slo` seconds.
+
+Usage:
+    python benchmarks/bench_asgi.py --interviews 25,100,200 --think 5 --llm-latency 2
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_flow import summarise
+from benchmarks.datagen import generate_dataset
+
+ANSWER = ('An example answer describing the concept, how it works and a real-world use case '
+          'such as caching database queries to improve performance.')
+
+
+def add_pending_interviews(data: dict, questions: int) -> list:
+    """Give every candidate a started interview; returns [(candidate id, interview id, deadline)]."""
+    now = datetime.datetime.now()
+    deadline = now + datetime.timedelta(hours=1)
+    started = []
+    for n, (cid, candidate) in enumerate(sorted(data['candidates'].items())):
+        iid = str(uuid.uuid4())
+        candidate['interviews'].append({
+            'id': iid, 'date': now.isoformat(), 'started_at': now.isoformat(), 'deadline': deadline.isoformat(),
+            'type': 'technical',
+            'questions': [{'id': f'q{n}-{i}', 'question': f'Explain concept {i} of topic {n}.', 'answer': '',
+                           'score': 0} for i in range(questions)],
+            'scores': {'technical': 0, 'communication': 0, 'overall': 0},
+            'result': 'pending', 'feedback': '', 'duration_seconds': 0, 'revision': 0,
+        })
+        started.append((cid, iid, deadline.timestamp()))
+    return started
+
+
+# --------------------------------------------------------------- transports
+def wsgi_call(app, method: str, path: str, cookie: str, body: bytes = b''):
+    """One request through the WSGI app, body consumed (a sync worker is busy until then)."""
+    from werkzeug.test import EnvironBuilder
+    builder = EnvironBuilder(path=path, method=method, data=body or None, headers={'Cookie': cookie},
+                             content_type='application/x-www-form-urlencoded' if body else None)
+    environ = builder.get_environ()
+    builder.close()
+    status = []
+    result = app(environ, lambda s, headers, exc_info=None: status.append(int(s[:3])))
+    try:
+        data = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0], data
+
+
+async def asgi_call(application, method: str, path: str, cookie: str, body: bytes = b''):
+    headers = [(b'cookie', cookie.encode('latin-1'))]
+    if body:
+        headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', str(len(body)).encode())]
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'root_path': '',
+             'headers': headers, 'scheme': 'http', 'http_version': '1.1',
+             'server': ('bench', 80), 'client': ('127.0.0.1', 0)}
+    requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    finished = asyncio.Event()
+    reply = {'status': None, 'body': []}
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            reply['status'] = message['status']
+        else:
+            reply['body'].append(message.get('body', b''))
+            if not message.get('more_body'):
+                finished.set()
+
+    await application(scope, receive, send)
+    finished.set()
+    return reply['status'], b''.join(reply['body'])
+
+
+# --------------------------------------------------------------------- run
+def run(args):
+    """One mode at one K, in this (fresh) process; prints a JSON report."""
+    os.chdir(tempfile.mkdtemp(prefix=f'smarthire-{args.run}-'))
+    from benchmarks import llm_stub
+    import app as appmod
+    appmod.app.config.update(TESTING=True, INTERVIEW_SWEEPER_ENABLED=False, EVAL_STREAM_WORKERS=args.eval_workers)
+    llm_stub.install(args.llm_latency)
+    appmod.store.path = os.path.abspath('data.json')
+    data = generate_dataset(args.k, max_interviews=1)
+    started = add_pending_interviews(data, args.questions)
+    with open(appmod.store.path, 'w') as f:
+        json.dump(data, f)
+    sessions = appmod.app.session_interface.get_signing_serializer(appmod.app)
+    cookies = {iid: 'session=' + sessions.dumps({'user_id': cid, 'user_role': 'candidate', 'current_interview_id': iid,
+                                                 'interview_deadline': deadline})
+               for cid, iid, deadline in started}
+
+    if args.run == 'sync':
+        workers = ThreadPoolExecutor(args.sync_workers)
+
+        async def call(method, path, cookie, body=b''):
+            return await asyncio.get_running_loop().run_in_executor(
+                workers, wsgi_call, appmod.app, method, path, cookie, body)
+    else:
+        import asgi
+
+        async def call(method, path, cookie, body=b''):
+            return await asgi_call(asgi.application, method, path, cookie, body)
+
+    saves, results, errors = [], [], {}
+
+    def check(route, status, ok=(200, 302)):
+        if status not in ok:
+            errors[route] = errors.get(route, 0) + 1
+
+    async def candidate(n, iid):
+        rng = random.Random(n)
+        cookie = cookies[iid]
+        await asyncio.sleep(rng.uniform(0, args.think))     # arrivals spread over one think time
+        check('api_interview', (await call('GET', f'/api/interview/{iid}', cookie))[0])
+        for i in range(args.questions):
+            await asyncio.sleep(args.think * rng.uniform(0.5, 1.5))
+            body = urlencode({'q_index': i, 'answer': ANSWER}).encode()
+            t = time.perf_counter()
+            check('save_answer', (await call('POST', '/save_answer', cookie, body))[0])
+            saves.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        check('submit_interview', (await call('POST', '/submit_interview', cookie))[0])
+        status, body = await call('GET', f'/results/{iid}/stream', cookie)
+        check('results_stream', status)
+        if b'event: done' not in body:
+            errors['no_result'] = errors.get('no_result', 0) + 1
+        results.append(time.perf_counter() - t)
+
+    async def main():
+        t = time.perf_counter()
+        await asyncio.gather(*(candidate(n, iid) for n, (_, iid, _) in enumerate(started)))
+        return time.perf_counter() - t
+
+    appmod._ensure_job_workers()
+    elapsed = asyncio.run(main())
+    print(json.dumps({'elapsed_s': elapsed, 'completed': len(results), 'errors': errors,
+                      'save': summarise(saves), 'result': summarise(results)}), flush=True)
+
+
+def measure(mode: str, k: int, args) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), '--run', mode, '--k', str(k), '--think', str(args.think),
+           '--questions', str(args.questions), '--llm-latency', str(args.llm_latency),
+           '--eval-workers', str(args.eval_workers), '--sync-workers', str(args.sync_workers)]
+    env = dict(os.environ, SMARTHIRE_RATE_LIMIT='0', SMARTHIRE_EVAL_BATCHING='0', GEMINI_API_KEY='')
+    out = subprocess.run(cmd, env=env, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--interviews', default='25,100,200', help='comma-separated concurrent interview counts')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--think', type=float, default=5.0, help='mean seconds between autosaves')
+    parser.add_argument('--llm-latency', type=float, default=2.0)
+    parser.add_argument('--eval-workers', type=int, default=64, help='evaluations in flight (both modes)')
+    parser.add_argument('--sync-workers', type=int, default=2 * (os.cpu_count() or 1) + 1)
+    parser.add_argument('--slo', type=float, default=1.0, help='autosave p99 budget, seconds')
+    parser.add_argument('--run', choices=('sync', 'async'), help=argparse.SUPPRESS)
+    parser.add_argument('--k', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run(args)
+
+    cores = os.cpu_count() or 1
+    print(f'{args.questions} autosaves per interview {args.think}s apart, LLM latency {args.llm_latency}s, '
+          f'{args.eval_workers} evaluation workers, {args.sync_workers} sync workers, {cores} CPU(s)')
+    print(f"{'mode':<7}{'K':>6}{'wall s':>8}{'done':>6}{'save p50':>10}{'p99 ms':>9}{'result p50':>12}"
+          f"{'p99 s':>7}{'iv/s':>7}{'iv/s/core':>10}  errors")
+    capacity = {}
+    for k in (int(n) for n in args.interviews.split(',') if n):
+        for mode in args.modes.split(','):
+            r = measure(mode, k, args)
+            rate = r['completed'] / r['elapsed_s']
+            print(f"{mode:<7}{k:>6}{r['elapsed_s']:>8.1f}{r['completed']:>6}{r['save']['p50_ms']:>10.1f}"
+                  f"{r['save']['p99_ms']:>9.1f}{r['result']['p50_ms'] / 1000:>12.2f}{r['result']['p99_ms'] / 1000:>7.2f}"
+                  f"{rate:>7.2f}{rate / cores:>10.2f}  {r['errors'] or '-'}")
+            if r['save']['p99_ms'] <= args.slo * 1000 and not r['errors']:
+                capacity[mode] = max(capacity.get(mode, 0), k)
+    for mode in args.modes.split(','):
+        print(f"{mode}: up to {capacity.get(mode, 0)} concurrent interviews within a {args.slo}s autosave p99 "
+              f"({capacity.get(mode, 0) / cores:.0f} per core)")
+
+
+if __name__ == '__main__':
+    main()
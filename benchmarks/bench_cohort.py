@@ -0,0 +1,133 @@
+"""
+bench_cohort.py
+Scheduling a cohort in one batch vs one start_interview per member, and leaderboard queries vs full sorts.
+
+  schedule     a store of `--candidates` candidates (see datagen.py) on the
+               file store, and a cohort of each size in `--members`:
+                 per-member  every member POSTs /start_interview, i.e. one
+                             question selection and one store write each
+                 batched     one admin POST /admin/cohorts: all question
+                             sets in one pass over the bank, one store write
+  leaderboard  a cohort of each size with every member scored: a "top 50"
+               page and a member's rank from the Leaderboard
+               (utils/leaderboard.py) vs sorting (top 50) or scanning
+               (rank) the members' scores, as a page view without an
+               index does, plus the cost of recording one score.
+
+Usage:
+    python benchmarks/bench_cohort.py --candidates 200 --members 50,200 --leaderboard 1000,10000,100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.datagen import generate_dataset
+from utils.leaderboard import Leaderboard
+
+
+# ----------------------------------------------------------------- schedule
+def schedule(appmod, text: str, members: int) -> dict:
+    sessions = appmod.app.session_interface.get_signing_serializer(appmod.app)
+    data = json.loads(text)
+    admin_id = next(uid for uid, u in data['users'].items() if u['role'] == 'admin')
+    member_ids = sorted(cid for cid, c in data['candidates'].items() if c.get('skills'))[:members]
+    timings = {}
+    for mode in ('per-member', 'batched'):
+        with open(appmod.store.path, 'w') as f:
+            f.write(text)
+        client = appmod.app.test_client()
+        started = time.perf_counter()
+        if mode == 'per-member':
+            for cid in member_ids:
+                client.set_cookie('session', sessions.dumps({'user_id': cid, 'user_role': 'candidate'}))
+                response = client.post('/start_interview', data={'interview_type': 'technical', 'question_count': 10})
+                assert response.status_code == 302, response.status_code
+        else:
+            client.set_cookie('session', sessions.dumps({'user_id': admin_id, 'user_role': 'admin'}))
+            response = client.post('/admin/cohorts', json={'name': 'bench', 'question_count': 10,
+                                                           'members': member_ids})
+            assert response.status_code == 201 and response.json['invited'] == len(member_ids), response.data
+        timings[mode] = time.perf_counter() - started
+    return timings
+
+
+def add_admin(data: dict):
+    user = dict(next(u for u in data['users'].values()), id='bench-admin', role='admin', email='admin@bench')
+    data['users']['bench-admin'] = user
+
+
+# -------------------------------------------------------------- leaderboard
+def per_op(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def leaderboard(n: int, repeat: int) -> dict:
+    rng = random.Random(n)
+    scores = {f'c{i}': round(rng.uniform(0, 100), 1) for i in range(n)}
+    board = Leaderboard()
+    for cid, score in scores.items():
+        board.set(cid, score)
+    probe = f'c{n // 2}'
+
+    def sorted_top():
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:50]
+
+    def sorted_rank():
+        probe_score = scores[probe]
+        return 1 + sum(1 for s in scores.values() if s > probe_score)
+
+    def record():
+        board.set(probe, round(rng.uniform(0, 100), 1))
+
+    return {'sort top 50': per_op(sorted_top, repeat), 'board top 50': per_op(lambda: board.page(0, 50), repeat),
+            'scan rank': per_op(sorted_rank, repeat), 'board rank': per_op(lambda: board.rank(probe), repeat),
+            'board record': per_op(record, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--candidates', type=int, default=200, help='candidates in the store')
+    parser.add_argument('--members', default='50,200', help='comma-separated cohort sizes to schedule')
+    parser.add_argument('--leaderboard', default='1000,10000,100000', help='comma-separated scored cohort sizes')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    sizes = [int(m) for m in args.members.split(',') if m]
+    if sizes:
+        os.environ.update(SMARTHIRE_RATE_LIMIT='0', GEMINI_API_KEY='')
+        os.chdir(tempfile.mkdtemp(prefix='smarthire-cohort-'))
+        import app as appmod
+        appmod.app.config.update(TESTING=True, INTERVIEW_SWEEPER_ENABLED=False)
+        appmod.store.path = os.path.abspath('data.json')
+        data = generate_dataset(args.candidates)
+        add_admin(data)
+        text = json.dumps(data, indent=2)
+        print(f'schedule: {args.candidates} candidates, {len(text) / 1e6:.1f} MB store, 10 questions each')
+        print(f"{'members':>8}{'per-member s':>14}{'batched s':>11}{'speed-up':>10}")
+        for members in sizes:
+            t = schedule(appmod, text, members)
+            print(f"{members:>8}{t['per-member']:>14.2f}{t['batched']:>11.2f}{t['per-member'] / t['batched']:>9.1f}x")
+
+    sizes = [int(n) for n in args.leaderboard.split(',') if n]
+    if sizes:
+        print('leaderboard, microseconds per query')
+        columns = ('sort top 50', 'board top 50', 'scan rank', 'board rank', 'board record')
+        print(f"{'scored':>8}" + ''.join(f'{c:>14}' for c in columns))
+        for n in sizes:
+            r = leaderboard(n, args.repeat)
+            print(f'{n:>8}' + ''.join(f'{r[c] * 1e6:>14.1f}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+bench_eval_batch.py
+Burst throughput of answer evaluation, per-interview vs micro-batched.
+
+`--submissions` interviews are evaluated at once from as many threads,
+against the offline Gemini stub with a per-request latency and a cap on
+concurrent requests (standing in for the provider's rate limit). Reports
+wall time, evaluations/s and backend request counts for both modes, on
+both paths:
+  auto    evaluate_answers, as the deadline sweeper calls it
+  submit  evaluate_answers_stream, as a submitted interview is evaluated
+          for its streamed results page (app._evaluate_in_background)
+
+Usage:
+    python benchmarks/bench_eval_batch.py --submissions 200 --latency 0.8 --concurrency 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import llm_stub
+from utils import evaluator
+from utils.questions_bank import get_technical_questions
+
+
+def make_interviews(count: int, questions: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    skills = ['python', 'java', 'sql', 'javascript', 'algorithms', 'data structures']
+    interviews = []
+    for _ in range(count):
+        qs = get_technical_questions(rng.sample(skills, 3), count=questions)
+        interviews.append([{'question': q, 'answer': f'An answer about {q.lower()} with an example.'} for q in qs])
+    return interviews
+
+
+def evaluate_streamed(questions: list) -> tuple:
+    return list(evaluator.evaluate_answers_stream(questions))[-1][1:]
+
+
+def run(interviews: list, batching: bool, args, evaluate=evaluator.evaluate_answers) -> dict:
+    genai = llm_stub.install(args.latency, args.concurrency)
+    evaluator.configure_batching(batching, args.window, args.max_batch, args.token_budget)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(interviews)) as pool:
+        results = list(pool.map(evaluate, interviews))
+    elapsed = time.perf_counter() - started
+    evaluator.configure_batching(False)
+    assert all(scores['per_question'] for scores, _ in results)
+    return {'elapsed_s': round(elapsed, 3), 'evals_per_s': round(len(interviews) / elapsed, 2),
+            'backend_requests': genai.calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.8, help='simulated seconds per LLM request')
+    parser.add_argument('--concurrency', type=int, default=4, help='max concurrent LLM requests (rate limit)')
+    parser.add_argument('--window', type=float, default=0.25)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--token-budget', type=int, default=6000)
+    args = parser.parse_args()
+
+    interviews = make_interviews(args.submissions, args.questions)
+    for path, evaluate in (('auto', evaluator.evaluate_answers), ('submit', evaluate_streamed)):
+        single = run(interviews, False, args, evaluate)
+        batched = run(interviews, True, args, evaluate)
+        print(f"{path:<7}per-interview: {single['elapsed_s']:>8.2f} s  {single['evals_per_s']:>7.2f} evals/s  "
+              f"{single['backend_requests']} requests")
+        print(f"{path:<7}batched:       {batched['elapsed_s']:>8.2f} s  {batched['evals_per_s']:>7.2f} evals/s  "
+              f"{batched['backend_requests']} requests")
+        print(f"{path:<7}speed-up: {single['elapsed_s'] / batched['elapsed_s']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+bench_flow.py
+End-to-end load test of the candidate flow through Flask's test client.
+
+For each data-set size a synthetic store is generated (see datagen.py), then
+`--flows` new candidates run
+    register -> login -> upload_resume -> start_interview -> save_answer xN
+    -> submit_interview -> results
+on 1..k concurrent workers. Per-route latency percentiles and throughput are
+reported together with micro-benchmarks of extract_skills,
+get_technical_questions and _evaluate_rule_based, and written to a JSON file
+(tagged with the git commit) so runs can be compared between commits.
+LLM calls go to benchmarks/llm_stub.py, or are disabled with --llm off.
+
+Usage:
+    python benchmarks/bench_flow.py --sizes 1000,10000 --workers 1,4 --flows 20
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import llm_stub
+from benchmarks.datagen import generate_dataset, make_resume_pdf, resume_text, TECH_SKILLS, BENCH_PASSWORD
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarise(samples: list) -> dict:
+    values = sorted(samples)
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.fmean(values) * 1000, 3) if values else 0,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p90_ms': round(percentile(values, 90) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else 0,
+    }
+
+
+class FlowRunner:
+    def __init__(self, app, questions: int):
+        self.app = app
+        self.questions = questions
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _record(self, route: str, started: float, response, ok_codes=(200, 302, 304)):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.timings[route].append(elapsed)
+            if response.status_code not in ok_codes:
+                self.errors[route] += 1
+        return response
+
+    def _call(self, route: str, fn, *args, **kwargs):
+        started = time.perf_counter()
+        return self._record(route, started, fn(*args, **kwargs))
+
+    def run_one(self, seed: int):
+        with self._lock:
+            self._counter += 1
+            n = self._counter
+        rng = random.Random(seed)
+        client = self.app.test_client()
+        email = f'flow{seed}-{n}@bench.local'
+        self._call('register', client.post, '/register',
+                   data={'name': 'Flow Candidate', 'email': email, 'password': BENCH_PASSWORD})
+        self._call('login', client.post, '/login', data={'email': email, 'password': BENCH_PASSWORD})
+        pdf = make_resume_pdf(resume_text(rng, rng.sample(TECH_SKILLS, 5)))
+        self._call('upload_resume', client.post, '/upload_resume',
+                   data={'resume': (io.BytesIO(pdf), 'resume.pdf')}, content_type='multipart/form-data')
+        self._call('start_interview', client.post, '/start_interview',
+                   data={'interview_type': 'technical', 'question_count': self.questions})
+        with client.session_transaction() as sess:
+            interview_id = sess.get('current_interview_id')
+        if not interview_id:
+            with self._lock:
+                self.errors['start_interview'] += 1
+            return
+        for i in range(self.questions):
+            self._call('save_answer', client.post, '/save_answer', data={
+                'q_index': i,
+                'answer': 'An example answer describing the concept, how it works and a real-world use case '
+                          'such as caching database queries to improve performance.'})
+        self._call('submit_interview', client.post, '/submit_interview')
+        self._call('results', client.get, f'/results/{interview_id}')
+
+
+def run_flows(app, flows: int, workers: int, questions: int) -> dict:
+    runner = FlowRunner(app, questions)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(runner.run_one, range(flows)))
+    elapsed = time.perf_counter() - started
+    total_requests = sum(len(v) for v in runner.timings.values())
+    return {
+        'workers': workers,
+        'flows': flows,
+        'elapsed_s': round(elapsed, 3),
+        'flows_per_s': round(flows / elapsed, 3),
+        'requests_per_s': round(total_requests / elapsed, 3),
+        'errors': dict(runner.errors),
+        'routes': {route: summarise(v) for route, v in sorted(runner.timings.items())},
+    }
+
+
+def micro_benchmarks(iterations: int) -> dict:
+    from utils.resume_parser import extract_skills
+    from utils.questions_bank import get_technical_questions
+    from utils.evaluator import _evaluate_rule_based
+
+    rng = random.Random(7)
+    text = resume_text(rng, rng.sample(TECH_SKILLS, 8)) * 3
+    skills = extract_skills(text)
+    questions = [{'question': q, 'answer': 'A detailed answer about ' + q.lower()}
+                 for q in get_technical_questions(skills, count=10)]
+
+    def per_call_us(fn):
+        return round(min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6, 2)
+
+    return {
+        'extract_skills_us': per_call_us(lambda: extract_skills(text)),
+        'get_technical_questions_us': per_call_us(lambda: get_technical_questions(skills, count=10)),
+        '_evaluate_rule_based_us': per_call_us(lambda: _evaluate_rule_based(questions)),
+        'iterations': iterations,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000', help='comma-separated candidate counts, e.g. 1000,10000,100000')
+    parser.add_argument('--workers', default='1,4', help='comma-separated concurrency levels')
+    parser.add_argument('--flows', type=int, default=20, help='new-candidate flows per run')
+    parser.add_argument('--questions', type=int, default=10, choices=(5, 10, 15))
+    parser.add_argument('--llm', choices=('stub', 'off'), default='stub')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='simulated LLM latency in seconds')
+    parser.add_argument('--micro-iterations', type=int, default=2000)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'flow.json'))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='smarthire-bench-')
+    os.chdir(workdir)
+    import app as appmod
+    appmod.app.config.update(TESTING=True, INTERVIEW_SWEEPER_ENABLED=False,
+                             UPLOAD_FOLDER=os.path.join(workdir, 'uploads'))
+    os.makedirs(appmod.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    appmod.limiter.enabled = False      # measure the routes themselves, not admission control
+    if args.llm == 'stub':
+        llm_stub.install(args.llm_latency)
+    else:
+        llm_stub.uninstall()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'llm': args.llm,
+        'llm_latency_s': args.llm_latency,
+        'questions_per_interview': args.questions,
+        'micro': micro_benchmarks(args.micro_iterations),
+        'datasets': [],
+    }
+
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        started = time.perf_counter()
+        data_file = os.path.join(workdir, f'data_{size}.json')
+        with open(data_file, 'w') as f:
+            json.dump(generate_dataset(size), f)
+        appmod.store.path = data_file
+        entry = {
+            'candidates': size,
+            'store_bytes': os.path.getsize(data_file),
+            'generate_s': round(time.perf_counter() - started, 2),
+            'runs': [],
+        }
+        for workers in (int(w) for w in args.workers.split(',') if w):
+            run = run_flows(appmod.app, args.flows, workers, args.questions)
+            entry['runs'].append(run)
+            print(f"{size:>7} candidates, {workers:>2} workers: {run['flows_per_s']:.2f} flows/s, "
+                  f"{run['requests_per_s']:.1f} req/s, errors={run['errors'] or 0}")
+            for route, stats in run['routes'].items():
+                print(f"    {route:<18} p50 {stats['p50_ms']:>9.2f} ms  p90 {stats['p90_ms']:>9.2f} ms  "
+                      f"p99 {stats['p99_ms']:>9.2f} ms")
+        report['datasets'].append(entry)
+        os.remove(data_file)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('micro:', report['micro'])
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
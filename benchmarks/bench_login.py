@@ -0,0 +1,135 @@
+"""
+bench_login.py
+Login-storm benchmark: hashing inline on request threads vs the bounded pool.
+
+`--users` candidates (password hashes made with `--method`) all POST /login
+at once from `--threads` request threads through Flask's test client, while
+a probe thread keeps requesting a cheap page (/) to show what the storm does
+to every other route. Reported per mode: wall time, successful logins/s and
+logins/s per core, 503 (shed) responses, and probe latency percentiles.
+The inline mode puts the old behaviour back (every request thread hashes);
+the pooled mode is utils/password_hashing.PasswordHasher with `--workers`
+threads and `--max-pending` admission slots.
+
+Usage:
+    python benchmarks/bench_login.py --users 60 --threads 32 --method pbkdf2:sha256:600000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from benchmarks.bench_flow import summarise
+
+PASSWORD = 'bench-pass'
+
+
+class InlineHasher:
+    """The pre-pool behaviour: hash on whichever request thread asks."""
+
+    def __init__(self, method):
+        self.method = method
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def verify(self, pwhash, password):
+        return check_password_hash(pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return False
+
+
+def make_store(users: int, method: str) -> dict:
+    pwhash = generate_password_hash(PASSWORD, method)
+    data = {'users': {}, 'candidates': {}}
+    for i in range(users):
+        uid = f'u{i}'
+        data['users'][uid] = {'id': uid, 'name': f'Candidate {i}', 'email': f'c{i}@example.com',
+                              'password_hash': pwhash, 'role': 'candidate', 'created_at': '2024-01-01T00:00:00'}
+        data['candidates'][uid] = {'user_id': uid, 'resume_text': '', 'skills': [], 'interviews': [],
+                                   'asked_questions': []}
+    return data
+
+
+def storm(appmod, users: int, threads: int) -> dict:
+    app = appmod.app
+    stop = threading.Event()
+    probes = []
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/')
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    def login(i):
+        client = app.test_client()
+        return client.post('/login', data={'email': f'c{i}@example.com', 'password': PASSWORD}).status_code
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        codes = list(pool.map(login, range(users)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    ok = codes.count(302)
+    return {'elapsed_s': round(elapsed, 3), 'logins': ok, 'shed_503': codes.count(503),
+            'logins_per_s': round(ok / elapsed, 2), 'probe': summarise(probes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--users', type=int, default=60)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--max-pending', type=int, default=64)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='smarthire-login-')
+    os.chdir(workdir)
+    import app as appmod
+    from utils.password_hashing import PasswordHasher
+
+    appmod.store.path = os.path.join(workdir, 'data.json')
+    with open(appmod.store.path, 'w') as f:
+        json.dump(make_store(args.users, args.method), f)
+    appmod.app.config['TESTING'] = True
+
+    cores = os.cpu_count() or 1
+    print(f'{args.users} logins from {args.threads} threads, {args.method}, {cores} cores')
+    results = {}
+    for mode in ('inline', 'pooled'):
+        if mode == 'inline':
+            appmod.passwords = InlineHasher(args.method)
+            used = min(cores, args.threads)
+        else:
+            appmod.passwords = PasswordHasher(args.method, workers=args.workers, max_pending=args.max_pending)
+            used = min(cores, args.workers)
+        results[mode] = r = storm(appmod, args.users, args.threads)
+        r['logins_per_s_per_core'] = round(r['logins_per_s'] / used, 2)
+
+    print(f"{'mode':<8}{'wall s':>8}{'ok':>6}{'503':>6}{'login/s':>9}{'/core':>8}"
+          f"{'probe p50 ms':>14}{'probe p99 ms':>14}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['elapsed_s']:>8.2f}{r['logins']:>6}{r['shed_503']:>6}{r['logins_per_s']:>9.2f}"
+              f"{r['logins_per_s_per_core']:>8.2f}{r['probe']['p50_ms']:>14.1f}{r['probe']['p99_ms']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+bench_notify.py
+Bulk result email throughput: one SMTP connection per message vs the pooled notifier.
+
+Runs a minimal in-process SMTP sink that accepts everything and charges
+`--handshake` seconds per new connection (standing in for the TCP + TLS +
+AUTH round trips of a real provider) and `--latency` seconds per message.
+The baseline opens a fresh connection for every email, the way a
+per-request mail.send() does; the pooled run uses utils.notifier with
+`--workers` long-lived connections. Reports wall time, messages/s and the
+number of connections each mode opened.
+
+Usage:
+    python benchmarks/bench_notify.py --messages 300 --handshake 0.15 --latency 0.01 --workers 4
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.message import EmailMessage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from utils import notifier as notifier_mod
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.handshake)
+        self.reply('220 sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 sink')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                time.sleep(server.latency)
+                with server.lock:
+                    server.messages += 1
+                self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+    def reply(self, text: str):
+        self.wfile.write(text.encode() + b'\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake: float, latency: float):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.handshake, self.latency = handshake, latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.messages = 0
+
+
+def make_recipients(count: int) -> list:
+    return [{'interview_id': f'iv-{i}', 'email': f'candidate{i}@example.com', 'name': f'Candidate {i}',
+             'result': 'selected' if i % 3 else 'rejected', 'overall': 50 + i % 50,
+             'feedback': 'Good fundamentals; practise explaining trade-offs.'} for i in range(count)]
+
+
+def run_fresh(app, recipients: list, port: int, workers: int):
+    """Baseline: a new connection (handshake) for every message, `workers` at a time."""
+    template = app.jinja_env.get_template('email/result.txt')
+    pending = list(recipients)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                r = pending.pop()
+            msg = EmailMessage()
+            msg['Subject'] = f"SmartHire AI: Your Interview Result - {r['result'].title()}"
+            msg['From'] = app.config['MAIL_DEFAULT_SENDER']
+            msg['To'] = r['email']
+            msg.set_content(template.render(**r))
+            with smtplib.SMTP('127.0.0.1', port) as conn:
+                conn.send_message(msg)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_pooled(app, recipients: list, status_file: str, workers: int):
+    bulk = notifier_mod.BulkNotifier(app, status_file, workers=workers, rate=0)
+    job_id = bulk.submit(recipients, 'benchmark')
+    bulk.wait()
+    bulk.pool.close()
+    counts = notifier_mod.job_counts(bulk.job(job_id))
+    if counts['sent'] != len(recipients):
+        raise RuntimeError(f'pooled run did not deliver everything: {counts}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--handshake', type=float, default=0.15, help='seconds per new connection')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds per message')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.handshake, args.latency)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    port = sink.server_address[1]
+
+    app = Flask('bench_notify', root_path=ROOT)
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False,
+                      MAIL_DEFAULT_SENDER='noreply@smarthire.ai')
+    recipients = make_recipients(args.messages)
+    status_file = os.path.join(ROOT, 'benchmarks', f'.notify-bench-{os.getpid()}.json')
+
+    print(f'{args.messages} messages, {args.workers} workers, handshake {args.handshake}s, '
+          f'per-message {args.latency}s')
+    rows = []
+    try:
+        for label, runner in (('fresh connection', lambda: run_fresh(app, recipients, port, args.workers)),
+                              ('pooled notifier', lambda: run_pooled(app, recipients, status_file, args.workers))):
+            sink.reset()
+            started = time.perf_counter()
+            runner()
+            elapsed = time.perf_counter() - started
+            rows.append((label, elapsed, sink.messages, sink.connections))
+    finally:
+        sink.shutdown()
+        for path in (status_file, f'{status_file}.lock'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"{'mode':<18}{'wall s':>9}{'msg/s':>9}{'sent':>7}{'conns':>7}")
+    for label, elapsed, sent, conns in rows:
+        print(f'{label:<18}{elapsed:>9.2f}{sent / elapsed:>9.1f}{sent:>7}{conns:>7}')
+    print(f'speedup: {rows[0][1] / rows[1][1]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
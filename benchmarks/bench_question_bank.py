@@ -0,0 +1,118 @@
+"""
+bench_question_bank.py
+Per-worker memory and reload latency of the compiled, memory-mapped question bank.
+
+For each bank size, a synthetic question_bank.json (`--skills` skills of
+N/skills questions each) is written to a temp dir and compiled. Then
+`--workers` forked processes each load the bank and serve `--calls`
+question selections, and report their private (anonymous) memory growth:
+once with the bank as in-process Python lists (json.load, as the old
+literal bank was) and once through utils.questions_bank's memory map with
+the difficulty sampler (whose 4-byte-per-question position arrays are the
+part that remains per worker).
+Finally the source is rewritten and the time until a worker serves the
+new bank is measured. Linux only (reads /proc/self/status).
+
+Usage:
+    python benchmarks/bench_question_bank.py --sizes 1000,100000,500000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils import questions_bank
+from utils.compiled_bank import compile_bank
+from utils.question_difficulty import DifficultySampler, QuestionStats
+
+
+def private_kb() -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1])
+    return 0
+
+
+def write_bank(path: str, size: int, skills: int, tag: str = ''):
+    per_skill = max(1, size // skills)
+    bank = {'technical': {f'skill{s}': [f'{tag}Question {i} about skill{s}: how would you design part {i}?'
+                                        for i in range(per_skill)] for s in range(skills)},
+            'management': {'General': [f'{tag}Tell me about situation {i}.' for i in range(100)]}}
+    with open(path, 'w') as f:
+        json.dump(bank, f)
+
+
+def worker(mode: str, source: str, skills: int, calls: int, out):
+    before = private_kb()
+    rng = random.Random(os.getpid())
+    if mode == 'lists':
+        with open(source) as f:
+            technical = json.load(f)['technical']
+        for _ in range(calls):
+            pool = technical[f'skill{rng.randrange(skills)}']
+            rng.sample(pool, 10)
+    else:
+        questions_bank.configure_bank(source)
+        questions_bank.configure_sampler(DifficultySampler(QuestionStats()))   # as the app runs it
+        for _ in range(calls):
+            questions_bank.get_technical_questions([f'skill{rng.randrange(skills)}'], count=10)
+    out.put(private_kb() - before)
+
+
+def per_worker_kb(mode: str, source: str, args) -> float:
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(mode, source, args.skills, args.calls, out))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    growth = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return sum(growth) / len(growth)
+
+
+def reload_latency(source: str, size: int, skills: int) -> float:
+    questions_bank.configure_bank(source, reload_interval=0.05)
+    write_bank(source, size, skills, tag='v2 ')
+    started = time.perf_counter()
+    while not questions_bank.TECHNICAL_QUESTIONS['skill0'][0].startswith('v2 '):
+        time.sleep(0.005)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--sizes', default='1000,100000,500000')
+    parser.add_argument('--skills', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+    multiprocessing.set_start_method('fork')
+
+    print(f"{'bank size':>10}{'json MB':>9}{'bin MB':>8}{'compile s':>11}"
+          f"{'lists KB/worker':>17}{'mmap KB/worker':>16}{'reload s':>10}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory(prefix='smarthire-bank-') as workdir:
+            source = os.path.join(workdir, 'question_bank.json')
+            write_bank(source, size, args.skills)
+            started = time.perf_counter()
+            target = compile_bank(source)
+            compile_s = time.perf_counter() - started
+            lists_kb = per_worker_kb('lists', source, args)
+            mmap_kb = per_worker_kb('mmap', source, args)
+            reload_s = reload_latency(source, size, args.skills)
+            print(f'{size:>10}{os.path.getsize(source) / 1e6:>9.1f}{os.path.getsize(target) / 1e6:>8.1f}'
+                  f'{compile_s:>11.2f}{lists_kb:>17.0f}{mmap_kb:>16.0f}{reload_s:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
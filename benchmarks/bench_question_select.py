@@ -0,0 +1,89 @@
+"""
+bench_question_select.py
+Question selection cost vs bank size: shuffle-the-pool vs the difficulty sampler.
+
+A synthetic skill bank of N questions is added to SUPPLEMENTARY_QUESTIONS, with
+calibration stats for every question (difficulty spread uniformly), and
+get_technical_questions() is timed for both the uniform shuffle path and the
+bucketed DifficultySampler. Also reports the mean difficulty of what the
+sampler picks for a few targets, to show the selection follows the target.
+
+Usage:
+    python benchmarks/bench_question_select.py --sizes 1000,10000,100000 --calls 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils import questions_bank
+from utils.question_difficulty import QuestionStats, DifficultySampler
+from utils.questions_bank import get_technical_questions, question_id
+
+SKILL = 'benchskill'
+
+
+def make_bank(size: int, seed: int = 5):
+    rng = random.Random(seed)
+    questions = [f'Benchmark question {i} about {SKILL} internals?' for i in range(size)]
+    stats = QuestionStats()
+    # One synthetic interview per 10 questions, each question answered by a few candidates
+    for start in range(0, size, 10):
+        chunk = questions[start:start + 10]
+        for attempt in range(5):
+            stats.add_interview({
+                'id': f'iv-{start}-{attempt}',
+                'questions': [{'id': question_id(q), 'question': q, 'answer': 'x'} for q in chunk],
+                'scores': {'per_question': [{'technical_score': (start + i) * 100.0 / size + rng.uniform(-5, 5)}
+                                            for i in range(len(chunk))]},
+            })
+    return questions, stats
+
+
+def time_calls(calls: int, used: list, **kwargs) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        get_technical_questions([SKILL], count=10, used_questions=used, **kwargs)
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'bank size':>10}{'shuffle ms':>12}{'sampler ms':>12}{'speedup':>9}   mean difficulty picked "
+          f"for target 0.2 / 0.5 / 0.8")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        questions, stats = make_bank(size)
+        questions_bank.SUPPLEMENTARY_QUESTIONS[SKILL] = questions
+        used = random.Random(1).sample(questions, min(50, size))   # a candidate's history
+
+        questions_bank.configure_sampler(None)
+        shuffle_ms = time_calls(max(5, args.calls // 10), used) * 1000
+
+        sampler = DifficultySampler(stats)
+        questions_bank.configure_sampler(sampler)
+        get_technical_questions([SKILL], count=10)      # first call buckets the bank
+        sampler_ms = time_calls(args.calls, used, target_difficulty=0.5) * 1000
+
+        means = []
+        for target in (0.2, 0.5, 0.8):
+            picked = [q for _ in range(50) for q in
+                      get_technical_questions([SKILL], count=10, used_questions=used, target_difficulty=target)]
+            means.append(statistics.fmean(stats.difficulty(question_id(q)) for q in picked))
+        print(f'{size:>10}{shuffle_ms:>12.3f}{sampler_ms:>12.3f}{shuffle_ms / sampler_ms:>8.1f}x   '
+              + ' / '.join(f'{m:.2f}' for m in means))
+    questions_bank.configure_sampler(None)
+    del questions_bank.SUPPLEMENTARY_QUESTIONS[SKILL]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+bench_scaleout.py
+Candidate-flow throughput of one node vs several nodes sharing a state server.
+
+For each node count a state server (utils/state_server.py) is started and
+seeded with a synthetic store of `--candidates` candidates (see datagen.py).
+Each node is a separate process running the app with every backend set to
+'remote' and `--clients` concurrent candidates, each running
+    register -> login -> upload_resume -> start_interview -> save_answer xN
+    -> submit_interview -> wait for the streamed result
+until the node has completed `--flows` flows. Submitted interviews go to the
+shared job queue, where any node's `--eval-workers` evaluation workers pick
+them up; the LLM is benchmarks/llm_stub.py with `--llm-latency` seconds per
+call, so, as in production, a node's throughput is bounded by how many
+evaluations it can have in flight. Nodes start together once all have
+imported the app, and stay up (evaluating queued jobs) until all are done.
+Reports flows/s per node count and the scaling relative to one node, plus
+the errors seen.
+
+Usage:
+    python benchmarks/bench_scaleout.py --nodes 1,2 --flows 16 --clients 4 --eval-workers 2 --llm-latency 2
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_flow import summarise
+from benchmarks.datagen import generate_dataset, make_resume_pdf, resume_text, TECH_SKILLS, BENCH_PASSWORD
+
+ANSWER = ('An example answer describing the concept, how it works and a real-world use case '
+          'such as caching database queries to improve performance.')
+
+
+# --------------------------------------------------------------------- node
+def run_node(args):
+    """One node: import the app against the state server, wait for 'go', run the flows, print a JSON report."""
+    os.chdir(tempfile.mkdtemp(prefix=f'smarthire-node{args.node}-'))
+    from benchmarks import llm_stub
+    import app as appmod
+    appmod.app.config.update(TESTING=True, INTERVIEW_SWEEPER_ENABLED=False, UPLOAD_FOLDER='uploads',
+                             EVAL_STREAM_WORKERS=args.eval_workers)
+    os.makedirs('uploads', exist_ok=True)
+    llm_stub.install(args.llm_latency)
+    app = appmod.app
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def call(route, fn, *a, ok=(200, 302, 304), **kw):
+        started = time.perf_counter()
+        response = fn(*a, **kw)
+        with lock:
+            timings[route].append(time.perf_counter() - started)
+            if response.status_code not in ok:
+                errors[route] += 1
+        return response
+
+    def flow(n):
+        rng = random.Random(n)
+        client = app.test_client()
+        email = f'node{args.node}-flow{n}@bench.local'
+        started = time.perf_counter()
+        call('register', client.post, '/register', data={'name': 'Flow Candidate', 'email': email,
+                                                          'password': BENCH_PASSWORD})
+        call('login', client.post, '/login', data={'email': email, 'password': BENCH_PASSWORD})
+        pdf = make_resume_pdf(resume_text(rng, rng.sample(TECH_SKILLS, 5)))
+        call('upload_resume', client.post, '/upload_resume', data={'resume': (io.BytesIO(pdf), 'resume.pdf')},
+             content_type='multipart/form-data')
+        call('start_interview', client.post, '/start_interview',
+             data={'interview_type': 'technical', 'question_count': args.questions})
+        with client.session_transaction() as sess:
+            interview_id = sess.get('current_interview_id')
+        if not interview_id:
+            with lock:
+                errors['start_interview'] += 1
+            return
+        for i in range(args.questions):
+            call('save_answer', client.post, '/save_answer', data={'q_index': i, 'answer': ANSWER})
+        call('submit_interview', client.post, '/submit_interview')
+        body = call('result_stream', lambda: client.get(f'/results/{interview_id}/stream', buffered=True))
+        with lock:
+            if b'event: done' not in body.data:
+                errors['result_stream'] += 1
+            timings['flow'].append(time.perf_counter() - started)
+
+    print('ready', flush=True)
+    sys.stdin.readline()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(flow, range(args.flows)))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({'node': args.node, 'flows': args.flows, 'elapsed_s': elapsed, 'errors': dict(errors),
+                      'routes': {r: summarise(v) for r, v in sorted(timings.items())}}), flush=True)
+    sys.stdin.readline()    # keep evaluating other nodes' jobs until every node is done
+
+
+# ------------------------------------------------------------------- driver
+def start_state_server(seed_path: str):
+    proc = subprocess.Popen([sys.executable, '-m', 'utils.state_server', '--port', '0', '--seed', seed_path],
+                            cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    address = proc.stdout.readline().strip().rsplit(' ', 1)[1]     # "state server listening on host:port"
+    return proc, address
+
+
+def run_cluster(nodes: int, seed_path: str, args) -> dict:
+    server, address = start_state_server(seed_path)
+    env = dict(os.environ, SMARTHIRE_STATE_SERVER=address, SMARTHIRE_STORE_BACKEND='remote',
+               SMARTHIRE_LOCK_BACKEND='remote', SMARTHIRE_QUEUE_BACKEND='remote', SMARTHIRE_CACHE_BACKEND='remote',
+               SMARTHIRE_RATE_LIMIT='0', SMARTHIRE_EVAL_BATCHING='0', GEMINI_API_KEY='',
+               # Cheap hashes: the benchmark is about shared state, not pbkdf2 on a shared CPU
+               SMARTHIRE_PASSWORD_HASH='pbkdf2:sha256:1000')
+    procs = []
+    try:
+        for node in range(nodes):
+            cmd = [sys.executable, os.path.abspath(__file__), '--node', str(node), '--flows', str(args.flows),
+                   '--clients', str(args.clients), '--eval-workers', str(args.eval_workers),
+                   '--llm-latency', str(args.llm_latency), '--questions', str(args.questions)]
+            procs.append(subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+        for proc in procs:
+            assert proc.stdout.readline().strip() == 'ready'
+        started = time.perf_counter()
+        for proc in procs:
+            proc.stdin.write('go\n')
+            proc.stdin.flush()
+        reports = [json.loads(proc.stdout.readline()) for proc in procs]
+        elapsed = time.perf_counter() - started
+        for proc in procs:
+            proc.stdin.write('stop\n')
+            proc.stdin.flush()
+            proc.wait()
+    finally:
+        for proc in procs + [server]:
+            if proc.poll() is None:
+                proc.kill()
+    flows = sum(r['flows'] for r in reports)
+    errors = defaultdict(int)
+    for r in reports:
+        for route, n in r['errors'].items():
+            errors[route] += n
+    return {'nodes': nodes, 'flows': flows, 'elapsed_s': elapsed, 'flows_per_s': flows / elapsed,
+            'errors': dict(errors), 'flow_p50_ms': reports[0]['routes']['flow']['p50_ms'],
+            'save_p50_ms': reports[0]['routes']['save_answer']['p50_ms']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--nodes', default='1,2', help='comma-separated node counts')
+    parser.add_argument('--candidates', type=int, default=50, help='candidates in the seeded store')
+    parser.add_argument('--flows', type=int, default=16, help='flows per node')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent candidates per node')
+    parser.add_argument('--eval-workers', type=int, default=2, help='evaluation workers per node')
+    parser.add_argument('--llm-latency', type=float, default=2.0)
+    parser.add_argument('--questions', type=int, default=5, choices=(5, 10, 15))
+    parser.add_argument('--node', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.node is not None:
+        return run_node(args)
+
+    seed_path = os.path.join(tempfile.mkdtemp(prefix='smarthire-scaleout-'), 'data.json')
+    with open(seed_path, 'w') as f:
+        json.dump(generate_dataset(args.candidates), f)
+    print(f'{args.flows} flows per node, {args.clients} clients and {args.eval_workers} evaluation workers '
+          f'per node, LLM latency {args.llm_latency}s, {args.candidates} candidates seeded, '
+          f'{os.cpu_count()} CPU(s)')
+    print(f"{'nodes':<7}{'flows':>7}{'wall s':>9}{'flows/s':>9}{'scaling':>9}{'flow p50':>10}{'save p50':>10}  errors")
+    base = None
+    for nodes in (int(n) for n in args.nodes.split(',') if n):
+        r = run_cluster(nodes, seed_path, args)
+        base = base or r['flows_per_s'] / nodes
+        print(f"{nodes:<7}{r['flows']:>7}{r['elapsed_s']:>9.2f}{r['flows_per_s']:>9.2f}"
+              f"{r['flows_per_s'] / base:>8.2f}x{r['flow_p50_ms']:>10.0f}{r['save_p50_ms']:>10.1f}  {r['errors'] or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+bench_static.py
+Asset bytes and requests per page view: Flask's default static handling vs fingerprinting.
+
+Loads the login page `--views` times through the test client with a minimal
+browser cache: a response whose Cache-Control allows it (max-age, immutable)
+is reused without a request, otherwise the stored ETag/Last-Modified is sent
+for revalidation. Reports, per mode, the asset requests and bytes of the
+first view and of each repeat view, plus the time spent serving assets.
+The baseline builds the app with STATIC_FINGERPRINTING off.
+
+Usage:
+    python benchmarks/bench_static.py --views 20
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class BrowserCache:
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}       # url -> (fresh until, validators)
+        self.requests = self.bytes = 0
+        self.seconds = 0.0
+
+    def fetch(self, url):
+        fresh_until, validators = self.entries.get(url, (0, {}))
+        if time.time() < fresh_until:
+            return
+        started = time.perf_counter()
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br', **validators})
+        self.seconds += time.perf_counter() - started
+        self.requests += 1
+        self.bytes += len(response.get_data())
+        if response.status_code == 304:
+            return
+        max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        self.entries[url] = (time.time() + int(max_age.group(1)) if max_age else 0, validators)
+
+
+def run(fingerprint: bool, views: int) -> dict:
+    from config import Config
+    Config.STATIC_FINGERPRINTING = fingerprint
+    for name in [m for m in sys.modules if m == 'app']:
+        del sys.modules[name]
+    import app as appmod
+    client = appmod.app.test_client()
+    cache = BrowserCache(client)
+    first = None
+    for view in range(views):
+        html = client.get('/login').get_data(as_text=True)
+        for url in re.findall(r'"(/static/[^"]+)"', html):
+            cache.fetch(url)
+        if view == 0:
+            first = (cache.requests, cache.bytes)
+    repeats = max(1, views - 1)
+    return {'first_requests': first[0], 'first_bytes': first[1],
+            'repeat_requests': (cache.requests - first[0]) / repeats,
+            'repeat_bytes': (cache.bytes - first[1]) / repeats,
+            'asset_ms': cache.seconds * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--views', type=int, default=20)
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    print(f"{'mode':<14}{'1st reqs':>9}{'1st bytes':>11}{'repeat reqs':>13}{'repeat bytes':>14}{'asset ms':>10}")
+    for mode, fingerprint in (('flask default', False), ('fingerprinted', True)):
+        r = run(fingerprint, args.views)
+        print(f"{mode:<14}{r['first_requests']:>9}{r['first_bytes']:>11}{r['repeat_requests']:>13.1f}"
+              f"{r['repeat_bytes']:>14.0f}{r['asset_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
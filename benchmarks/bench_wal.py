@@ -0,0 +1,113 @@
+"""
+bench_wal.py
+Save cost, recovery time and backup size of the 'wal' store vs data.json.
+
+For each store size in `--candidates` a synthetic store is generated (see
+datagen.py) and `--saves` autosave-sized changes (one answer each) are
+saved, as save_data does, through FileStore (the whole document rewritten)
+and WALStore (the change appended to the log, fsynced). Then:
+  recovery  time to open the wal directory with `--history` records
+            written in total, i.e. load the newest snapshot and replay the
+            records after it, for each snapshot interval in `--intervals`
+            (0: no snapshots, the whole log is replayed)
+  backup    bytes a full copy of data.json ships vs an incremental wal
+            backup after the same saves.
+
+Usage:
+    python benchmarks/bench_wal.py --candidates 200,2000 --saves 200 --intervals 100,1000,0
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_flow import summarise
+from benchmarks.datagen import generate_dataset
+from utils.backends import FileStore
+from utils.wal import WALStore, backup
+
+
+def answer_changes(data: dict, count: int):
+    """Yield the document after each of `count` single-answer edits."""
+    answered = [q for c in data['candidates'].values() for iv in c['interviews'] for q in iv['questions']]
+    for n in range(count):
+        answered[n % len(answered)]['answer'] = f'Revised answer number {n} with a little more detail.'
+        yield data
+
+
+def timed_saves(store, data: dict, count: int) -> list:
+    times = []
+    for doc in answer_changes(data, count):
+        started = time.perf_counter()
+        store.write_data(doc, 'save_answer')
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def recovery(data: dict, workdir: str, history: int, interval: int) -> float:
+    directory = os.path.join(workdir, f'recovery-{interval}')
+    store = WALStore(directory, snapshot_every=interval or 10 ** 9, fsync=False)
+    store.write_data(data)
+    for doc in answer_changes(data, history):
+        store.write_data(doc)
+    store._segment.close()
+    store._lockfile.close()
+    started = time.perf_counter()
+    WALStore(directory).version()      # opens: newest snapshot + replay
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--candidates', default='200,2000', help='comma-separated store sizes')
+    parser.add_argument('--saves', type=int, default=200)
+    parser.add_argument('--history', type=int, default=2950, help='records written before the recovery test')
+    parser.add_argument('--intervals', default='100,1000,0', help='comma-separated snapshot intervals')
+    args = parser.parse_args()
+
+    print(f"{'candidates':<12}{'MB':>6}{'store':>7}{'save p50 ms':>13}{'p99 ms':>9}{'backup KB':>11}")
+    for n in (int(c) for c in args.candidates.split(',') if c):
+        workdir = tempfile.mkdtemp(prefix='smarthire-wal-')
+        data = generate_dataset(n)
+        text = json.dumps(data, indent=2)
+        path = os.path.join(workdir, 'data.json')
+        with open(path, 'w') as f:
+            f.write(text)
+
+        file_times = timed_saves(FileStore(path), json.loads(text), args.saves)
+        full_copy = os.path.getsize(path)
+
+        wal_dir = os.path.join(workdir, 'wal')
+        store = WALStore(wal_dir, seed=path, snapshot_every=10 ** 9)
+        store.read()
+        backup(wal_dir, os.path.join(workdir, 'backup'))
+        wal_times = timed_saves(store, json.loads(text), args.saves)
+        shipped = backup(wal_dir, os.path.join(workdir, 'backup'))['bytes']
+
+        mb = len(text) / 1e6
+        for name, times, shipped_bytes in (('file', file_times, full_copy), ('wal', wal_times, shipped)):
+            s = summarise(times)
+            print(f"{n:<12}{mb:>6.1f}{name:>7}{s['p50_ms']:>13.2f}{s['p99_ms']:>9.2f}{shipped_bytes / 1024:>11.1f}")
+
+        for interval in (int(i) for i in args.intervals.split(',') if i):
+            seconds = recovery(json.loads(text), workdir, args.history, interval)
+            every = f'snapshot every {interval}' if interval else 'no snapshots'
+            written = args.history + 1      # the first record holds the whole document
+            replayed = written % interval if interval else written
+            print(f"{'':<12}recovery, {every}: {seconds * 1000:.0f} ms ({replayed} records replayed)")
+        started = time.perf_counter()
+        with open(path) as f:
+            json.loads(f.read())
+        print(f"{'':<12}data.json load: {(time.perf_counter() - started) * 1000:.0f} ms")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
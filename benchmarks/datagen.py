@@ -0,0 +1,175 @@
+"""
+datagen.py
+Synthetic SmartHire data sets for benchmarks.
+
+Generates a data.json-compatible store with N candidates, realistic resumes
+(built from the known skills list) and interview histories drawn from the
+question bank. Every synthetic user shares one password hash so generation
+does not spend minutes in pbkdf2.
+
+Usage:
+    python benchmarks/datagen.py --candidates 10000 --output /tmp/data_10k.json
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from werkzeug.security import generate_password_hash
+
+from utils.resume_parser import KNOWN_SKILLS
+from utils.questions_bank import TECHNICAL_QUESTIONS, MANAGEMENT_QUESTIONS, question_id
+
+BENCH_PASSWORD = 'bench-pass'
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Rohan', 'Ananya', 'Kabir', 'Sana', 'Vikram', 'Priya',
+               'Arjun', 'Nisha', 'Rahul', 'Kavya', 'Aditya', 'Pooja', 'Siddharth', 'Riya', 'Varun', 'Sneha']
+LAST_NAMES = ['Sharma', 'Reddy', 'Iyer', 'Patel', 'Nair', 'Gupta', 'Rao', 'Khan', 'Das', 'Menon']
+
+RESUME_LINES = [
+    'BCA student passionate about building reliable software.',
+    'Built a {a} and {b} project during a college hackathon.',
+    'Completed an internship working with {a}, {b} and {c}.',
+    'Implemented REST microservices using {a} with {b} persistence.',
+    'Led a team of four to deliver a {a} dashboard for the college fest.',
+    'Certified in {a}; comfortable with {b} and {c}.',
+]
+
+ANSWER_WORDS = ('the a system data function class object request memory thread database index query cache '
+                'because therefore example performance design pattern interface service state error test').split()
+
+TECH_SKILLS = [s for s in KNOWN_SKILLS if s in TECHNICAL_QUESTIONS or any(s in k for k in TECHNICAL_QUESTIONS)]
+
+
+def resume_text(rng: random.Random, skills: list) -> str:
+    name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+    lines = [name.upper(), 'TECH SKILLS', ', '.join(s.title() for s in skills)]
+    for _ in range(rng.randint(3, 6)):
+        a, b, c = (rng.choice(skills) for _ in range(3))
+        lines.append(rng.choice(RESUME_LINES).format(a=a, b=b, c=c))
+    lines.append('SOFT SKILLS\nTeamwork\nCommunication\nProblem Solving')
+    return '\n'.join(lines)
+
+
+def synthetic_answer(rng: random.Random, question: str) -> str:
+    if rng.random() < 0.1:
+        return ''
+    words = question.rstrip('?.').split()[:6] + [rng.choice(ANSWER_WORDS) for _ in range(rng.randint(8, 60))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def synthetic_interview(rng: random.Random, skills: list, when: datetime.datetime) -> dict:
+    kind = 'technical' if rng.random() < 0.8 else 'management'
+    if kind == 'technical':
+        pool = [q for s in skills for q in TECHNICAL_QUESTIONS.get(s, [])] or TECHNICAL_QUESTIONS['problem solving']
+    else:
+        pool = MANAGEMENT_QUESTIONS
+    questions = rng.sample(pool, min(len(pool), rng.choice((5, 10, 15))))
+    per_question, items = [], []
+    for q in questions:
+        answer = synthetic_answer(rng, q)
+        ts = 0 if not answer else rng.randint(20, 95)
+        cs = 0 if not answer else rng.randint(20, 95)
+        items.append({'id': question_id(q), 'question': q, 'answer': answer, 'score': 0})
+        per_question.append({'technical_score': ts, 'communication_score': cs, 'feedback': 'Synthetic feedback.'})
+    tech = round(sum(p['technical_score'] for p in per_question) / len(per_question), 1)
+    comm = round(sum(p['communication_score'] for p in per_question) / len(per_question), 1)
+    overall = round(tech * 0.6 + comm * 0.4, 1)
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'date': when.isoformat(),
+        'started_at': when.isoformat(),
+        'deadline': (when + datetime.timedelta(seconds=180 * len(items))).isoformat(),
+        'type': kind,
+        'questions': items,
+        'scores': {'technical': tech, 'communication': comm, 'overall': overall, 'per_question': per_question},
+        'result': 'selected' if overall >= 60 else 'rejected',
+        'feedback': f'✅ You answered {sum(1 for q in items if q["answer"])}/{len(items)} questions.',
+        'duration_seconds': rng.randint(60, 180 * len(items)),
+        'revision': len(items),
+    }
+
+
+def generate_dataset(candidates: int, seed: int = 42, max_interviews: int = 3) -> dict:
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    start = datetime.datetime(2025, 1, 1)
+    data = {'users': {}, 'candidates': {}}
+    for i in range(candidates):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        skills = rng.sample(TECH_SKILLS, rng.randint(3, 8))
+        created = start + datetime.timedelta(minutes=i)
+        data['users'][user_id] = {
+            'id': user_id, 'name': name, 'email': f'bench{i}@example.com',
+            'password_hash': password_hash, 'role': 'candidate', 'created_at': created.isoformat(),
+        }
+        interviews = [
+            synthetic_interview(rng, skills, created + datetime.timedelta(days=d + 1))
+            for d in range(rng.randint(0, max_interviews))
+        ]
+        data['candidates'][user_id] = {
+            'user_id': user_id,
+            'resume_text': resume_text(rng, skills),
+            'skills': skills,
+            'interviews': interviews,
+            'asked_questions': [q['question'] for iv in interviews for q in iv['questions']],
+        }
+    admin_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    data['users'][admin_id] = {
+        'id': admin_id, 'name': 'Bench Admin', 'email': 'admin@example.com',
+        'password_hash': password_hash, 'role': 'admin', 'created_at': start.isoformat(),
+    }
+    return data
+
+
+def make_resume_pdf(text: str) -> bytes:
+    """Minimal single-page PDF (Helvetica text) that PyPDF2 can extract."""
+    lines = [l.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for l in text.splitlines()]
+    ops = ['BT', '/F1 11 Tf', '14 TL', '50 780 Td'] + [f'({l}) Tj T*' for l in lines] + ['ET']
+    stream = '\n'.join(ops).encode('latin-1', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % i + obj + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for off in offsets:
+        out.write(b'%010d 00000 n \n' % off)
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-interviews', type=int, default=3)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+    data = generate_dataset(args.candidates, args.seed, args.max_interviews)
+    with open(args.output, 'w') as f:
+        json.dump(data, f)
+    print(f'Wrote {args.candidates} candidates to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+llm_stub.py
+Offline stand-in for google.generativeai used by the benchmarks.
+
+It answers the prompt shapes the app sends (question generation, answer
+evaluation, batched evaluation (see utils/eval_batcher.py) and streamed
+JSON-lines evaluation) with well-formed JSON after an optional simulated
+latency; stream=True responses arrive in small chunks spread over it. `concurrency` caps
+simultaneous requests the way a provider rate limit would. This exercises the Gemini code paths and their parsing without
+network access or API cost.
+"""
+import json
+import re
+import threading
+import time
+
+_QA = re.compile(r'^Q(\d+): ', re.M)
+_INTERVIEW = re.compile(r'^### Interview \d+$', re.M)
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _stub_evaluation(qa_text: str) -> dict:
+    count = len(_QA.findall(qa_text))
+    evaluations = [
+        {'q_index': i, 'technical_score': 55 + (i * 7) % 40, 'communication_score': 60 + (i * 5) % 35,
+         'question_feedback': 'Stub feedback: clear answer, add a concrete example.'}
+        for i in range(1, count + 1)
+    ]
+    return {
+        'evaluations': evaluations,
+        'overall_strengths': 'Stub strengths.',
+        'overall_improvements': 'Stub improvements.',
+        'recommended_topics': ['stub topic'],
+    }
+
+
+class StubModel:
+    def __init__(self, name: str, latency: float = 0.0, genai=None):
+        self.name = name
+        self.latency = latency
+        self.genai = genai
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        if self.genai is not None:
+            if stream:
+                return self._limited_stream(prompt)
+            with self.genai.slots:
+                with self.genai.lock:
+                    self.genai.calls += 1
+                return self._generate(prompt, stream)
+        return self._generate(prompt, stream)
+
+    def _limited_stream(self, prompt: str):
+        # A streamed request holds its slot until the last chunk has arrived
+        with self.genai.slots:
+            with self.genai.lock:
+                self.genai.calls += 1
+            yield from self._generate(prompt, True)
+
+    def _generate(self, prompt: str, stream: bool = False):
+        if 'JSON Lines' in prompt:
+            result = _stub_evaluation(prompt)
+            lines = [json.dumps(e) for e in result.pop('evaluations')] + [json.dumps(result)]
+            if stream:
+                return self._stream(lines)
+            if self.latency:
+                time.sleep(self.latency)
+            return _Response('\n'.join(lines))
+        if self.latency:
+            time.sleep(self.latency)
+        if 'interview evaluator' in prompt:
+            sections = _INTERVIEW.split(prompt)
+            if len(sections) > 1:
+                interviews = [dict(_stub_evaluation(section), interview_index=i)
+                              for i, section in enumerate(sections[1:], 1)]
+                return _Response('```json\n' + json.dumps({'interviews': interviews}) + '\n```')
+            return _Response('```json\n' + json.dumps(_stub_evaluation(prompt)) + '\n```')
+        m = re.search(r'Generate exactly (\d+)', prompt)
+        count = int(m.group(1)) if m else 5
+        stamp = time.perf_counter_ns()
+        return _Response(json.dumps([f'Stub generated question {stamp}-{i}?' for i in range(count)]))
+
+    def _stream(self, lines: list):
+        # Lines arrive evenly over the latency, in chunks that don't respect line boundaries
+        text = '\n'.join(lines)
+        per_char = self.latency / len(text) if self.latency else 0
+        for start in range(0, len(text), 40):
+            chunk = text[start:start + 40]
+            if per_char:
+                time.sleep(per_char * len(chunk))
+            yield _Response(chunk)
+
+
+class StubGenAI:
+    """Drop-in for the google.generativeai module surface the app uses."""
+
+    def __init__(self, latency: float = 0.0, concurrency: int = 0):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else _NoLimit()
+
+    def configure(self, **kwargs):
+        pass
+
+    def GenerativeModel(self, name: str):
+        return StubModel(name, self.latency, self)
+
+
+class _NoLimit:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def install(latency: float = 0.0, concurrency: int = 0):
+    """Route utils.integrations' Gemini singleton to the stub."""
+    from utils import integrations
+    integrations._genai = StubGenAI(latency, concurrency)
+    integrations._genai_loaded = True
+    return integrations._genai
+
+
+def uninstall():
+    """Make Gemini unavailable so the rule-based paths are used."""
+    from utils import integrations
+    integrations._genai = None
+    integrations._genai_loaded = True
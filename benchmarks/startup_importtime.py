@@ -0,0 +1,108 @@
+"""
+startup_importtime.py
+Startup benchmark: how long a fresh worker takes to import the app.
+
+Each gunicorn worker (without --preload) imports app.py on spawn and again on
+every recycle, so this is paid per worker per max_requests. The benchmark runs
+`python -X importtime -c "import app"` in fresh interpreters, reports the
+median import time and the slowest modules, and can fail when a budget is
+exceeded or when a module that should be lazy shows up at boot.
+
+Usage:
+    python benchmarks/startup_importtime.py [--runs 5] [--budget-ms 400]
+        [--output benchmarks/results/startup.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use (see utils/integrations.py)
+LAZY_MODULES = ['google.generativeai', 'flask_mail', 'PyPDF2']
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def _run_once(target: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise SystemExit(f'import {target} failed:\n{proc.stderr[-2000:]}')
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules[m.group(4)] = {'self_us': int(m.group(1)), 'cumulative_us': int(m.group(2))}
+    return {'wall_ms': wall_ms, 'modules': modules}
+
+
+def run(target: str = 'app', runs: int = 5) -> dict:
+    samples = [_run_once(target) for _ in range(runs)]
+    import_ms = [s['modules'].get(target, {}).get('cumulative_us', 0) / 1000 for s in samples]
+    wall_ms = [s['wall_ms'] for s in samples]
+
+    # Per-module median of cumulative time across runs
+    names = set().union(*(s['modules'] for s in samples))
+    per_module = {
+        name: statistics.median(s['modules'].get(name, {}).get('cumulative_us', 0) for s in samples) / 1000
+        for name in names
+    }
+    top = sorted(per_module.items(), key=lambda kv: kv[1], reverse=True)[:20]
+
+    return {
+        'target': target,
+        'runs': runs,
+        'python': sys.version.split()[0],
+        'import_ms_median': round(statistics.median(import_ms), 2),
+        'import_ms_min': round(min(import_ms), 2),
+        'process_wall_ms_median': round(statistics.median(wall_ms), 2),
+        'module_count': len(names),
+        'eager_lazy_modules': [m for m in LAZY_MODULES if m in names],
+        'top_modules_ms': [{'module': n, 'cumulative_ms': round(ms, 2)} for n, ms in top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail if the median import time exceeds this')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'startup.json'))
+    args = parser.parse_args()
+
+    report = run(args.target, args.runs)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"import {report['target']}: median {report['import_ms_median']} ms "
+          f"(process {report['process_wall_ms_median']} ms, {report['module_count']} modules)")
+    for row in report['top_modules_ms'][:10]:
+        print(f"  {row['cumulative_ms']:>9.2f} ms  {row['module']}")
+    print(f'Results written to {args.output}')
+
+    failed = False
+    if report['eager_lazy_modules']:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(report['eager_lazy_modules'])}")
+        failed = True
+    if args.budget_ms is not None and report['import_ms_median'] > args.budget_ms:
+        print(f"FAIL: median import time {report['import_ms_median']} ms exceeds budget {args.budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,119 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
+    # Where shared state lives (utils/backends.py). The defaults keep it in data.json and this
+    # process: one worker process. 'sqlite' shares it between the worker processes of a host,
+    # 'remote' between nodes through a state server (python -m utils.state_server).
+    STORE_BACKEND = os.environ.get('SMARTHIRE_STORE_BACKEND', 'file')     # file | memory | sqlite | remote | wal
+    LOCK_BACKEND = os.environ.get('SMARTHIRE_LOCK_BACKEND', 'memory')     # memory | sqlite | remote
+    QUEUE_BACKEND = os.environ.get('SMARTHIRE_QUEUE_BACKEND', 'memory')   # evaluation jobs; same choices
+    CACHE_BACKEND = os.environ.get('SMARTHIRE_CACHE_BACKEND', 'memory')   # rendered result pages; same choices
+    DATA_FILE = 'data.json'
+    STATE_DB = 'state.db'
+    STATE_SERVER = os.environ.get('SMARTHIRE_STATE_SERVER', '127.0.0.1:7070')
+    STORE_LOCK_TIMEOUT = 10             # seconds a write waits for the store lock before answering 503
+    STORE_LOCK_LEASE = 30               # seconds before a crashed holder's store lock expires
+
+    # 'wal' store (one process): snapshots plus a log of each save's changes in WAL_DIR, seeded
+    # from DATA_FILE on first start; backups and point-in-time restores with python -m utils.wal
+    WAL_DIR = os.environ.get('SMARTHIRE_WAL_DIR', 'wal')
+    WAL_SEGMENT_BYTES = 8 * 1024 * 1024
+    WAL_SNAPSHOT_RECORDS = 1000         # saves between snapshots: bounds the replay on start
+    WAL_KEEP_SNAPSHOTS = 2              # older snapshots and the log they need are compacted away
+    WAL_FSYNC = True                    # each save is on disk before the request answers
+
+    # Optional ASGI serving (asgi.py): autosave, interview fetches and result streams run as
+    # coroutines; every other route runs on a pool of threads, as under a WSGI server
+    ASYNC_WSGI_THREADS = 8              # threads running the Flask routes
+    ASYNC_STORE_THREADS = 4             # threads for local store I/O and JSON (de)serialisation
+
+    # Content-hashed static URLs served gzip/brotli-compressed with year-long cache headers
+    STATIC_FINGERPRINTING = True
+
+    # Interview timing (enforced server-side; see utils/interview_timer.py)
+    INTERVIEW_SECONDS_PER_QUESTION = 180
+    INTERVIEW_GRACE_SECONDS = 30        # allowance for the client's final autosave/submit
+    INTERVIEW_SWEEPER_ENABLED = True
+    INTERVIEW_SWEEP_MAX_SLEEP = 30      # seconds between sweeper wake-ups when idle
+
+    # Cohorts: interviews scheduled for a group in one go, ranked on a leaderboard (utils/leaderboard.py)
+    COHORT_MAX_MEMBERS = 2000           # candidates invited per cohort
+    COHORT_PAGE_SIZE = 50               # leaderboard rows per page
+
+    # Observability: Prometheus /metrics and opt-in per-request cProfile dumps
+    METRICS_ENABLED = os.environ.get('SMARTHIRE_METRICS', '0') == '1'
+    METRICS_TOKEN = os.environ.get('SMARTHIRE_METRICS_TOKEN', '')   # bearer token for scrapers
+    PROFILING_ENABLED = os.environ.get('SMARTHIRE_PROFILING', '0') == '1'
+    PROFILE_DIR = 'profiles'
+
+    # Full-text (BM25) index over resumes and answers; see utils/text_index.py
+    SEARCH_INDEX_DIR = 'search_index'
+
+    # Question bank source; compiled next to it (.bin) and memory-mapped, reloaded when either
+    # file changes (see utils/compiled_bank.py and utils/questions_bank.py)
+    QUESTION_BANK_FILE = os.environ.get('SMARTHIRE_QUESTION_BANK',
+                                        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'question_bank.json'))
+    QUESTION_BANK_RELOAD_SECONDS = 2
+
+    # LLM-generated questions for skills the static bank lacks; see utils/generated_bank.py
+    GENERATED_QUESTIONS_FILE = 'generated_questions.json'
+    GENERATED_QUESTIONS_MIN_STOCK = 20  # refill a skill in the background below this
+    GENERATED_QUESTIONS_BATCH = 10
+
+    # Reject questions whose Jaccard similarity to one the candidate has seen is at least this
+    QUESTION_SIMILARITY_THRESHOLD = 0.7
+    QUESTION_SIMILARITY_CACHE = 20000   # questions kept in the near-duplicate index (LRU)
+
+    # Pick questions near a target difficulty calibrated from past answers (utils/question_difficulty.py);
+    # the target rises with the candidate's last score. Off: uniform random picks.
+    ADAPTIVE_DIFFICULTY_ENABLED = True
+
+    # Flag answers to the same question from different candidates at or above this similarity
+    ANSWER_SIMILARITY_THRESHOLD = 0.8
+    # Signatures of past answers, saved by the backfill (python -m utils.answer_similarity)
+    ANSWER_SIGNATURES_FILE = 'answer_signatures.bin'
+
+    # Micro-batched Gemini evaluation across concurrent submissions; see utils/eval_batcher.py
+    EVAL_BATCHING_ENABLED = os.environ.get('SMARTHIRE_EVAL_BATCHING', '1') == '1'
+    EVAL_BATCH_WINDOW = 0.25            # seconds to wait for more submissions
+    EVAL_BATCH_MAX = 8                  # interviews per request
+    EVAL_BATCH_TOKEN_BUDGET = 6000      # estimated prompt + completion tokens per request
+
+    # Submitted interviews are evaluated in the background and streamed to the results page
+    EVAL_STREAM_WORKERS = 8             # evaluations this process runs at once (jobs come from QUEUE_BACKEND)
+    RESULT_STREAM_TIMEOUT = 120         # seconds a stream waits on another worker's evaluation
+    EVAL_LEASE_SECONDS = 600            # an evaluation queued this long ago and unfinished is queued again
+    RESULT_PAGE_CACHE_SIZE = 512        # rendered result bodies kept by the cache backend (utils/result_pages.py)
+
+    # Password hashing runs on a bounded pool; see utils/password_hashing.py. Changing the
+    # method re-hashes each user's password at their next login.
+    PASSWORD_HASH_METHOD = os.environ.get('SMARTHIRE_PASSWORD_HASH', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = None        # concurrent hashes (default: half the CPU cores)
+    PASSWORD_HASH_MAX_PENDING = 64      # queued + running hashes before logins get 503
+    ACCOUNT_CLAIM_SECONDS = 24 * 3600   # lifetime of the emailed link that claims a bulk-imported account
+
+    # Admission control for expensive candidate routes (utils/rate_limit.py): per-user token
+    # buckets plus a cap on concurrent requests per route; over the limit -> 429 + Retry-After.
+    # 'memory' counts per process; 'sqlite' shares the counters between worker processes.
+    RATE_LIMIT_ENABLED = os.environ.get('SMARTHIRE_RATE_LIMIT', '1') == '1'
+    RATE_LIMIT_BACKEND = os.environ.get('SMARTHIRE_RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_DB = 'ratelimit.db'
+    RATE_LIMIT_LEASE = 300              # seconds before a crashed worker's running slot is reclaimed
+    RATE_LIMITS = {
+        'upload_resume': {'per_minute': 4, 'burst': 3, 'concurrency': 2},
+        'start_interview': {'per_minute': 6, 'burst': 3, 'concurrency': 4},
+        'submit_interview': {'per_minute': 6, 'burst': 3, 'concurrency': 4},
+    }
+
     # Email settings (used for sending results)
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
-    MAIL_PORT =  587
-    MAIL_USE_TLS = True
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
     MAIL_USERNAME = os.environ.get('rishithamb5@gmail.com')
     MAIL_PASSWORD = os.environ.get('Rishi@702213')
-    MAIL_DEFAULT_SENDER = 'noreply@smarthire.ai'
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = 'noreply@smarthire.ai'
+
+    # Bulk result notification (utils/notifier.py)
+    NOTIFY_STATUS_FILE = 'notifications.json'
+    NOTIFY_WORKERS = 2                  # pooled SMTP connections / sender threads
+    NOTIFY_RATE = 5.0                   # messages per second across all workers
\ No newline at end of file
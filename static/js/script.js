@@ -32,14 +32,38 @@ document.addEventListener("DOMContentLoaded", function () {
 });
 
 // ── Interview Room (only on interview page) ──────────────────
+// The page ships without question data; the payload is fetched from
+// /api/interview/<id> (revalidated with ETag, so reloads are a cheap 304)
+// and the room boots once it has rendered the first question.
 if (document.getElementById("questionContainer")) {
+  const container = document.getElementById("questionContainer");
+  fetch(container.dataset.apiUrl, { credentials: "same-origin" })
+    .then(res => {
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      return res.json();
+    })
+    .then(payload => initInterviewRoom(payload, container))
+    .catch(() => {
+      container.innerHTML = '<div class="alert alert-danger mb-0">Could not load the interview. Please refresh the page.</div>';
+    });
+}
+
+function escapeHtml(text) {
+  return String(text)
+    .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;")
+    .replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+}
+
+function initInterviewRoom(interview, qContainer) {
 
   /* --- State --- */
   let currentIndex = 0;
   const questions    = interview.questions;
   const total        = questions.length;
-  const TIME_PER_Q   = 3 * 60;           // 3 minutes per question
-  let   timeLeft     = total * TIME_PER_Q;
+  const TIME_PER_Q   = interview.time_per_question || Number(qContainer.dataset.timePerQuestion) || 3 * 60;
+  // The deadline is enforced server-side; the page tells us what is left of it
+  const remaining    = Number(qContainer.dataset.remainingSeconds);
+  let   timeLeft     = Number.isFinite(remaining) ? remaining : total * TIME_PER_Q;
   let   timerInterval = null;
   let   saveTimer     = null;
   let   recognition   = null;
@@ -47,7 +71,6 @@ if (document.getElementById("questionContainer")) {
 
   /* --- DOM refs --- */
   const progressBar      = document.getElementById("progressBar");
-  const qContainer       = document.getElementById("questionContainer");
   const prevBtn          = document.getElementById("prevBtn");
   const nextBtn          = document.getElementById("nextBtn");
   const timerEl          = document.getElementById("timer");
@@ -65,14 +88,14 @@ if (document.getElementById("questionContainer")) {
         <h5 class="mb-1" style="font-size:0.85rem;text-transform:uppercase;letter-spacing:0.05em;opacity:0.6">
           Question ${idx + 1} of ${total}
         </h5>
-        <p class="lead fw-semibold mb-3" style="font-size:1.05rem">${q.question}</p>
+        <p class="lead fw-semibold mb-3" style="font-size:1.05rem">${escapeHtml(q.question)}</p>
         <textarea
           class="form-control"
           id="answerArea"
           rows="6"
           placeholder="Type your answer here… Be specific and use examples."
           style="${textareaStyle}border-radius:12px!important;resize:vertical;line-height:1.6"
-        >${q.answer || ""}</textarea>
+        >${escapeHtml(q.answer || "")}</textarea>
 
         <div class="d-flex align-items-center gap-3 mt-2 flex-wrap">
           <button class="voice-btn btn" id="voiceBtn" onclick="toggleVoice()" type="button">
@@ -102,6 +125,8 @@ if (document.getElementById("questionContainer")) {
       ? "btn btn-success"
       : "btn btn-outline-primary";
 
+    updateSidebar(idx);
+
     // Word count listener
     document.getElementById("answerArea").addEventListener("input", function () {
       updateWordCount(this.value);
@@ -114,6 +139,26 @@ if (document.getElementById("questionContainer")) {
     initVoice();
   }
 
+  /* ---- Sidebar pills ---- */
+  function updateSidebar(idx) {
+    document.querySelectorAll(".q-pill").forEach((p, i) => {
+      p.style.background = i === idx ? "rgba(79,70,229,0.1)" : "";
+      p.style.fontWeight = i === idx ? "600" : "";
+    });
+    document.querySelectorAll(".q-dot").forEach((dot, i) => {
+      const ans = ((questions[i] && questions[i].answer) || "").trim();
+      dot.style.background = ans ? "#059669" : (i === idx ? "#4f46e5" : "#e2e8f0");
+      dot.style.color = ans || i === idx ? "#fff" : "#64748b";
+    });
+  }
+
+  // Called by the inline onclick on each sidebar pill
+  window.jumpTo = function (idx) {
+    saveCurrentAnswer();
+    currentIndex = idx;
+    renderQuestion(idx);
+  };
+
   /* ---- Word count ---- */
   function updateWordCount(text) {
     const words = text.trim() ? text.trim().split(/\s+/).length : 0;
@@ -129,7 +174,8 @@ if (document.getElementById("questionContainer")) {
       const fd = new FormData();
       fd.append("q_index", idx);
       fd.append("answer", answer);
-      await fetch("/save_answer", { method: "POST", body: fd });
+      const res = await fetch("/save_answer", { method: "POST", body: fd });
+      if (res.status === 409) { submitInterview(); return; }  // time is over server-side
       questions[idx].answer = answer;
       const ind = document.getElementById("saveIndicator");
       if (ind) { ind.classList.add("show"); setTimeout(() => ind.classList.remove("show"), 2000); }
@@ -195,10 +241,19 @@ if (document.getElementById("questionContainer")) {
     if (confirm(msg)) submitInterview();
   }
 
+  let submitted = false;
   function submitInterview() {
+    if (submitted) return;
+    submitted = true;
     clearInterval(timerInterval);
     fetch("/submit_interview", { method: "POST" })
       .then(res => {
+        if (res.status === 429) {
+          // Server is shedding load: the answers are saved, so retry when it says to
+          const wait = parseInt(res.headers.get("Retry-After") || "2", 10);
+          setTimeout(() => { submitted = false; submitInterview(); }, wait * 1000);
+          return;
+        }
         if (res.redirected) window.location.href = res.url;
         else window.location.href = "/dashboard";
       })
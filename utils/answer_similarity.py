@@ -0,0 +1,341 @@
+"""
+answer_similarity.py
+Flags near-identical answers to the same question across candidates.
+
+Answers are grouped by question id. Within a group every answer's word
+3-gram shingles get a one-permutation MinHash signature (each shingle is
+hashed once into one of NUM_BINS bins, keeping the minimum per bin, with
+empty bins densified from their right neighbour), which is ~20x cheaper
+than one hash per permutation. LSH bands over the signature put
+near-identical answers in a shared bucket, so a new answer is only compared
+with the few answers it collides with instead of every earlier answer.
+Pairs from different candidates whose estimated Jaccard similarity is at
+least `threshold` become edges, and the connected components of those edges
+are the clusters shown to reviewers.
+
+The index lives in memory. build() is incremental (only interviews it has
+not seen are hashed) and hashes in-process, since it runs on the request
+path. A large backlog is hashed once, on a process pool, by the backfill
+CLI, which saves the signatures to a file (see save_signatures); the first
+build() of each process reuses them instead of hashing again:
+
+    python -m utils.answer_similarity data.json --workers 8
+
+Signature file: a header (magic, version, record count), then per answer
+u32 key length, the UTF-8 key, u32 crc32 of the answer text (a changed
+answer is hashed again) and NUM_BINS u32 signature values, little-endian.
+"""
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.questions_bank import question_id
+
+NUM_BINS = 64           # must be a power of two
+BANDS = 16              # 4 rows per band: pairs above ~0.5 Jaccard collide in some band
+MIN_WORDS = 8           # shorter answers ("I don't know") match each other by chance
+PARALLEL_MIN = 2000     # answers to hash before a process pool is worth starting
+
+MAGIC = b'SHAS'
+VERSION = 1
+_HEADER = struct.Struct('<4sII')        # magic, version, records
+_U32 = struct.Struct('<I')
+_BIN_BITS = NUM_BINS.bit_length() - 1
+_WORDS = re.compile(r'[a-z0-9+#]+')
+
+
+def answer_signature(text: str):
+    """MinHash signature of an answer's word 3-grams, or None if it is too short to compare."""
+    words = _WORDS.findall((text or '').lower())
+    if len(words) < MIN_WORDS:
+        return None
+    signature = [None] * NUM_BINS
+    for i in range(len(words) - 2):
+        # crc32 rather than hash() so signatures agree across processes
+        h = zlib.crc32(' '.join(words[i:i + 3]).encode('utf-8'))
+        b, value = h & (NUM_BINS - 1), h >> _BIN_BITS
+        if signature[b] is None or value < signature[b]:
+            signature[b] = value
+    if None not in signature:
+        return tuple(signature)
+    # Densify: an empty bin borrows the next non-empty bin's value, tagged with the distance
+    dense = list(signature)
+    for i in range(NUM_BINS):
+        if signature[i] is None:
+            j, distance = (i + 1) % NUM_BINS, 1
+            while signature[j] is None:
+                j, distance = (j + 1) % NUM_BINS, distance + 1
+            dense[i] = signature[j] + (distance << (32 - _BIN_BITS))
+    return tuple(dense)
+
+
+def _signatures(items: list) -> list:
+    return [(key, answer_signature(text)) for key, text in items]
+
+
+def _text_crc(text: str) -> int:
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def hash_answers(items: list, workers: int = None) -> dict:
+    """answer_key -> signature for [(answer_key, text)], on a process pool for large backlogs."""
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(items) < PARALLEL_MIN:
+        return dict(_signatures(items))
+    chunk = max(500, len(items) // (workers * 4))
+    chunks = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return {key: sig for part in pool.map(_signatures, chunks) for key, sig in part}
+
+
+def save_signatures(path: str, signatures: dict):
+    """Write {answer_key: (text crc32, signature)} to path, replacing it in one rename."""
+    fd, tmp = tempfile.mkstemp(prefix='.answer_signatures.', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(signatures)))
+            for key, (crc, signature) in signatures.items():
+                encoded = key.encode('utf-8')
+                values = array('I', signature)
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                f.write(_U32.pack(len(encoded)) + encoded + _U32.pack(crc) + values.tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def load_signatures(path: str) -> dict:
+    """{answer_key: (text crc32, signature)} saved by save_signatures; {} if there is no usable file."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return {}
+    if len(data) < _HEADER.size:
+        return {}
+    magic, version, count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return {}
+    signatures, offset, width = {}, _HEADER.size, NUM_BINS * 4
+    for _ in range(count):
+        (length,) = _U32.unpack_from(data, offset)
+        key = data[offset + 4:offset + 4 + length].decode('utf-8')
+        offset += 4 + length
+        (crc,) = _U32.unpack_from(data, offset)
+        values = array('I', data[offset + 4:offset + 4 + width])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        signatures[key] = (crc, tuple(values))
+        offset += 4 + width
+    return signatures
+
+
+def interview_answers(candidate_id: str, iv: dict) -> list:
+    """[(answer_key, (candidate_id, interview_id, q_index, question_id), text)] for an evaluated interview."""
+    rows = []
+    for i, q in enumerate(iv.get('questions', [])):
+        if (q.get('answer') or '').strip():
+            meta = (candidate_id, iv['id'], i, q.get('id') or question_id(q['question']))
+            rows.append((f"{iv['id']}:{i}", meta, q['answer']))
+    return rows
+
+
+class AnswerSimilarityIndex:
+    def __init__(self, threshold: float = 0.8, signatures_file: str = None):
+        self.threshold = threshold
+        self.signatures_file = signatures_file     # backfilled signatures, read by the first build()
+        self._lock = threading.RLock()
+        self._meta = {}         # answer_key -> (candidate_id, interview_id, q_index, question_id)
+        self._signatures = {}   # answer_key -> signature
+        self._buckets = {}      # (question_id, band, band hash) -> set of answer_keys
+        self._edges = {}        # answer_key -> {answer_key: similarity}
+        self._interviews = {}   # interview_id -> [answer_key]
+        self._rows = NUM_BINS // BANDS
+        # Store version the index reflects; see app.save_data
+        self.synced_version = None
+
+    # ---------------------------------------------------------------- updates
+    def build(self, data: dict, version=None):
+        """Bring the index in line with the store: hash new interviews, drop deleted ones."""
+        live = {}
+        for cid, cand in data.get('candidates', {}).items():
+            for iv in cand.get('interviews', []):
+                if iv.get('result') in ('selected', 'rejected'):
+                    live[iv['id']] = (cid, iv)
+        with self._lock:
+            for interview_id in set(self._interviews) - set(live):
+                self.remove_interview(interview_id)
+            pending = [row for interview_id, (cid, iv) in live.items() if interview_id not in self._interviews
+                       for row in interview_answers(cid, iv)]
+            new_ids = [interview_id for interview_id in live if interview_id not in self._interviews]
+        signatures = self._hash([(key, text) for key, _, text in pending])
+        self.signatures_file = None     # backfill consumed; later builds only see new interviews
+        with self._lock:
+            for interview_id in new_ids:
+                self._interviews.setdefault(interview_id, [])
+            for key, meta, _ in pending:
+                self._insert(key, meta, signatures[key])
+            self.synced_version = version
+
+    def _hash(self, items: list) -> dict:
+        """Signatures of [(answer_key, text)]: backfilled ones where the text is unchanged, the rest hashed here."""
+        saved = load_signatures(self.signatures_file) if self.signatures_file and items else {}
+        signatures, missing = {}, []
+        for key, text in items:
+            entry = saved.get(key)
+            if entry is not None and entry[0] == _text_crc(text):
+                signatures[key] = entry[1]
+            else:
+                missing.append((key, text))
+        signatures.update(_signatures(missing))
+        return signatures
+
+    def add_interview(self, candidate_id: str, iv: dict):
+        """Index a just-evaluated interview (called from submit)."""
+        rows = interview_answers(candidate_id, iv)
+        signatures = dict(_signatures([(key, text) for key, _, text in rows]))
+        with self._lock:
+            if iv['id'] in self._interviews:
+                self.remove_interview(iv['id'])
+            self._interviews[iv['id']] = []
+            for key, meta, _ in rows:
+                self._insert(key, meta, signatures[key])
+
+    def _insert(self, key, meta, signature):
+        self._interviews.setdefault(meta[1], []).append(key)
+        if signature is None:
+            return
+        self._meta[key] = meta
+        self._signatures[key] = signature
+        candidate_id, qid = meta[0], meta[3]
+        candidates = set()
+        for band in range(BANDS):
+            bucket = self._buckets.setdefault(
+                (qid, band, hash(signature[band * self._rows:(band + 1) * self._rows])), set())
+            candidates |= bucket
+            bucket.add(key)
+        for other in candidates:
+            if self._meta[other][0] == candidate_id:
+                continue    # a candidate re-using their own earlier answer isn't copying
+            other_sig = self._signatures[other]
+            similarity = sum(a == b for a, b in zip(signature, other_sig)) / NUM_BINS
+            if similarity >= self.threshold:
+                self._edges.setdefault(key, {})[other] = similarity
+                self._edges.setdefault(other, {})[key] = similarity
+
+    def remove_interview(self, interview_id: str):
+        with self._lock:
+            for key in self._interviews.pop(interview_id, []):
+                meta = self._meta.pop(key, None)
+                signature = self._signatures.pop(key, None)
+                if meta is None:
+                    continue
+                for band in range(BANDS):
+                    bucket_key = (meta[3], band, hash(signature[band * self._rows:(band + 1) * self._rows]))
+                    bucket = self._buckets.get(bucket_key)
+                    if bucket is not None:
+                        bucket.discard(key)
+                        if not bucket:
+                            del self._buckets[bucket_key]
+                for other in self._edges.pop(key, {}):
+                    edges = self._edges.get(other)
+                    if edges is not None:
+                        edges.pop(key, None)
+                        if not edges:
+                            del self._edges[other]
+
+    # ---------------------------------------------------------------- queries
+    def _cluster(self, key) -> list:
+        seen, stack = {key}, [key]
+        while stack:
+            for other in self._edges.get(stack.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        seen.discard(key)
+        return sorted(seen)
+
+    def flags_for_interview(self, interview_id: str) -> dict:
+        """
+        q_index -> [{'candidate_id', 'interview_id', 'q_index', 'similarity'}]
+        for every answer of the interview that sits in a cluster; similarity
+        is to this answer when the two are directly linked, else None.
+        """
+        with self._lock:
+            flags = {}
+            for key in self._interviews.get(interview_id, []):
+                if key not in self._edges:
+                    continue
+                direct = self._edges[key]
+                flags[self._meta[key][2]] = [
+                    {'candidate_id': m[0], 'interview_id': m[1], 'q_index': m[2],
+                     'similarity': round(direct[other], 2) if other in direct else None}
+                    for other in self._cluster(key) for m in (self._meta[other],)
+                ]
+            return flags
+
+    def flagged_counts(self) -> dict:
+        """interview_id -> number of its answers that sit in a cluster."""
+        with self._lock:
+            counts = {}
+            for key in self._edges:
+                interview_id = self._meta[key][1]
+                counts[interview_id] = counts.get(interview_id, 0) + 1
+            return counts
+
+    def clusters(self) -> list:
+        """Every cluster as a sorted list of answer metas, largest first."""
+        with self._lock:
+            seen, result = set(), []
+            for key in self._edges:
+                if key in seen:
+                    continue
+                members = [key] + self._cluster(key)
+                seen.update(members)
+                result.append(sorted(self._meta[k] for k in members))
+            return sorted(result, key=len, reverse=True)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import time
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Backfill answer-similarity flags over historical interviews.')
+    parser.add_argument('data_file', nargs='?', default='data.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threshold', type=float, default=Config.ANSWER_SIMILARITY_THRESHOLD)
+    parser.add_argument('--signatures', default=Config.ANSWER_SIGNATURES_FILE,
+                        help='file the signatures are saved to, for the app to load')
+    args = parser.parse_args()
+
+    with open(args.data_file) as f:
+        store = json.load(f)
+    started = time.perf_counter()
+    texts = {key: text for cid, cand in store.get('candidates', {}).items() for iv in cand.get('interviews', [])
+             if iv.get('result') in ('selected', 'rejected') for key, _, text in interview_answers(cid, iv)}
+    hashed = hash_answers(list(texts.items()), args.workers)
+    save_signatures(args.signatures, {key: (_text_crc(texts[key]), sig)
+                                      for key, sig in hashed.items() if sig is not None})
+    index = AnswerSimilarityIndex(args.threshold, args.signatures)
+    index.build(store)
+    names = {uid: u.get('name', uid) for uid, u in store.get('users', {}).items()}
+    found = index.clusters()
+    print(f'Indexed {len(index._meta)} answers in {time.perf_counter() - started:.2f}s '
+          f'(signatures saved to {args.signatures}); {len(found)} clusters of near-identical answers')
+    for members in found:
+        print(f'- question {members[0][3]}:')
+        for cid, interview_id, q_index, _ in members:
+            print(f'    {names.get(cid, cid)}  interview {interview_id}  Q{q_index + 1}')
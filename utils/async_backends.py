@@ -0,0 +1,207 @@
+"""
+async_backends.py
+Coroutine front ends to the store and lock backends (utils/backends.py),
+for the async endpoints in asgi.py.
+
+The remote backends get a native asyncio client for the state server
+protocol (utils/state_server.py), so a request waiting on the store or a
+lock holds a socket, not a thread. The local backends (file, sqlite,
+memory) run their short blocking calls on a thread pool, and lock waits
+are retried from the event loop instead of parking a thread. Coroutines
+waiting for the same lock queue on an asyncio.Lock, held from acquire() to
+release(), so only the first in line contends for the shared one.
+
+They wrap the app's own store and locks objects: a coroutine holding the
+'store' lock excludes the sync routes of the same process as well as
+other workers and nodes.
+"""
+import asyncio
+import functools
+import json
+
+from utils.backends import BackendError, LockTimeout, MemoryLocks, RemoteLocks, RemoteStore
+
+
+# ------------------------------------------------------------------- client
+class AsyncStateClient:
+    """asyncio twin of state_server.StateClient: a pool of connections, one request in flight on each."""
+
+    def __init__(self, address: str, timeout: float = 10, max_connections: int = 32):
+        host, _, port = address.rpartition(':')
+        self.host, self.port = host or '127.0.0.1', int(port)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle = []
+        self._slots = None      # created on first use, inside the running loop
+
+    async def _connect(self):
+        if self._idle:
+            return self._idle.pop(), True
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        return (reader, writer), False
+
+    async def call(self, op: str, payload: bytes = b'', wait: float = 0, **fields):
+        """Send one request and return (reply header, reply payload); see StateClient.call."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            conn, reused = await self._connect()
+            while True:
+                reader, writer = conn
+                try:
+                    header = dict(fields, op=op, size=len(payload))
+                    writer.write(json.dumps(header).encode('utf-8') + b'\n' + payload)
+                    await writer.drain()
+                    line = await asyncio.wait_for(reader.readline(), self.timeout + wait)
+                    if not line:
+                        raise ConnectionError('connection closed')
+                    header = json.loads(line)
+                    size = header.pop('size', 0)
+                    body = await reader.readexactly(size) if size else b''
+                    break
+                except asyncio.CancelledError:
+                    writer.close()      # a reply may still be on its way: don't reuse the connection
+                    raise
+                except (ConnectionError, OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    writer.close()
+                    if not reused:
+                        raise
+                    conn, reused = await self._connect()
+            self._idle.append(conn)
+        if 'error' in header:
+            raise BackendError(header['error'])
+        return header, body
+
+
+# -------------------------------------------------------------------- store
+class AsyncStore:
+    """A local store's read/version/write on a thread pool."""
+
+    def __init__(self, store, executor):
+        self.store = store
+        self.executor = executor
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def read(self):
+        return await self._run(self.store.read)
+
+    async def version(self):
+        return await self._run(self.store.version)
+
+    async def write(self, text: str):
+        return await self._run(self.store.write, text)
+
+    async def write_data(self, data, label: str = None):
+        return await self._run(self.store.write_data, data, label)
+
+
+class AsyncRemoteStore:
+    def __init__(self, client: AsyncStateClient, executor):
+        self.client = client
+        self.executor = executor
+        self._seen = (None, None)
+
+    async def read(self):
+        version, text = self._seen
+        reply, body = await self.client.call('store.read', known=version)
+        if not reply['unchanged']:
+            text = body.decode('utf-8') if reply['version'] is not None else None
+            self._seen = (reply['version'], text)
+        return reply['version'], text
+
+    async def version(self):
+        return (await self.client.call('store.version'))[0]['version']
+
+    async def write(self, text: str):
+        reply, _ = await self.client.call('store.write', text.encode('utf-8'))
+        self._seen = (reply['version'], text)
+        return reply['previous'], reply['version']
+
+    async def write_data(self, data, label: str = None):
+        dump = functools.partial(json.dumps, data, indent=2)
+        return await self.write(await asyncio.get_running_loop().run_in_executor(self.executor, dump))
+
+
+# -------------------------------------------------------------------- locks
+class AsyncLocks:
+    """A local lock backend, polled without blocking: MemoryLocks inline, SQLiteLocks on the pool."""
+    POLL = 0.002        # first retry interval; doubles up to 50 ms
+
+    def __init__(self, locks, executor):
+        self.locks = locks
+        self.executor = executor
+        self._queues = {}       # name -> asyncio.Lock for this loop's waiters
+
+    async def _try(self, name: str, lease: float):
+        if isinstance(self.locks, MemoryLocks):
+            return self.locks.acquire(name, 0, lease)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.locks.acquire, name, 0, lease)
+
+    async def _acquire(self, name: str, timeout: float, lease: float) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        poll = self.POLL
+        while True:
+            try:
+                return await self._try(name, lease)
+            except LockTimeout:
+                if loop.time() >= deadline:
+                    raise
+            await asyncio.sleep(min(poll, max(0.0, deadline - loop.time())))
+            poll = min(poll * 2, 0.05)
+
+    async def acquire(self, name: str, timeout: float = 10, lease: float = 30) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        queue = self._queues.setdefault(name, asyncio.Lock())
+        try:
+            await asyncio.wait_for(queue.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise LockTimeout(name) from None
+        try:
+            return await self._acquire(name, max(0.0, deadline - loop.time()), lease)
+        except BaseException:
+            queue.release()
+            raise
+
+    async def release(self, name: str, token: str):
+        try:
+            await self._release(name, token)
+        finally:
+            self._queues[name].release()    # next coroutine in line
+
+    async def _release(self, name: str, token: str):
+        if isinstance(self.locks, MemoryLocks):
+            self.locks.release(name, token)
+        else:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.locks.release, name, token)
+
+
+class AsyncRemoteLocks(AsyncLocks):
+    """Waits on the state server, which answers when the lock is free or the timeout passed."""
+
+    def __init__(self, client: AsyncStateClient):
+        super().__init__(None, None)
+        self.client = client
+
+    async def _acquire(self, name: str, timeout: float, lease: float) -> str:
+        reply, _ = await self.client.call('lock.acquire', name=name, timeout=timeout, lease=lease, wait=timeout)
+        if reply['token'] is None:
+            raise LockTimeout(name)
+        return reply['token']
+
+    async def _release(self, name: str, token: str):
+        await self.client.call('lock.release', name=name, token=token)
+
+
+# ---------------------------------------------------------------- factories
+def make_async_backends(store, locks, config, executor):
+    """(async store, async locks) over the app's store and locks; the remote ones share a client."""
+    client = None
+    if isinstance(store, RemoteStore) or isinstance(locks, RemoteLocks):
+        client = AsyncStateClient(config['STATE_SERVER'])
+    astore = AsyncRemoteStore(client, executor) if isinstance(store, RemoteStore) else AsyncStore(store, executor)
+    alocks = AsyncRemoteLocks(client) if isinstance(locks, RemoteLocks) else AsyncLocks(locks, executor)
+    return astore, alocks
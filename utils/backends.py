@@ -0,0 +1,483 @@
+"""
+backends.py
+Pluggable homes for the state a node shares with its peers: the data store,
+named locks, the job queue and caches, selected by Config.
+
+             one process        one host (workers)   several nodes
+  store      FileStore          SQLiteStore          RemoteStore
+             MemoryStore
+             WALStore (utils/wal.py)
+  locks      MemoryLocks        SQLiteLocks          RemoteLocks
+  jobs       MemoryQueue        SQLiteQueue          RemoteQueue
+  cache      MemoryCache        SQLiteCache          RemoteCache
+
+The remote backends talk to a state server (utils/state_server.py) over
+TCP. The store is still one JSON document: writers serialise on the 'store'
+lock (see app.load_data), and every store has a version that changes on
+each write so the in-process indexes know when to rebuild. RemoteStore
+keeps the last document it saw and only transfers it again when the
+version moved. Locks are leases: a holder that dies releases its locks
+when the lease runs out.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be taken within the timeout."""
+
+    def __init__(self, name: str):
+        super().__init__(f'timed out waiting for lock {name!r}')
+        self.name = name
+
+
+class BackendError(Exception):
+    """The state server refused or failed a request."""
+
+
+# ------------------------------------------------------------------- stores
+# read() -> (version, text or None); write(text) -> (previous version, new version);
+# write_data(document, label) does the same from the document (see utils/wal.py for a
+# store that logs only what changed, labelled with the route that changed it).
+class _Store:
+    def write_data(self, data, label: str = None):
+        return self.write(json.dumps(data, indent=2))
+
+
+class FileStore(_Store):
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self):
+        try:
+            with open(self.path, 'r') as f:
+                # fstat of the open file: its version even if a writer swaps in a new one meanwhile
+                return os.fstat(f.fileno()).st_mtime_ns, f.read()
+        except OSError:
+            return None, None
+
+    def version(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def write(self, text: str):
+        before = self.version()
+        # Write to a temp file and swap it in, so concurrent readers never see a half-written file
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+        return before, self.version()
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+class MemoryStore(_Store):
+    def __init__(self, text: str = None):
+        self._lock = threading.Lock()
+        self._version = 0 if text is None else 1
+        self._text = text
+
+    def read(self):
+        with self._lock:
+            return (self._version or None), self._text
+
+    def version(self):
+        return self._version or None
+
+    def write(self, text: str):
+        with self._lock:
+            before = self._version or None
+            self._version += 1
+            self._text = text
+            return before, self._version
+
+    def size(self) -> int:
+        return len(self._text or '')
+
+
+class _SQLite:
+    """Per-thread connections to one SQLite file in WAL mode."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+
+class SQLiteStore(_Store, _SQLite):
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS document '
+                       '(id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER, body TEXT)')
+
+    def read(self):
+        row = self._db().execute('SELECT version, body FROM document').fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def version(self):
+        row = self._db().execute('SELECT version FROM document').fetchone()
+        return row[0] if row else None
+
+    def write(self, text: str):
+        with self._transaction() as db:
+            row = db.execute('SELECT version FROM document').fetchone()
+            before = row[0] if row else None
+            db.execute('INSERT OR REPLACE INTO document VALUES (1, ?, ?)', ((before or 0) + 1, text))
+        return before, (before or 0) + 1
+
+    def size(self) -> int:
+        row = self._db().execute('SELECT length(body) FROM document').fetchone()
+        return row[0] if row else 0
+
+
+class RemoteStore(_Store):
+    def __init__(self, client):
+        self.client = client
+        self._seen = (None, None)      # (version, text) last read or written by this node
+
+    def read(self):
+        version, text = self._seen
+        reply, body = self.client.call('store.read', known=version)
+        if not reply['unchanged']:
+            text = body.decode('utf-8') if reply['version'] is not None else None
+            self._seen = (reply['version'], text)
+        return reply['version'], text
+
+    def version(self):
+        return self.client.call('store.version')[0]['version']
+
+    def write(self, text: str):
+        reply, _ = self.client.call('store.write', text.encode('utf-8'))
+        self._seen = (reply['version'], text)
+        return reply['previous'], reply['version']
+
+    def size(self) -> int:
+        return len(self._seen[1] or '')
+
+
+# -------------------------------------------------------------------- locks
+# `local` says whether the lock only excludes threads of this process.
+class _Locks:
+    @contextmanager
+    def hold(self, name: str, timeout: float = 10, lease: float = 30):
+        token = self.acquire(name, timeout, lease)
+        try:
+            yield token
+        finally:
+            self.release(name, token)
+
+
+class MemoryLocks(_Locks):
+    local = True
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._held = {}         # name -> (token, monotonic expiry)
+
+    def acquire(self, name: str, timeout: float = 10, lease: float = 30) -> str:
+        """Take the lock, waiting up to timeout seconds; returns the token to release it with."""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                held = self._held.get(name)
+                if held is None or held[1] <= now:
+                    self._held[name] = (token, now + lease)
+                    return token
+                if now >= deadline:
+                    raise LockTimeout(name)
+                self._cond.wait(min(deadline, held[1]) - now)
+
+    def release(self, name: str, token: str):
+        with self._cond:
+            if self._held.get(name, (None,))[0] == token:
+                del self._held[name]
+                self._cond.notify_all()
+
+
+class SQLiteLocks(_Locks, _SQLite):
+    local = False
+    POLL = 0.005        # first retry interval; doubles up to 50 ms
+
+    def __init__(self, path: str):
+        _SQLite.__init__(self, path)
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, token TEXT, expires REAL)')
+
+    def acquire(self, name: str, timeout: float = 10, lease: float = 30) -> str:
+        token = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        poll = self.POLL
+        while True:
+            now = time.time()   # wall clock: shared between processes
+            with self._transaction() as db:
+                db.execute('DELETE FROM locks WHERE name = ? AND expires < ?', (name, now))
+                if db.execute('INSERT OR IGNORE INTO locks VALUES (?, ?, ?)', (name, token, now + lease)).rowcount:
+                    return token
+            if now >= deadline:
+                raise LockTimeout(name)
+            time.sleep(min(poll, max(0.0, deadline - now)))
+            poll = min(poll * 2, 0.05)
+
+    def release(self, name: str, token: str):
+        with self._transaction() as db:
+            db.execute('DELETE FROM locks WHERE name = ? AND token = ?', (name, token))
+
+
+class RemoteLocks(_Locks):
+    local = False
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, name: str, timeout: float = 10, lease: float = 30) -> str:
+        reply, _ = self.client.call('lock.acquire', name=name, timeout=timeout, lease=lease, wait=timeout)
+        if reply['token'] is None:
+            raise LockTimeout(name)
+        return reply['token']
+
+    def release(self, name: str, token: str):
+        self.client.call('lock.release', name=name, token=token)
+
+
+# --------------------------------------------------------------------- jobs
+# put(name, payload) queues a JSON-serialisable payload; get(name, timeout) -> payload or None.
+# `local` says whether jobs are run by the process that queued them.
+class MemoryQueue:
+    local = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+
+    def _queue(self, name: str):
+        with self._lock:
+            return self._queues.setdefault(name, queue.Queue())
+
+    def put(self, name: str, payload):
+        self._queue(name).put(payload)
+
+    def get(self, name: str, timeout: float = 5):
+        try:
+            return self._queue(name).get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class SQLiteQueue(_SQLite):
+    local = False
+    POLL = 0.05
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT, payload TEXT)')
+
+    def put(self, name: str, payload):
+        with self._transaction() as db:
+            db.execute('INSERT INTO jobs (queue, payload) VALUES (?, ?)', (name, json.dumps(payload)))
+
+    def get(self, name: str, timeout: float = 5):
+        deadline = time.time() + timeout
+        while True:
+            with self._transaction() as db:
+                row = db.execute('SELECT id, payload FROM jobs WHERE queue = ? ORDER BY id LIMIT 1', (name,)).fetchone()
+                if row is not None:
+                    db.execute('DELETE FROM jobs WHERE id = ?', (row[0],))
+                    return json.loads(row[1])
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.POLL)
+
+
+class RemoteQueue:
+    local = False
+
+    def __init__(self, client):
+        self.client = client
+
+    def put(self, name: str, payload):
+        self.client.call('queue.put', json.dumps(payload).encode('utf-8'), name=name)
+
+    def get(self, name: str, timeout: float = 5):
+        reply, body = self.client.call('queue.get', name=name, timeout=timeout, wait=timeout)
+        return json.loads(body) if reply['found'] else None
+
+
+# -------------------------------------------------------------------- cache
+# String values under string keys; get -> str or None, set with an optional ttl in seconds.
+class MemoryCache:
+    def __init__(self, max_items: int = 512):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items = OrderedDict()     # key -> (expires or None, value), least recently used first
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] is not None and item[0] <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        with self._lock:
+            self._items[key] = (None if ttl is None else time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteCache(_SQLite):
+    PRUNE_EVERY = 100       # sets between trims to max_items
+
+    def __init__(self, path: str, max_items: int = 512):
+        super().__init__(path)
+        self.max_items = max_items
+        self._sets = 0
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL, stamp REAL)')
+
+    def get(self, key: str):
+        row = self._db().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                       (key, value, None if ttl is None else now + ttl, now))
+            self._sets += 1
+            if self._sets % self.PRUNE_EVERY == 0:
+                db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+                db.execute('DELETE FROM cache WHERE key NOT IN '
+                           '(SELECT key FROM cache ORDER BY stamp DESC LIMIT ?)', (self.max_items,))
+
+    def delete(self, key: str):
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+
+class RemoteCache:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str):
+        reply, body = self.client.call('cache.get', key=key)
+        return body.decode('utf-8') if reply['found'] else None
+
+    def set(self, key: str, value: str, ttl: float = None):
+        self.client.call('cache.set', value.encode('utf-8'), key=key, ttl=ttl)
+
+    def delete(self, key: str):
+        self.client.call('cache.delete', key=key)
+
+
+# ---------------------------------------------------------------- factories
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(address: str):
+    from utils.state_server import StateClient
+    with _clients_lock:
+        if address not in _clients:
+            _clients[address] = StateClient(address)
+        return _clients[address]
+
+
+def make_store(config):
+    name = config['STORE_BACKEND']
+    if name == 'file':
+        return FileStore(config['DATA_FILE'])
+    if name == 'memory':
+        return MemoryStore()
+    if name == 'sqlite':
+        return SQLiteStore(config['STATE_DB'])
+    if name == 'remote':
+        return RemoteStore(_client(config['STATE_SERVER']))
+    if name == 'wal':
+        from utils.wal import WALStore
+        return WALStore(config['WAL_DIR'], seed=config['DATA_FILE'], segment_bytes=config['WAL_SEGMENT_BYTES'],
+                        snapshot_every=config['WAL_SNAPSHOT_RECORDS'], keep=config['WAL_KEEP_SNAPSHOTS'],
+                        fsync=config['WAL_FSYNC'])
+    raise ValueError(f'unknown store backend: {name}')
+
+
+def make_locks(config):
+    name = config['LOCK_BACKEND']
+    if name == 'memory':
+        return MemoryLocks()
+    if name == 'sqlite':
+        return SQLiteLocks(config['STATE_DB'])
+    if name == 'remote':
+        return RemoteLocks(_client(config['STATE_SERVER']))
+    raise ValueError(f'unknown lock backend: {name}')
+
+
+def make_queue(config):
+    name = config['QUEUE_BACKEND']
+    if name == 'memory':
+        return MemoryQueue()
+    if name == 'sqlite':
+        return SQLiteQueue(config['STATE_DB'])
+    if name == 'remote':
+        return RemoteQueue(_client(config['STATE_SERVER']))
+    raise ValueError(f'unknown queue backend: {name}')
+
+
+def make_cache(config, max_items: int):
+    name = config['CACHE_BACKEND']
+    if name == 'memory':
+        return MemoryCache(max_items)
+    if name == 'sqlite':
+        return SQLiteCache(config['STATE_DB'], max_items)
+    if name == 'remote':
+        return RemoteCache(_client(config['STATE_SERVER']))
+    raise ValueError(f'unknown cache backend: {name}')
@@ -0,0 +1,243 @@
+"""
+bulk_import.py
+Bulk resume import for campus drives.
+
+Walks a directory (recursively) or a .zip archive of PDF resumes, parses
+them on a process pool with extract_text_from_pdf / extract_skills, and
+creates or updates candidate users keyed by the email address found in each
+resume. Work is done in chunks: each chunk is parsed in parallel, applied
+to the store with one load/save under the store lock (so it can run next
+to live workers sharing the lock backend), added to the search index, and
+recorded in a state file so an interrupted import resumes where it stopped. Only one
+chunk of extracted text is held in memory at a time, and zip members are
+streamed to a temp file inside the worker, so memory use doesn't depend on
+the archive size.
+
+New candidates get an empty password hash: they cannot log in until they
+register with the same email, which mails that address a link to set a
+password on the imported account (see app.register / app.claim_account).
+
+The store lock only keeps the import and the web workers from overwriting
+each other if they share it, so with the process-local LOCK_BACKEND
+('memory') the import refuses to run unless --offline says the server is
+stopped.
+
+Usage:
+    python -m utils.bulk_import resumes/ --workers 8
+    python -m utils.bulk_import drive.zip --chunk-size 200 --state drive.import.json
+    python -m utils.bulk_import resumes/ --offline      # server stopped, LOCK_BACKEND=memory
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.resume_parser import extract_text_from_pdf, extract_skills
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+MAX_FILE_BYTES = 16 * 1024 * 1024   # same cap as uploads (Config.MAX_CONTENT_LENGTH)
+
+
+class SharedLockRequired(RuntimeError):
+    """The lock backend can't keep a running server and the import from overwriting each other."""
+
+
+# ------------------------------------------------------------------ sources
+def iter_sources(path: str):
+    """Yield (key, size) for every PDF under a directory or inside a zip archive."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                    yield info.filename, info.file_size
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                full = os.path.join(root, name)
+                yield os.path.relpath(full, path), os.path.getsize(full)
+
+
+def _guess_name(text: str, key: str) -> str:
+    for line in text.splitlines()[:5]:
+        words = line.strip().split()
+        if 2 <= len(words) <= 4 and all(w.replace('.', '').replace('-', '').isalpha() for w in words):
+            return ' '.join(w[:1].upper() + w[1:] for w in words)
+    stem = os.path.splitext(os.path.basename(key))[0]
+    return re.sub(r'[_\-.]+', ' ', stem).strip().title() or 'Candidate'
+
+
+def parse_resume(job: tuple) -> dict:
+    """Worker: extract text, skills, email and name from one PDF."""
+    source, key, size = job
+    result = {'key': key, 'size': size}
+    if size > MAX_FILE_BYTES:
+        result['error'] = f'file larger than {MAX_FILE_BYTES // (1024 * 1024)} MB'
+        return result
+    try:
+        if zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as zf, zf.open(key) as member, \
+                    tempfile.NamedTemporaryFile(suffix='.pdf') as tmp:
+                shutil.copyfileobj(member, tmp, 1024 * 1024)
+                tmp.flush()
+                text = extract_text_from_pdf(tmp.name)
+        else:
+            text = extract_text_from_pdf(os.path.join(source, key))
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+    if not text:
+        result['error'] = 'no text could be extracted'
+        return result
+    email = EMAIL_RE.search(text)
+    if not email:
+        result['error'] = 'no email address found'
+        return result
+    result.update(text=text, skills=extract_skills(text), email=email.group(0).lower().rstrip('.'),
+                  name=_guess_name(text, key))
+    return result
+
+
+# -------------------------------------------------------------------- state
+def load_state(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'done': {}, 'failed': {}}
+
+
+def save_state(path: str, state: dict):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# -------------------------------------------------------------------- store
+def apply_chunk(data: dict, parsed: list) -> tuple:
+    """Create/update candidates for parsed resumes. Returns (applied, failures)."""
+    by_email = {u['email']: uid for uid, u in data['users'].items()}
+    applied, failures = [], {}
+    now = datetime.datetime.now().isoformat()
+    for r in parsed:
+        uid = by_email.get(r['email'])
+        if uid is not None and data['users'][uid]['role'] != 'candidate':
+            failures[r['key']] = f"{r['email']} belongs to a non-candidate account"
+            continue
+        if uid is None:
+            uid = str(uuid.uuid4())
+            data['users'][uid] = {
+                'id': uid,
+                'name': r['name'],
+                'email': r['email'],
+                'password_hash': '',
+                'role': 'candidate',
+                'created_at': now
+            }
+            by_email[r['email']] = uid
+        candidate = data['candidates'].setdefault(uid, {
+            'user_id': uid,
+            'resume_text': '',
+            'skills': [],
+            'interviews': [],
+            'asked_questions': []
+        })
+        candidate['resume_text'] = r['text']
+        candidate['skills'] = r['skills']
+        applied.append((uid, r))
+    return applied, failures
+
+
+def run_import(source: str, workers: int, chunk_size: int, state_path: str, retry_failed: bool = True,
+               offline: bool = False) -> dict:
+    import app as appmod
+    from utils.text_index import resume_document
+
+    if appmod.locks.local and not offline:
+        raise SharedLockRequired(
+            f"LOCK_BACKEND '{appmod.app.config['LOCK_BACKEND']}' only locks the store within this process, "
+            "so a running server would overwrite the import (or the import its writes). Use a shared lock "
+            "backend (sqlite or remote), or stop the server and pass --offline.")
+
+    state = load_state(state_path)
+    sources = list(iter_sources(source))
+    pending = [(k, size) for k, size in sources
+               if state['done'].get(k) != size and (retry_failed or k not in state['failed'])]
+    skipped = len(sources) - len(pending)
+    totals = {'files': len(pending), 'skipped': skipped, 'imported': 0, 'failed': 0, 'bytes': 0}
+    print(f'{len(pending)} resumes to import ({skipped} already done) from {source}')
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            results = list(pool.map(parse_resume, [(source, k, size) for k, size in chunk],
+                                    chunksize=max(1, len(chunk) // (workers * 4))))
+            parsed = [r for r in results if 'error' not in r]
+            failures = {r['key']: r['error'] for r in results if 'error' in r}
+
+            try:
+                data = appmod.load_data(for_update=True)
+                applied, store_failures = apply_chunk(data, parsed)
+                failures.update(store_failures)
+                appmod.save_data(data)
+            finally:
+                appmod.release_store()
+            appmod.text_index().add([resume_document(uid, r['text']) for uid, r in applied])
+
+            for uid, r in applied:
+                state['done'][r['key']] = r['size']
+                state['failed'].pop(r['key'], None)
+            state['failed'].update(failures)
+            save_state(state_path, state)
+
+            totals['imported'] += len(applied)
+            totals['failed'] += len(failures)
+            totals['bytes'] += sum(size for _, size in chunk)
+            elapsed = time.perf_counter() - started
+            done = offset + len(chunk)
+            print(f'  {done}/{len(pending)} files  {done / elapsed:.1f} files/s  '
+                  f'{totals["bytes"] / elapsed / 1e6:.2f} MB/s  failures {totals["failed"]}')
+
+    totals['elapsed_s'] = round(time.perf_counter() - started, 2)
+    totals['failures'] = {k: v for k, v in state['failed'].items()}
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-import PDF resumes from a directory or zip archive.')
+    parser.add_argument('source', help='directory of PDFs or a .zip archive')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=200, help='resumes per store commit')
+    parser.add_argument('--state', help='resume-state file (default: <source>.import-state.json)')
+    parser.add_argument('--no-retry-failed', action='store_true', help='skip files that failed in an earlier run')
+    parser.add_argument('--offline', action='store_true',
+                        help='the server is stopped: allow a process-local lock backend')
+    args = parser.parse_args(argv)
+
+    state_path = args.state or f"{os.path.abspath(args.source).rstrip(os.sep)}.import-state.json"
+    try:
+        totals = run_import(args.source, max(1, args.workers), max(1, args.chunk_size), state_path,
+                            retry_failed=not args.no_retry_failed, offline=args.offline)
+    except SharedLockRequired as e:
+        parser.error(str(e))
+    rate = totals['files'] / totals['elapsed_s'] if totals['elapsed_s'] else 0
+    print(f"Imported {totals['imported']} resumes in {totals['elapsed_s']}s ({rate:.1f} files/s), "
+          f"{totals['skipped']} skipped, {totals['failed']} failed")
+    for key, error in sorted(totals['failures'].items()):
+        print(f'  FAILED {key}: {error}')
+    return 1 if totals['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+compiled_bank.py
+Binary, memory-mapped form of the question bank (question_bank.json).
+
+The JSON source ({"technical": {skill: [questions]}, "management": {group:
+[questions]}, "references": {question_id: key points}}) is compiled into one
+file; the references are read from the source by utils/reference_scoring.py:
+
+    header      magic, version and section sizes (little-endian u32s)
+    offsets     u32[strings + 1]: byte offset of each string in the blob
+    skills      u32[skills * 3]: (name string, first member, member count)
+    members     u32[members]: string numbers, per skill in order, then management
+    ids         6 bytes per question: sorted binary question_id()s
+    blob        the UTF-8 text of every distinct string
+
+CompiledBank maps the file read-only, so every worker process shares the
+same page-cache pages; a question is only decoded to a str when it is read.
+The per-skill lists are QuestionList sequences over the member array.
+Compiling writes a temporary file and renames it over the old one, so a
+reader sees either the old or the new bank, never a partial one.
+
+    python -m utils.compiled_bank question_bank.json [question_bank.bin]
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+
+MAGIC = b'SHQB'
+VERSION = 1
+_HEADER = struct.Struct('<4sIIIII')     # magic, version, strings, skills, members, management
+_ID_BYTES = 6
+
+
+def compiled_path(source: str) -> str:
+    return os.path.splitext(source)[0] + '.bin'
+
+
+def _question_id(question: str) -> str:
+    from utils.questions_bank import question_id
+    return question_id(question)
+
+
+def _u32(values) -> bytes:
+    data = array('I', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def compile_bank(source: str, target: str = None) -> str:
+    """Compile the JSON bank at source into target (default: source with .bin). Returns target."""
+    target = target or compiled_path(source)
+    with open(source, encoding='utf-8') as f:
+        bank = json.load(f)
+    technical = bank.get('technical', {})
+    management = bank.get('management', {})
+    if isinstance(management, dict):       # grouped by theme in the source; one list when compiled
+        management = [q for group in management.values() for q in group]
+    if not isinstance(technical, dict) or not isinstance(management, list):
+        raise ValueError(f'{source}: expected {{"technical": {{skill: [...]}}, "management": [...]}}')
+
+    strings, number = [], {}
+
+    def intern(text):
+        if not isinstance(text, str):
+            raise ValueError(f'{source}: not a string: {text!r}')
+        if text not in number:
+            number[text] = len(strings)
+            strings.append(text)
+        return number[text]
+
+    skills, members, questions = [], [], set()
+    for skill, qs in technical.items():
+        unique = list(dict.fromkeys(qs))
+        skills.extend((intern(skill.lower()), len(members), len(unique)))
+        members.extend(intern(q) for q in unique)
+        questions.update(unique)
+    unique = list(dict.fromkeys(management))
+    members.extend(intern(q) for q in unique)
+    questions.update(unique)
+
+    blobs = [s.encode('utf-8') for s in strings]
+    offsets, total = [0], 0
+    for b in blobs:
+        total += len(b)
+        offsets.append(total)
+    ids = sorted({bytes.fromhex(_question_id(q)) for q in questions})
+
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, tmp = tempfile.mkstemp(prefix='.question_bank.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(strings), len(skills) // 3, len(members), len(unique)))
+            f.write(_u32(offsets))
+            f.write(_u32(skills))
+            f.write(_u32(members))
+            f.write(struct.pack('<I', len(ids)))
+            f.write(b''.join(ids))
+            f.write(b''.join(blobs))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return target
+
+
+class QuestionList(Sequence):
+    """Read-only list of one skill's (or the management) questions, decoded on access."""
+    __slots__ = ('_bank', '_start', '_length')
+
+    def __init__(self, bank, start: int, length: int):
+        self._bank, self._start, self._length = bank, start, length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('question index out of range')
+        return self._bank.string(self._bank.members[self._start + i])
+
+    def __iter__(self):
+        string, members = self._bank.string, self._bank.members
+        for i in range(self._start, self._start + self._length):
+            yield string(members[i])
+
+    def __repr__(self):
+        return f'<QuestionList of {self._length}>'
+
+
+class _Ids(Sequence):
+    """Sorted binary question ids, for bisect."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._length = len(view) // _ID_BYTES
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        return bytes(self._view[i * _ID_BYTES:(i + 1) * _ID_BYTES])
+
+
+class CompiledBank:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_strings, n_skills, n_members, n_management = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path}: not a compiled question bank (version {VERSION})')
+        view, at = memoryview(self._map), _HEADER.size
+
+        def u32s(count):
+            nonlocal at
+            section = view[at:at + 4 * count]
+            at += 4 * count
+            if sys.byteorder == 'little':
+                return section.cast('I')
+            swapped = array('I')
+            swapped.frombytes(section)
+            swapped.byteswap()
+            return swapped
+
+        self._offsets = u32s(n_strings + 1)
+        skill_table = u32s(n_skills * 3)
+        self.members = u32s(n_members)
+        n_ids = struct.unpack_from('<I', self._map, at)[0]
+        self._ids = _Ids(view[at + 4:at + 4 + n_ids * _ID_BYTES])
+        self._blob = view[at + 4 + n_ids * _ID_BYTES:]
+
+        self.technical = {}
+        for i in range(n_skills):
+            name, start, length = skill_table[3 * i:3 * i + 3]
+            self.technical[self.string(name)] = QuestionList(self, start, length)
+        self.management = QuestionList(self, n_members - n_management, n_management)
+
+    def string(self, n: int) -> str:
+        return str(self._blob[self._offsets[n]:self._offsets[n + 1]], 'utf-8')
+
+    def has_id(self, qid: str) -> bool:
+        """True if a question with this question_id() is in the bank."""
+        try:
+            key = bytes.fromhex(qid)
+        except ValueError:
+            return False
+        i = bisect.bisect_left(self._ids, key)
+        return i < len(self._ids) and self._ids[i] == key
+
+    def question_count(self) -> int:
+        return len(self._ids)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.exit('usage: python -m utils.compiled_bank SOURCE.json [TARGET.bin]')
+    out = compile_bank(*sys.argv[1:])
+    bank = CompiledBank(out)
+    print(f'{out}: {len(bank.technical)} skills, {bank.question_count()} questions, '
+          f'{os.path.getsize(out)} bytes')
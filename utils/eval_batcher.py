@@ -0,0 +1,172 @@
+"""
+eval_batcher.py
+Micro-batches Gemini answer evaluation across concurrent submissions.
+
+Callers block in evaluate() while a collector thread gathers pending
+interviews for up to `window` seconds (or until `max_batch` are waiting),
+packs them into prompts that fit `token_budget`, and sends one request per
+pack. The JSON reply is split back per interview; interviews missing from
+the reply, or a whole batch whose reply fails to parse, fall back to the
+single-interview path in evaluator.py. A caller can pass its own
+single-interview evaluation for when its interview ends up in a batch of
+its own (evaluate_answers_stream streams it question by question).
+"""
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils import metrics
+from utils.evaluator import (
+    EVALUATION_FORMAT, _qa_text, _strip_fences, _parse_gemini_result, _evaluate_with_gemini
+)
+from utils.integrations import gemini_model
+
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_PER_QUESTION = 90     # q_index, two scores and 2-3 sentences of feedback
+PROMPT_OVERHEAD_TOKENS = 350
+
+
+def estimate_tokens(questions: list) -> int:
+    """Rough prompt + completion size of one interview inside a batch."""
+    return len(_qa_text(questions)) // CHARS_PER_TOKEN + OUTPUT_TOKENS_PER_QUESTION * len(questions) + 40
+
+
+def _gemini_backend(prompt: str) -> str:
+    return gemini_model('gemini-2.0-flash').generate_content(prompt).text
+
+
+def build_batch_prompt(batch: list) -> str:
+    sections = ''.join(f"\n### Interview {i}\n{_qa_text(questions)}" for i, questions in enumerate(batch, 1))
+    return f"""You are an expert interview evaluator. Evaluate each of the following {len(batch)} independent interviews.
+Judge every interview on its own; do not compare candidates.
+{sections}
+
+For EACH question of EACH interview, score on:
+- technical_score: 0-100 (accuracy, depth of knowledge)
+- communication_score: 0-100 (clarity, structure, vocabulary)
+- question_feedback: 2-3 sentence specific, encouraging feedback. Mention what was good AND what to improve.
+
+Return ONLY a JSON object of the form {{"interviews": [...]}} with one entry per interview.
+Each entry has "interview_index" (1-{len(batch)}, as numbered above) plus exactly these fields:
+{EVALUATION_FORMAT}"""
+
+
+def split_batch_result(text: str, count: int) -> dict:
+    """Map interview_index (1-based) -> single-interview result dict from a batched reply."""
+    result = json.loads(_strip_fences(text))
+    entries = {}
+    for entry in result.get('interviews', []):
+        index = entry.get('interview_index')
+        if isinstance(index, int) and 1 <= index <= count and isinstance(entry.get('evaluations'), list):
+            entries[index] = entry
+    return entries
+
+
+class EvaluationBatcher:
+    def __init__(self, window: float = 0.25, max_batch: int = 8, token_budget: int = 6000,
+                 backend=None, max_in_flight: int = 4):
+        """
+        backend(prompt) -> response text; defaults to Gemini. max_in_flight caps
+        concurrent backend requests so bursts don't trip the provider's rate limit.
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self.token_budget = token_budget
+        self.backend = backend or _gemini_backend
+        self._pending = []          # [(questions, future, alone)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='eval-batch')
+        self._thread = threading.Thread(target=self._collect, name='eval-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, questions: list, alone=None) -> Future:
+        """
+        Future of (scores_dict, feedback_string). alone(questions), if given,
+        evaluates the interview when no other one shares its batch.
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('EvaluationBatcher is closed')
+            self._pending.append((questions, future, alone))
+            self._cond.notify()
+        return future
+
+    def evaluate(self, questions: list) -> tuple:
+        """Blocking evaluation; returns (scores_dict, feedback_string) like evaluate_answers."""
+        return self.submit(questions).result()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    # ------------------------------------------------------------ collector
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Hold the window open from the first arrival, unless the batch fills up
+                flush_at = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                items, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            for batch in self._pack(items):
+                self._pool.submit(self._run, batch)
+
+    def _pack(self, items: list) -> list:
+        """Greedily split items into batches within the token budget."""
+        batches, current, used = [], [], PROMPT_OVERHEAD_TOKENS
+        for item in items:
+            cost = estimate_tokens(item[0])
+            if current and used + cost > self.token_budget:
+                batches.append(current)
+                current, used = [], PROMPT_OVERHEAD_TOKENS
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    # ------------------------------------------------------------- dispatch
+    def _run(self, batch: list):
+        metrics.observe_size('evaluation_batch', len(batch))
+        if len(batch) == 1:
+            self._fallback(batch, alone=True)
+            return
+        try:
+            entries = split_batch_result(self.backend(build_batch_prompt([item[0] for item in batch])), len(batch))
+        except Exception:
+            entries = {}
+        missing = []
+        for index, item in enumerate(batch, 1):
+            questions, future, _ = item
+            entry = entries.get(index)
+            if entry is None:
+                missing.append(item)
+                continue
+            try:
+                future.set_result(_parse_gemini_result(entry, questions))
+            except Exception:
+                missing.append(item)
+        self._fallback(missing)
+
+    def _fallback(self, items: list, alone: bool = False):
+        for questions, future, evaluate_alone in items:
+            try:
+                if alone and evaluate_alone is not None:
+                    future.set_result(evaluate_alone(questions))
+                else:
+                    future.set_result(_evaluate_with_gemini(questions, self.backend))
+            except Exception as e:
+                future.set_exception(e)
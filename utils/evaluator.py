@@ -2,21 +2,33 @@
 evaluator.py
 Evaluates interview answers using Gemini AI with rich, personalised feedback.
 Falls back to rule-based scoring if Gemini is unavailable.
+With batching configured, concurrent evaluations share Gemini requests
+(see utils/eval_batcher.py). evaluate_answers_stream() yields each
+question's result as soon as it is scored, for the streamed results page.
 """
-import os
 import json
+import queue
 import re
 
-try:
-    import google.generativeai as genai
-    GEMINI_KEY = os.environ.get('GEMINI_API_KEY', '')
-    if GEMINI_KEY:
-        genai.configure(api_key=GEMINI_KEY)
-    GEMINI_AVAILABLE = bool(GEMINI_KEY)
-except ImportError:
-    GEMINI_AVAILABLE = False
+from utils.integrations import gemini_available, gemini_model
+from utils.metrics import instrument
+from utils.reference_scoring import get_scorer
 
+_batcher = None
 
+
+def configure_batching(enabled: bool, window: float = 0.25, max_batch: int = 8, token_budget: int = 6000):
+    """Route Gemini evaluations through a shared EvaluationBatcher (or stop doing so)."""
+    global _batcher
+    from utils.eval_batcher import EvaluationBatcher
+    old, _batcher = _batcher, None
+    if old is not None:
+        old.close()
+    if enabled:
+        _batcher = EvaluationBatcher(window=window, max_batch=max_batch, token_budget=token_budget)
+
+
+@instrument('evaluate_answers', size=lambda result, args, kwargs: len(args[0]) if args else 0)
 def evaluate_answers(questions: list) -> tuple:
     """
     Evaluate a list of {question, answer} dicts.
@@ -29,23 +41,64 @@ def evaluate_answers(questions: list) -> tuple:
         'per_question': [ {score, technical_score, communication_score, feedback} ]
     }
     """
-    if GEMINI_AVAILABLE:
+    if gemini_available():
+        if _batcher is not None:
+            return _batcher.evaluate(questions)
         return _evaluate_with_gemini(questions)
     return _evaluate_rule_based(questions)
 
 
-def _evaluate_with_gemini(questions: list) -> tuple:
+def evaluate_answers_stream(questions: list):
+    """
+    Incremental evaluate_answers: yields ('question', index, per_question_dict)
+    as each question is scored, then ('done', scores_dict, feedback_string).
+    Gemini is asked for one JSON line per question over a streamed response;
+    the rule-based scorer goes one question at a time. With batching
+    configured, submissions arriving together share a batched request and
+    their questions are yielded when it returns; an interview with no
+    batch-mates is still streamed.
+    """
+    if gemini_available():
+        if _batcher is None:
+            yield from _stream_with_gemini(questions)
+        else:
+            yield from _stream_batched(questions)
+        return
+    steps = []
+    for i, step in enumerate(_rule_based_steps(questions)):
+        steps.append(step)
+        yield 'question', i, step[2]
+    yield ('done',) + _rule_based_summary(questions, steps)
+
+
+def _stream_batched(questions: list):
+    events = queue.Queue()
+
+    def alone(qs):
+        for event in _stream_with_gemini(qs):
+            if event[0] == 'done':
+                return event[1:]
+            events.put(event)
+
+    future = _batcher.submit(questions, alone)
+    future.add_done_callback(lambda f: events.put(None))
+    streamed = False
+    for event in iter(events.get, None):
+        streamed = True
+        yield event
+    scores, feedback = future.result()
+    if not streamed:
+        for i, pq in enumerate(scores['per_question']):
+            yield 'question', i, pq
+    yield 'done', scores, feedback
+
+
+def _evaluate_with_gemini(questions: list, generate=None) -> tuple:
+    """generate(prompt) -> response text overrides the Gemini call (see eval_batcher)."""
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-
-        qa_text = ""
-        for i, q in enumerate(questions, 1):
-            answer = q.get('answer', '').strip()
-            qa_text += f"\nQ{i}: {q['question']}\nA{i}: {answer if answer else '[No answer provided]'}\n"
-
         prompt = f"""You are an expert interview evaluator. Evaluate the following interview Q&A.
 
-{qa_text}
+{_qa_text(questions)}
 
 For EACH question, score on:
 - technical_score: 0-100 (accuracy, depth of knowledge)
@@ -53,32 +106,124 @@ For EACH question, score on:
 - question_feedback: 2-3 sentence specific, encouraging feedback. Mention what was good AND what to improve.
 
 Return ONLY a JSON object in this exact format:
-{{
+{EVALUATION_FORMAT}"""
+
+        if generate is None:
+            text = gemini_model('gemini-2.0-flash').generate_content(prompt).text
+        else:
+            text = generate(prompt)
+        result = json.loads(_strip_fences(text))
+
+        return _parse_gemini_result(result, questions)
+
+    except Exception as e:
+        return _evaluate_rule_based(questions)
+
+
+STREAM_FORMAT = """Return JSON Lines: one JSON object per line, with no surrounding array and no code fences.
+First one line per question, in order, as soon as you have scored it:
+{"q_index": 1, "technical_score": 75, "communication_score": 80, "question_feedback": "Good explanation of the concept. To improve, add a real-world example."}
+Then one final line:
+{"overall_strengths": "2-3 sentences about what the candidate did well overall.", "overall_improvements": "2-3 sentences on key areas to work on.", "recommended_topics": ["topic1", "topic2", "topic3"]}"""
+
+
+def _stream_with_gemini(questions: list):
+    prompt = f"""You are an expert interview evaluator. Evaluate the following interview Q&A.
+
+{_qa_text(questions)}
+
+For EACH question, score on:
+- technical_score: 0-100 (accuracy, depth of knowledge)
+- communication_score: 0-100 (clarity, structure, vocabulary)
+- question_feedback: 2-3 sentence specific, encouraging feedback. Mention what was good AND what to improve.
+
+{STREAM_FORMAT}"""
+
+    evaluations = {}
+    summary = {}
+
+    def handle(line):
+        line = line.strip()
+        if not line.startswith('{'):
+            return None     # fences or chatter around the JSON lines
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return None
+        if 'q_index' in item:
+            index = _q_index(item) - 1
+            if 0 <= index < len(questions) and index not in evaluations:
+                evaluations[index] = dict(item, q_index=index + 1)
+                return index
+        else:
+            summary.update(item)
+        return None
+
+    try:
+        buffer = ''
+        for chunk in gemini_model('gemini-2.0-flash').generate_content(prompt, stream=True):
+            buffer += chunk.text
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                index = handle(line)
+                if index is not None:
+                    yield 'question', index, _gemini_question(evaluations[index], questions[index])
+        index = handle(buffer)
+        if index is not None:
+            yield 'question', index, _gemini_question(evaluations[index], questions[index])
+    except Exception:
+        pass    # keep what arrived; the rest is scored by rules below
+
+    missing = [i for i in range(len(questions)) if i not in evaluations]
+    if missing:
+        fallback = _rule_based_steps([questions[i] for i in missing])
+        for i, (_, _, pq) in zip(missing, fallback):
+            evaluations[i] = {'q_index': i + 1, 'technical_score': pq['technical_score'],
+                              'communication_score': pq['communication_score'], 'question_feedback': pq['feedback']}
+            yield 'question', i, pq
+    result = dict(summary, evaluations=list(evaluations.values()))
+    yield ('done',) + _parse_gemini_result(result, questions)
+
+
+EVALUATION_FORMAT = """{
   "evaluations": [
-    {{
+    {
       "q_index": 1,
       "technical_score": 75,
       "communication_score": 80,
       "question_feedback": "Good explanation of the concept. You correctly identified X. To improve, add a real-world example next time."
-    }}
+    }
   ],
   "overall_strengths": "2-3 sentences about what the candidate did well overall.",
   "overall_improvements": "2-3 sentences on key areas to work on.",
   "recommended_topics": ["topic1", "topic2", "topic3"]
-}}"""
+}"""
 
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        if text.startswith('```'):
-            text = text.split('```')[1]
-            if text.startswith('json'):
-                text = text[4:]
-        result = json.loads(text.strip())
 
-        return _parse_gemini_result(result, questions)
+def _qa_text(questions: list) -> str:
+    qa_text = ""
+    for i, q in enumerate(questions, 1):
+        answer = q.get('answer', '').strip()
+        qa_text += f"\nQ{i}: {q['question']}\nA{i}: {answer if answer else '[No answer provided]'}\n"
+    return qa_text
+
+
+def _strip_fences(text: str) -> str:
+    """Strip markdown code fences Gemini sometimes wraps JSON in."""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('```')[1]
+        if text.startswith('json'):
+            text = text[4:]
+    return text.strip()
 
-    except Exception as e:
-        return _evaluate_rule_based(questions)
+
+def _q_index(evaluation: dict) -> int:
+    """The 1-based question number of an evaluation (Gemini may send "2" or 2.0), or 0."""
+    try:
+        return int(float(evaluation.get('q_index')))
+    except (TypeError, ValueError, OverflowError):
+        return 0
 
 
 def _parse_gemini_result(result: dict, questions: list) -> tuple:
@@ -92,24 +237,11 @@ def _parse_gemini_result(result: dict, questions: list) -> tuple:
     per_question = []
 
     for i, q in enumerate(questions):
-        eval_data = next((e for e in evaluations if e.get('q_index') == i + 1), {})
-        ts = float(eval_data.get('technical_score', 0))
-        cs = float(eval_data.get('communication_score', 0))
-        qf = eval_data.get('question_feedback', 'No feedback available.')
-
-        # Penalise empty answers
-        if not q.get('answer', '').strip():
-            ts = 0
-            cs = 0
-            qf = "No answer was provided for this question. Make sure to attempt every question."
-
-        tech_scores.append(ts)
-        comm_scores.append(cs)
-        per_question.append({
-            'technical_score': round(ts, 1),
-            'communication_score': round(cs, 1),
-            'feedback': qf
-        })
+        eval_data = next((e for e in evaluations if _q_index(e) == i + 1), {})
+        pq = _gemini_question(eval_data, q)
+        tech_scores.append(pq['technical_score'])
+        comm_scores.append(pq['communication_score'])
+        per_question.append(pq)
 
     avg_tech = round(sum(tech_scores) / len(tech_scores), 1) if tech_scores else 0
     avg_comm = round(sum(comm_scores) / len(comm_scores), 1) if comm_scores else 0
@@ -139,12 +271,32 @@ def _parse_gemini_result(result: dict, questions: list) -> tuple:
     return scores, '\n\n'.join(feedback_parts)
 
 
+def _gemini_question(eval_data: dict, q: dict) -> dict:
+    ts = float(eval_data.get('technical_score', 0))
+    cs = float(eval_data.get('communication_score', 0))
+    qf = eval_data.get('question_feedback', 'No feedback available.')
+
+    # Penalise empty answers
+    if not q.get('answer', '').strip():
+        ts = 0
+        cs = 0
+        qf = "No answer was provided for this question. Make sure to attempt every question."
+
+    return {
+        'technical_score': round(ts, 1),
+        'communication_score': round(cs, 1),
+        'feedback': qf
+    }
+
+
 def _evaluate_rule_based(questions: list) -> tuple:
-    """Simple rule-based fallback evaluator."""
-    tech_scores = []
-    comm_scores = []
-    per_question = []
-    feedback_parts = []
+    """Rule-based fallback evaluator; technical accuracy comes from reference key points where available."""
+    return _rule_based_summary(questions, list(_rule_based_steps(questions)))
+
+
+def _rule_based_steps(questions: list):
+    """Score questions one at a time; yields (technical, communication, per_question_dict)."""
+    reference_scores = get_scorer().technical_scores(questions)
 
     for i, q in enumerate(questions):
         answer = q.get('answer', '').strip()
@@ -155,18 +307,28 @@ def _evaluate_rule_based(questions: list) -> tuple:
             word_count = len(answer.split())
             # Communication score based on length + sentence structure
             cs = min(100, word_count * 3)
-            # Technical score: keyword-based rough check
-            question_words = set(q['question'].lower().split())
-            answer_words = set(answer.lower().split())
-            overlap = len(question_words & answer_words)
-            ts = min(100, overlap * 15)
+            if reference_scores[i] is not None:
+                # Technical score: coverage of the question's reference key points
+                ts = reference_scores[i]
+            else:
+                # No reference (soft-skill or generated question): keyword-based rough check
+                question_words = set(q['question'].lower().split())
+                answer_words = set(answer.lower().split())
+                overlap = len(question_words & answer_words)
+                ts = min(100, overlap * 15)
             qf = _rule_based_feedback(answer, word_count)
 
-        tech_scores.append(ts)
-        comm_scores.append(cs)
-        per_question.append({'technical_score': round(ts, 1), 'communication_score': round(cs, 1), 'feedback': qf})
-        ans_status = '❌ Not Answered' if not q.get('answer', '').strip() else f"Tech: {round(ts,1)}% | Comm: {round(cs,1)}%"
-        feedback_parts.append(f"Q{i+1} [{ans_status}]: {qf}")
+        yield ts, cs, {'technical_score': round(ts, 1), 'communication_score': round(cs, 1), 'feedback': qf}
+
+
+def _rule_based_summary(questions: list, steps: list) -> tuple:
+    tech_scores = [ts for ts, _, _ in steps]
+    comm_scores = [cs for _, cs, _ in steps]
+    per_question = [pq for _, _, pq in steps]
+    feedback_parts = []
+    for i, (q, pq) in enumerate(zip(questions, per_question)):
+        ans_status = '❌ Not Answered' if not q.get('answer', '').strip() else f"Tech: {pq['technical_score']}% | Comm: {pq['communication_score']}%"
+        feedback_parts.append(f"Q{i+1} [{ans_status}]: {pq['feedback']}")
 
     avg_tech = round(sum(tech_scores) / len(tech_scores), 1) if tech_scores else 0
     avg_comm = round(sum(comm_scores) / len(comm_scores), 1) if comm_scores else 0
@@ -0,0 +1,143 @@
+"""
+generated_bank.py
+Persistent supplementary question bank for skills the static bank doesn't cover.
+
+LLM-generated questions are deduplicated (by question_id), tagged with their
+skill, saved to a JSON file and merged into questions_bank.SUPPLEMENTARY_QUESTIONS,
+so later candidates with the same skills are served locally. Refills run on a
+background thread when a skill's stock drops below LOW_WATERMARK. The
+request path only waits for the LLM when the banks can't fill an interview
+at all (see question_generator._generate_now).
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.questions_bank import SUPPLEMENTARY_QUESTIONS, question_id, has_bank_coverage, in_static_bank
+
+LOW_WATERMARK = 20      # refill a skill when it has fewer generated questions than this
+REFILL_BATCH = 10       # questions requested per refill
+
+_path = 'generated_questions.json'
+_lock = threading.RLock()
+_entries = {}           # skill -> [{'id', 'question', 'created_at'}]
+_known_ids = set()      # ids of generated questions (static ones are looked up in the compiled bank)
+_mtime = None
+_executor = None
+_in_flight = set()
+logger = logging.getLogger(__name__)
+
+
+def configure(path: str, low_watermark: int = None, batch: int = None):
+    global _path, _mtime, LOW_WATERMARK, REFILL_BATCH
+    with _lock:
+        _path = path
+        _mtime = None
+        LOW_WATERMARK = low_watermark or LOW_WATERMARK
+        REFILL_BATCH = batch or REFILL_BATCH
+    refresh()
+
+
+def _read_file() -> dict:
+    try:
+        with open(_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def refresh():
+    """Reload the bank file if another process changed it and re-merge it."""
+    global _entries, _known_ids, _mtime
+    try:
+        mtime = os.stat(_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    with _lock:
+        if mtime == _mtime:
+            return
+        _entries = _read_file()
+        _known_ids = set()
+        for entries in _entries.values():
+            _known_ids.update(e['id'] for e in entries)
+        SUPPLEMENTARY_QUESTIONS.clear()
+        for skill, entries in _entries.items():
+            SUPPLEMENTARY_QUESTIONS[skill] = [e['question'] for e in entries]
+        _mtime = mtime
+
+
+def stock(skill: str) -> int:
+    refresh()
+    with _lock:
+        return len(_entries.get(skill.lower(), ()))
+
+
+def add(skill: str, questions: list) -> int:
+    """Persist new questions for skill, skipping any already in a bank. Returns how many were added."""
+    global _mtime
+    skill = skill.lower()
+    refresh()
+    with _lock:
+        # Re-read so we don't drop questions another worker just saved
+        on_disk = _read_file()
+        for other_skill, entries in on_disk.items():
+            known = {e['id'] for e in _entries.get(other_skill, [])}
+            for e in entries:
+                if e['id'] not in known:
+                    _entries.setdefault(other_skill, []).append(e)
+                    _known_ids.add(e['id'])
+        added = 0
+        now = datetime.datetime.now().isoformat()
+        for q in questions:
+            if not isinstance(q, str) or not q.strip():
+                continue
+            qid = question_id(q)
+            if qid in _known_ids or in_static_bank(qid):
+                continue
+            _known_ids.add(qid)
+            _entries.setdefault(skill, []).append({'id': qid, 'question': q.strip(), 'created_at': now})
+            added += 1
+        if added:
+            tmp = f'{_path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(_entries, f, indent=2)
+            os.replace(tmp, _path)
+            _mtime = os.stat(_path).st_mtime_ns
+        for s, entries in _entries.items():
+            SUPPLEMENTARY_QUESTIONS[s] = [e['question'] for e in entries]
+        return added
+
+
+def skills_needing_refill(skills: list) -> list:
+    """Skills with no static-bank coverage whose generated stock is low."""
+    return [s.lower() for s in skills if not has_bank_coverage(s) and stock(s) < LOW_WATERMARK]
+
+
+def request_refill(skills: list, generate):
+    """
+    Schedule background generation for low-stock skills.
+    generate(skill, count, existing_questions) -> list of question strings.
+    """
+    global _executor
+    for skill in skills_needing_refill(skills):
+        with _lock:
+            if skill in _in_flight:
+                continue
+            _in_flight.add(skill)
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='question-refill')
+        _executor.submit(_refill, skill, generate)
+
+
+def _refill(skill: str, generate):
+    try:
+        existing = list(SUPPLEMENTARY_QUESTIONS.get(skill, []))
+        add(skill, generate(skill, REFILL_BATCH, existing))
+    except Exception:
+        logger.exception('Refilling generated questions for %s failed', skill)
+    finally:
+        with _lock:
+            _in_flight.discard(skill)
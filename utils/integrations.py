@@ -0,0 +1,67 @@
+"""
+integrations.py
+Lazily loaded, process-wide clients for optional integrations (Gemini, Flask-Mail).
+Nothing heavy is imported at module load; each SDK is imported and configured
+on first use and then shared by every module that asks for it.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+
+_genai = None
+_genai_loaded = False
+
+_mail = None
+_mail_loaded = False
+
+
+def gemini_configured() -> bool:
+    """Cheap check (no import) for whether a Gemini key is present."""
+    return bool(os.environ.get('GEMINI_API_KEY', ''))
+
+
+def get_genai():
+    """Return the configured google.generativeai module, or None if unavailable."""
+    global _genai, _genai_loaded
+    if _genai_loaded:
+        return _genai
+    with _lock:
+        if not _genai_loaded:
+            if gemini_configured():
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.environ['GEMINI_API_KEY'])
+                    _genai = genai
+                except ImportError:
+                    _genai = None
+            _genai_loaded = True
+    return _genai
+
+
+def gemini_available() -> bool:
+    return get_genai() is not None
+
+
+def gemini_model(name: str = 'gemini-2.0-flash'):
+    """Return a GenerativeModel, or None if Gemini is unavailable."""
+    genai = get_genai()
+    return genai.GenerativeModel(name) if genai else None
+
+
+def get_mail(app):
+    """
+    Return (mail, Message) bound to app, or None if Flask-Mail is not installed.
+    """
+    global _mail, _mail_loaded
+    if _mail_loaded:
+        return _mail
+    with _lock:
+        if not _mail_loaded:
+            try:
+                from flask_mail import Mail, Message
+                _mail = (Mail(app), Message)
+            except Exception:
+                _mail = None
+            _mail_loaded = True
+    return _mail
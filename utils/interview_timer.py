@@ -0,0 +1,129 @@
+"""
+interview_timer.py
+Server-side interview deadlines.
+Active interviews are kept in a min-heap ordered by deadline, so the sweeper
+only ever touches interviews that have actually expired. An expiry whose
+callback fails (e.g. the store lock timed out) is logged and retried with
+backoff. build() loads every deadline found in the store, so each process
+also enforces the interviews other processes started.
+"""
+import heapq
+import logging
+import threading
+import time
+
+RETRY_BACKOFF = 5.0         # seconds before retrying a failed expiry, doubled per failure
+MAX_RETRY_BACKOFF = 300.0
+
+
+class DeadlineScheduler:
+    """
+    Time-ordered set of active interviews.
+
+    Cancelled or rescheduled entries are left in the heap and skipped when
+    popped (lazy deletion), so schedule/cancel are O(log n) / O(1) and a
+    sweep costs O(expired * log n).
+    """
+
+    def __init__(self, entries=None):
+        self._heap = []          # (deadline, interview_id, candidate_id)
+        self._deadlines = {}     # interview_id -> deadline (live entries only)
+        self._failures = {}      # interview_id -> failed expiry callbacks in a row
+        self._cond = threading.Condition()
+        self._thread = None
+        self._entries = entries  # data -> [(interview_id, candidate_id, deadline)] for build()
+        # Store version the heap reflects; see app._fresh
+        self.synced_version = None
+
+    def build(self, data: dict, version=None):
+        """Schedule every deadline in the store; entries waiting out a retry backoff keep it."""
+        with self._cond:
+            for interview_id, candidate_id, deadline in self._entries(data):
+                if interview_id not in self._failures and self._deadlines.get(interview_id) != deadline:
+                    self.schedule(interview_id, candidate_id, deadline)
+            self.synced_version = version
+
+    def schedule(self, interview_id: str, candidate_id: str, deadline: float):
+        with self._cond:
+            self._deadlines[interview_id] = deadline
+            heapq.heappush(self._heap, (deadline, interview_id, candidate_id))
+            # Wake the sweeper in case this is now the earliest deadline
+            self._cond.notify()
+
+    def cancel(self, interview_id: str):
+        with self._cond:
+            self._deadlines.pop(interview_id, None)
+            self._failures.pop(interview_id, None)
+
+    def deadline_for(self, interview_id: str):
+        return self._deadlines.get(interview_id)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def pop_expired(self, now: float = None) -> list:
+        """Remove and return [(candidate_id, interview_id)] whose deadline has passed."""
+        now = time.time() if now is None else now
+        expired = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, interview_id, candidate_id = heapq.heappop(self._heap)
+                if self._deadlines.get(interview_id) != deadline:
+                    continue  # cancelled or rescheduled
+                del self._deadlines[interview_id]
+                expired.append((candidate_id, interview_id))
+        return expired
+
+    def _seconds_until_next(self, now: float, max_sleep: float) -> float:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)  # drop stale head so we don't wake for it
+        if not self._heap:
+            return max_sleep
+        return max(0.0, min(max_sleep, self._heap[0][0] - now))
+
+    def start(self, on_expired, max_sleep: float = 30.0, logger=None, refresh=None):
+        """
+        Run a daemon sweeper calling on_expired(candidate_id, interview_id)
+        for every expired interview. Sleeps until the next deadline (capped
+        at max_sleep) instead of polling. on_expired should be quick: it runs
+        on the sweeper thread, ahead of every later expiry. refresh(), if
+        given, runs at most every max_sleep seconds (e.g. to build() from a
+        store other processes write).
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, args=(on_expired, max_sleep, logger or logging.getLogger(__name__), refresh),
+            name='interview-deadline-sweeper', daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, on_expired, max_sleep, logger, refresh):
+        refreshed = time.monotonic()
+        while True:
+            with self._cond:
+                self._cond.wait(self._seconds_until_next(time.time(), max_sleep))
+            if refresh is not None and time.monotonic() - refreshed >= max_sleep:
+                refreshed = time.monotonic()
+                try:
+                    refresh()
+                except Exception:
+                    logger.exception('Refreshing interview deadlines failed')
+            for candidate_id, interview_id in self.pop_expired():
+                try:
+                    on_expired(candidate_id, interview_id)
+                except Exception:
+                    # A bad record or a busy store must not kill the sweeper for everyone else
+                    self._retry_later(candidate_id, interview_id, logger)
+                else:
+                    with self._cond:
+                        self._failures.pop(interview_id, None)
+
+    def _retry_later(self, candidate_id, interview_id, logger):
+        with self._cond:
+            failures = self._failures[interview_id] = self._failures.get(interview_id, 0) + 1
+        delay = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (failures - 1))
+        logger.exception('Expiring interview %s failed (%d in a row); retrying in %.0fs',
+                         interview_id, failures, delay)
+        if self.deadline_for(interview_id) is None:     # not rescheduled or submitted meanwhile
+            self.schedule(interview_id, candidate_id, time.time() + delay)
@@ -0,0 +1,194 @@
+"""
+leaderboard.py
+Per-cohort leaderboards: a member's rank and the top k members by overall
+score, without sorting the cohort.
+
+Overall scores are 0-100 with one decimal (see utils/evaluator.py), so a
+score is one of KEYS = 1001 keys. A Leaderboard keeps a Fenwick (binary
+indexed) tree of member counts per key, best score first, and the members
+at each key in the order they were scored. Recording a score is an
+O(log KEYS) update, a member's rank is one prefix sum and the n-th best
+member is found by one descent of the tree: a rank query is O(log KEYS)
+and a page of k rows with d distinct scores O(k + d log KEYS), whatever
+the cohort size. Members with equal scores share a rank (1, 2, 2, 4) and
+are listed in the order they were scored.
+
+CohortBoards holds the cohorts' boards and, like the other store indexes,
+is rebuilt from the store when another process writes it.
+"""
+import itertools
+import threading
+
+KEYS = 1001         # 100.0, 99.9, ... 0.0
+_TOP_STEP = 1 << (KEYS.bit_length() - 1)
+
+
+def _position(score) -> int:
+    """Fenwick position (1-based) of a score; 1 is the best."""
+    key = max(0, min(KEYS - 1, int(round(float(score) * 10))))
+    return KEYS - key
+
+
+class Leaderboard:
+    def __init__(self):
+        self._tree = [0] * (KEYS + 1)
+        self._members = {}      # position -> {candidate_id: None}, in scoring order
+        self._scores = {}       # candidate_id -> score
+
+    def _add(self, position: int, delta: int):
+        tree = self._tree
+        while position <= KEYS:
+            tree[position] += delta
+            position += position & -position
+
+    def _ahead(self, position: int) -> int:
+        """Members scored better than `position`."""
+        total, tree = 0, self._tree
+        position -= 1
+        while position:
+            total += tree[position]
+            position &= position - 1
+        return total
+
+    def _find(self, n: int) -> int:
+        """Position of the n-th best member (1-based n <= len(self))."""
+        position, step, tree = 0, _TOP_STEP, self._tree
+        while step:
+            nxt = position + step
+            if nxt <= KEYS and tree[nxt] < n:
+                position = nxt
+                n -= tree[nxt]
+            step >>= 1
+        return position + 1
+
+    # ---------------------------------------------------------------- updates
+    def set(self, candidate_id: str, score):
+        self.remove(candidate_id)
+        position = _position(score)
+        self._members.setdefault(position, {})[candidate_id] = None
+        self._scores[candidate_id] = score
+        self._add(position, 1)
+
+    def remove(self, candidate_id: str):
+        score = self._scores.pop(candidate_id, None)
+        if score is None:
+            return
+        position = _position(score)
+        members = self._members[position]
+        del members[candidate_id]
+        if not members:
+            del self._members[position]
+        self._add(position, -1)
+
+    # ---------------------------------------------------------------- queries
+    def rank(self, candidate_id: str):
+        """(rank, score) of a scored member, or None."""
+        score = self._scores.get(candidate_id)
+        if score is None:
+            return None
+        return self._ahead(_position(score)) + 1, score
+
+    def page(self, offset: int = 0, limit: int = 50) -> list:
+        """[(rank, candidate_id, score)] for the members ranked offset+1 .. offset+limit."""
+        rows = []
+        n = offset + 1
+        while len(rows) < limit and n <= len(self._scores):
+            position = self._find(n)
+            ahead = self._ahead(position)
+            members = self._members[position]
+            for candidate_id in itertools.islice(members, n - 1 - ahead, n - 1 - ahead + limit - len(rows)):
+                rows.append((ahead + 1, candidate_id, self._scores[candidate_id]))
+            n = ahead + len(members) + 1
+        return rows
+
+    def __len__(self):
+        return len(self._scores)
+
+
+def cohort_summary(cohort: dict) -> dict:
+    """The parts of a stored cohort the admin pages list."""
+    return {key: cohort.get(key) for key in ('id', 'name', 'interview_type', 'question_count', 'created')}
+
+
+class CohortBoards:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+        # Store version the index reflects; see app.save_data
+        self.synced_version = None
+
+    def _clear(self):
+        self._boards = {}       # cohort_id -> Leaderboard
+        self._cohorts = {}      # cohort_id -> cohort_summary()
+        self._members = {}      # cohort_id -> {candidate_id: interview_id}
+        self._member_of = {}    # candidate_id -> {cohort_id}
+
+    def build(self, data: dict, version=None):
+        with self._lock:
+            self._clear()
+            candidates = data.get('candidates', {})
+            for cohort in data.get('cohorts', {}).values():
+                self._add_cohort(cohort)
+                board = self._boards[cohort['id']]
+                for cid, iid in cohort['members'].items():
+                    iv = next((x for x in reversed(candidates.get(cid, {}).get('interviews', []))
+                               if x['id'] == iid), None)
+                    if iv is not None and iv.get('result') in ('selected', 'rejected'):
+                        board.set(cid, iv['scores']['overall'])
+            self.synced_version = version
+
+    # ---------------------------------------------------------------- updates
+    def add_cohort(self, cohort: dict):
+        with self._lock:
+            self._add_cohort(cohort)
+
+    def _add_cohort(self, cohort):
+        cohort_id = cohort['id']
+        self._boards[cohort_id] = Leaderboard()
+        self._cohorts[cohort_id] = cohort_summary(cohort)
+        self._members[cohort_id] = dict(cohort['members'])
+        for cid in cohort['members']:
+            self._member_of.setdefault(cid, set()).add(cohort_id)
+
+    def set_score(self, cohort_id: str, candidate_id: str, score):
+        with self._lock:
+            board = self._boards.get(cohort_id)
+            if board is not None and candidate_id in self._members[cohort_id]:
+                board.set(candidate_id, score)
+
+    def remove_candidate(self, candidate_id: str):
+        with self._lock:
+            for cohort_id in self._member_of.pop(candidate_id, ()):
+                self._boards[cohort_id].remove(candidate_id)
+                self._members[cohort_id].pop(candidate_id, None)
+
+    # ---------------------------------------------------------------- queries
+    def cohorts(self) -> list:
+        """Summaries of all cohorts, newest first, with their invited and scored counts."""
+        with self._lock:
+            rows = [dict(summary, invited=len(self._members[cid]), scored=len(self._boards[cid]))
+                    for cid, summary in self._cohorts.items()]
+        return sorted(rows, key=lambda c: c['created'] or '', reverse=True)
+
+    def cohort(self, cohort_id: str):
+        with self._lock:
+            summary = self._cohorts.get(cohort_id)
+            if summary is None:
+                return None
+            return dict(summary, invited=len(self._members[cohort_id]), scored=len(self._boards[cohort_id]))
+
+    def rank(self, cohort_id: str, candidate_id: str):
+        """(rank, score, scored members) of a cohort member, or None if not scored yet."""
+        with self._lock:
+            board = self._boards.get(cohort_id)
+            ranked = board.rank(candidate_id) if board is not None else None
+            return None if ranked is None else (*ranked, len(board))
+
+    def page(self, cohort_id: str, offset: int = 0, limit: int = 50) -> list:
+        """[(rank, candidate_id, score, interview_id)], best first; see Leaderboard.page."""
+        with self._lock:
+            board = self._boards.get(cohort_id)
+            if board is None:
+                return []
+            members = self._members[cohort_id]
+            return [(rank, cid, score, members[cid]) for rank, cid, score in board.page(offset, limit)]
@@ -0,0 +1,150 @@
+"""
+metrics.py
+In-process hot-path metrics: per-stage timings, payload sizes, request
+latencies and cache hit/miss counters, exported in Prometheus text format.
+
+Disabled by default. When disabled, @instrument adds one global flag check
+per call and the record_* helpers return immediately.
+"""
+import threading
+import time
+from functools import wraps
+
+ENABLED = False
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms = {}   # (metric, label) -> [count, sum, bucket_counts]
+_sizes = {}        # stage -> [count, sum, max]
+_caches = {}       # name -> [hits, misses]
+
+
+def configure(enabled: bool):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _sizes.clear()
+        _caches.clear()
+
+
+def observe(stage: str, seconds: float, metric: str = 'stage'):
+    if not ENABLED:
+        return
+    with _lock:
+        h = _histograms.get((metric, stage))
+        if h is None:
+            h = _histograms[(metric, stage)] = [0, 0.0, [0] * len(BUCKETS)]
+        h[0] += 1
+        h[1] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[2][i] += 1
+                break
+
+
+def observe_size(stage: str, size: int):
+    if not ENABLED:
+        return
+    with _lock:
+        s = _sizes.get(stage)
+        if s is None:
+            s = _sizes[stage] = [0, 0, 0]
+        s[0] += 1
+        s[1] += size
+        s[2] = max(s[2], size)
+
+
+def record_cache(name: str, hit: bool):
+    if not ENABLED:
+        return
+    with _lock:
+        c = _caches.setdefault(name, [0, 0])
+        c[0 if hit else 1] += 1
+
+
+def instrument(stage: str, size=None):
+    """
+    Decorator timing every call of the wrapped function as `stage`.
+    size(result, args, kwargs) -> int, if given, records the payload size
+    (bytes for files, characters for text, items for lists).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return f(*args, **kwargs)
+            started = time.perf_counter()
+            result = f(*args, **kwargs)
+            observe(stage, time.perf_counter() - started)
+            if size is not None:
+                try:
+                    observe_size(stage, int(size(result, args, kwargs)))
+                except Exception:
+                    pass
+            return result
+        return wrapper
+    return decorator
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus() -> str:
+    """Snapshot every metric in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {k: (v[0], v[1], list(v[2])) for k, v in _histograms.items()}
+        sizes = {k: list(v) for k, v in _sizes.items()}
+        caches = {k: list(v) for k, v in _caches.items()}
+
+    lines = []
+    families = (
+        ('stage', 'smarthire_stage_duration_seconds', 'Time spent in instrumented hot-path stages.'),
+        ('request', 'smarthire_request_duration_seconds', 'Request latency by Flask endpoint.'),
+        ('queue', 'smarthire_queue_wait_seconds', 'Time work waited in a bounded pool before starting.'),
+    )
+    label_names = {'stage': 'stage', 'request': 'endpoint', 'queue': 'pool'}
+    for metric, name, help_text in families:
+        rows = sorted((label, v) for (m, label), v in histograms.items() if m == metric)
+        if not rows:
+            continue
+        label_name = label_names[metric]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for label, (count, total, buckets) in rows:
+            lbl = f'{label_name}="{_escape(label)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{lbl},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{lbl},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{lbl}}} {total:.6f}')
+            lines.append(f'{name}_count{{{lbl}}} {count}')
+
+    if sizes:
+        lines.append('# HELP smarthire_stage_payload_size Payload size per stage call '
+                     '(bytes for files, characters for text, items for lists).')
+        lines.append('# TYPE smarthire_stage_payload_size summary')
+        for stage, (count, total, biggest) in sorted(sizes.items()):
+            lbl = f'stage="{_escape(stage)}"'
+            lines.append(f'smarthire_stage_payload_size_sum{{{lbl}}} {total}')
+            lines.append(f'smarthire_stage_payload_size_count{{{lbl}}} {count}')
+        lines.append('# HELP smarthire_stage_payload_size_max Largest payload seen per stage.')
+        lines.append('# TYPE smarthire_stage_payload_size_max gauge')
+        for stage, (count, total, biggest) in sorted(sizes.items()):
+            lines.append(f'smarthire_stage_payload_size_max{{stage="{_escape(stage)}"}} {biggest}')
+
+    if caches:
+        lines.append('# HELP smarthire_cache_requests_total Cache lookups by cache and outcome.')
+        lines.append('# TYPE smarthire_cache_requests_total counter')
+        for name, (hits, misses) in sorted(caches.items()):
+            lines.append(f'smarthire_cache_requests_total{{cache="{_escape(name)}",result="hit"}} {hits}')
+            lines.append(f'smarthire_cache_requests_total{{cache="{_escape(name)}",result="miss"}} {misses}')
+
+    return '\n'.join(lines) + '\n'
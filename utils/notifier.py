@@ -0,0 +1,385 @@
+"""
+notifier.py
+Bulk result notification over pooled, rate-limited SMTP connections.
+
+A job is a list of recipients (one per interview). Messages are rendered
+from the precompiled email/result.txt template and sent by a small set of
+background worker threads, each reusing a connection from SMTPPool instead
+of opening (and TLS-handshaking) one per message. A token bucket keeps the
+send rate under the provider's limit. Every recipient's status (queued,
+sent, failed), attempt count and last error are tracked in a JSON status
+file; transient SMTP errors are retried with backoff, and failed recipients
+of a job can be re-queued. Queued recipients of a job whose sending process
+has stopped (on this host) are marked failed when the notifier starts, so
+they can be retried instead of staying queued for good.
+
+For local testing point MAIL_SERVER/MAIL_PORT at a debugging server, e.g.
+    python -m smtpd -n -c DebuggingServer localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0 python app.py
+"""
+import datetime
+import json
+import os
+import queue
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+try:
+    import fcntl
+except ImportError:   # Windows: fall back to in-process locking only
+    fcntl = None
+
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 2.0         # seconds, doubled per attempt
+IDLE_CHECK_SECONDS = 30     # NOOP a pooled connection idle for longer than this before reuse
+
+_HOST = socket.gethostname()
+
+# Connection-level problems worth retrying on a fresh connection
+_TRANSIENT = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPHeloError,
+              ConnectionError, TimeoutError, OSError)
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPPool:
+    """Reusable SMTP connections, opened on demand up to `size`."""
+
+    def __init__(self, host: str, port: int, use_tls: bool = False, username: str = None,
+                 password: str = None, size: int = 2, timeout: float = 30):
+        self.host, self.port, self.use_tls = host, port, use_tls
+        self.username, self.password = username, password
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0     # connections opened so far (handshakes paid)
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conn.starttls()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        self.opened += 1
+        return conn
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < IDLE_CHECK_SECONDS:
+                    return conn
+                try:
+                    if conn.noop()[0] == 250:
+                        return conn
+                except smtplib.SMTPException:
+                    pass
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False):
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                self._discard(conn)
+
+
+class BulkNotifier:
+    def __init__(self, app, status_file: str, workers: int = 2, rate: float = 5.0):
+        """
+        app: the Flask app (mail settings and the email template come from it).
+        rate: messages per second across all workers.
+        """
+        self.app = app
+        self.status_file = status_file
+        self.workers = workers
+        config = app.config
+        self.sender = config.get('MAIL_DEFAULT_SENDER')
+        self.pool = SMTPPool(config['MAIL_SERVER'], config['MAIL_PORT'], config.get('MAIL_USE_TLS', False),
+                             config.get('MAIL_USERNAME'), config.get('MAIL_PASSWORD'), size=workers)
+        self.limiter = RateLimiter(rate, burst=workers)
+        self.template = app.jinja_env.get_template('email/result.txt')   # compiled once
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._jobs = self._recover()
+        self._owned = set()     # jobs this process sends (and is the writer for)
+        self._threads = []
+        self._saved_at = 0.0
+
+    # ----------------------------------------------------------------- status
+    def _load(self) -> dict:
+        try:
+            with open(self.status_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.status_file}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, jobs: dict):
+        tmp = f'{self.status_file}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(jobs, f, indent=2)
+        os.replace(tmp, self.status_file)
+
+    def _save(self):
+        # Other worker processes may own other jobs in the same file: only write ours
+        with self._file_lock():
+            on_disk = self._load()
+            on_disk.update({job_id: self._jobs[job_id] for job_id in self._owned})
+            self._write(on_disk)
+        self._jobs.update({job_id: job for job_id, job in on_disk.items() if job_id not in self._owned})
+        self._saved_at = time.monotonic()
+
+    def _recover(self) -> dict:
+        """The status file, with the queued items of jobs whose sender has stopped marked failed."""
+        with self._file_lock():
+            jobs = self._load()
+            abandoned = [job for job in jobs.values() if _abandoned(job)]
+            for job in abandoned:
+                for item in job['items'].values():
+                    if item['status'] == 'queued':
+                        item.update(status='failed', error='interrupted: the sending process stopped')
+            if abandoned:
+                self._write(jobs)
+        return jobs
+
+    def _refresh(self):
+        for job_id, job in self._load().items():
+            if job_id not in self._owned:
+                self._jobs[job_id] = job
+
+    def job(self, job_id: str):
+        with self._lock:
+            if job_id not in self._jobs:
+                self._refresh()
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def jobs(self) -> list:
+        with self._lock:
+            self._refresh()
+            return sorted(({'id': jid, 'created_at': j['created_at'], 'description': j['description'],
+                            'counts': job_counts(j)} for jid, j in self._jobs.items()),
+                          key=lambda j: j['created_at'], reverse=True)
+
+    def notified_ids(self) -> set:
+        """Interview ids whose result email has been sent, or is queued to be, by any job."""
+        with self._lock:
+            self._refresh()
+            return {iid for job in self._jobs.values() for iid, item in job['items'].items()
+                    if item['status'] in ('sent', 'queued')}
+
+    # ------------------------------------------------------------------- jobs
+    def render(self, recipient: dict) -> EmailMessage:
+        msg = EmailMessage()
+        msg['Subject'] = f"SmartHire AI: Your Interview Result - {recipient['result'].title()}"
+        msg['From'] = self.sender
+        msg['To'] = recipient['email']
+        msg.set_content(self.template.render(**recipient))
+        return msg
+
+    def submit(self, recipients: list, description: str = '') -> str:
+        """
+        Queue one message per recipient dict (interview_id, email, name,
+        result, overall, feedback). Returns the job id.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._owned.add(job_id)
+            self._jobs[job_id] = {
+                'created_at': datetime.datetime.now().isoformat(),
+                'description': description,
+                'owner': _owner(),
+                'items': {r['interview_id']: {'email': r['email'], 'name': r['name'], 'status': 'queued',
+                                              'attempts': 0, 'error': None, 'sent_at': None}
+                          for r in recipients},
+            }
+            self._save()
+        self._start()
+        for r in recipients:
+            self._queue.put((job_id, r))
+        return job_id
+
+    def retry_failed(self, job_id: str, recipients: dict) -> int:
+        """Re-queue the failed items of a job; recipients maps interview_id -> fresh recipient dict."""
+        with self._lock:
+            self._refresh()
+            job = self._jobs.get(job_id)
+            if not job:
+                return 0
+            self._owned.add(job_id)
+            job['owner'] = _owner()
+            failed = [iid for iid, item in job['items'].items() if item['status'] == 'failed' and iid in recipients]
+            for iid in failed:
+                job['items'][iid].update(status='queued', attempts=0, error=None)
+            self._save()
+        self._start()
+        for iid in failed:
+            self._queue.put((job_id, recipients[iid]))
+        return len(failed)
+
+    def wait(self):
+        """Block until everything queued so far has been sent or has failed."""
+        self._queue.join()
+
+    # ---------------------------------------------------------------- workers
+    def _start(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                t = threading.Thread(target=self._work, name=f'notifier-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _work(self):
+        while True:
+            job_id, recipient = self._queue.get()
+            try:
+                self._deliver(job_id, recipient)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job_id: str, recipient: dict):
+        try:
+            msg = self.render(recipient)
+        except Exception as e:
+            self._update(job_id, recipient['interview_id'], 'failed', f'render: {e}')
+            return
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.limiter.acquire()
+            try:
+                conn = self.pool.acquire()
+            except Exception as e:
+                error, retry = f'connect: {e}', True
+            else:
+                try:
+                    conn.send_message(msg)
+                    self.pool.release(conn)
+                    self._update(job_id, recipient['interview_id'], 'sent', None, attempt)
+                    return
+                except smtplib.SMTPRecipientsRefused as e:
+                    self.pool.release(conn)
+                    error, retry = f'recipient refused: {e.recipients}', False
+                except smtplib.SMTPResponseException as e:
+                    # 4xx are temporary; 5xx are permanent for this message
+                    self.pool.release(conn, broken=e.smtp_code == 421)
+                    error, retry = f'{e.smtp_code} {e.smtp_error!r}', 400 <= e.smtp_code < 500
+                except _TRANSIENT as e:
+                    self.pool.release(conn, broken=True)
+                    error, retry = f'{type(e).__name__}: {e}', True
+                except Exception as e:
+                    self.pool.release(conn, broken=True)
+                    error, retry = f'{type(e).__name__}: {e}', False
+            self._update(job_id, recipient['interview_id'], 'queued' if retry and attempt < MAX_ATTEMPTS
+                         else 'failed', error, attempt)
+            if not retry:
+                return
+            if attempt < MAX_ATTEMPTS:
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    def _update(self, job_id, interview_id, status, error, attempts=None):
+        with self._lock:
+            item = self._jobs[job_id]['items'][interview_id]
+            item['status'] = status
+            item['error'] = error
+            if attempts is not None:
+                item['attempts'] = attempts
+            if status == 'sent':
+                item['sent_at'] = datetime.datetime.now().isoformat()
+            # Persist at most once a second while a job is running, and always when it finishes
+            finished = all(i['status'] != 'queued' for i in self._jobs[job_id]['items'].values())
+            if finished or time.monotonic() - self._saved_at > 1.0:
+                self._save()
+
+
+def _owner() -> str:
+    return f'{_HOST}:{os.getpid()}'
+
+
+def _abandoned(job: dict) -> bool:
+    """True if the job has queued items and the process sending them is known to have stopped."""
+    if not any(item['status'] == 'queued' for item in job['items'].values()):
+        return False
+    host, _, pid = job.get('owner', '').rpartition(':')
+    if not pid:
+        return True     # written before jobs recorded their owner
+    if host != _HOST:
+        return False    # can't tell from here
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, ValueError):
+        return False
+    return False
+
+
+def job_counts(job: dict) -> dict:
+    counts = {'queued': 0, 'sent': 0, 'failed': 0}
+    for item in job['items'].values():
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+    return counts
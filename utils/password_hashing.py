@@ -0,0 +1,121 @@
+"""
+password_hashing.py
+Password hashing off the request workers, with admission control.
+
+pbkdf2/scrypt hashes are deliberately CPU-expensive (~0.3s per pbkdf2-sha256
+at 600k iterations), so a burst of logins run inline would occupy every
+core and starve all other routes. PasswordHasher runs hashes on a bounded
+thread pool (hashlib releases the GIL while hashing, so the pool really
+uses `workers` cores and no more). At most `max_pending` hashes may be
+queued or running; past that, new requests are refused straight away with
+HashPoolBusy carrying a Retry-After estimate instead of piling up behind
+the queue.
+
+The hash method is a Werkzeug method string (e.g. 'pbkdf2:sha256:600000'
+or 'scrypt:32768:8:1'). Stored hashes made with other parameters still
+verify; needs_rehash() tells the login route to re-hash them with the
+current policy.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from utils import metrics
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing queue is full; retry_after is in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'password hashing queue is full; retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+def normalize_method(method: str) -> str:
+    """Expand Werkzeug's defaults so the method compares equal to a stored hash's prefix."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f'unsupported password hash method: {method}')
+
+
+class PasswordHasher:
+    def __init__(self, method: str = 'pbkdf2:sha256:600000', salt_length: int = 16, workers: int = 1,
+                 max_pending: int = 64):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_seconds = 0.3     # running average hash time, for Retry-After estimates
+        self.rejected = 0
+
+    # ----------------------------------------------------------------- policy
+    def needs_rehash(self, pwhash: str) -> bool:
+        return bool(pwhash) and pwhash.split('$', 1)[0] != self.method
+
+    # -------------------------------------------------------------- operations
+    def hash(self, password: str) -> str:
+        return self._run('hash', generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        if not pwhash or pwhash.count('$') < 2:
+            return False    # no usable hash (e.g. bulk-imported accounts): nothing to compute
+        return self._run('verify', check_password_hash, pwhash, password)
+
+    def hash_async(self, password: str):
+        """Future of hash(password), or None when the queue is full (for best-effort rehashes)."""
+        try:
+            return self._submit('rehash', generate_password_hash, password, self.method, self.salt_length)
+        except HashPoolBusy:
+            return None
+
+    def _run(self, op, fn, *args):
+        return self._submit(op, fn, *args).result()
+
+    def _submit(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+                wait = self._pending / self.workers * self._avg_seconds
+            raise HashPoolBusy(max(1, math.ceil(wait)))
+        with self._lock:
+            self._pending += 1
+        queued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            metrics.observe('password_hash', started - queued, metric='queue')
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe(f'password_{op}', elapsed)
+                with self._lock:
+                    self._pending -= 1
+                    self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * elapsed
+                self._slots.release()
+
+        try:
+            return self._pool.submit(job)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'workers': self.workers, 'pending': self._pending, 'max_pending': self.max_pending,
+                    'avg_hash_seconds': round(self._avg_seconds, 4), 'rejected': self.rejected}
@@ -0,0 +1,199 @@
+"""
+question_difficulty.py
+Per-question difficulty calibrated from past answers, and a sampler that
+picks questions near a target difficulty.
+
+QuestionStats keeps, per question id, [attempts, technical score sum,
+empty answers], updated as each interview is evaluated and kept in line
+with the store like the other indexes (see app.save_data). Difficulty is
+1 - mean technical score / 100, shrunk towards the prior for questions
+with few attempts, so a new question starts in the middle.
+
+DifficultySampler keeps each bank list split into BUCKETS difficulty
+buckets of positions in the list (4-byte array items, not the strings, so
+a compiled bank stays in its memory map). A pick chooses a bucket in
+proportion to its size times a Gaussian around the target difficulty, then
+a uniform index inside it, so a selection costs O(count x buckets) however
+large the bank is; nothing is copied or shuffled per call. A drawn question
+whose difficulty has since moved to another bucket is moved there and the
+draw repeated; a bank list is re-bucketed only when it is replaced (e.g. by
+a bank reload) or grows.
+"""
+import math
+import random
+import threading
+from array import array
+
+from utils.questions_bank import question_id
+
+BUCKETS = 5
+PRIOR_MEAN = 50.0       # technical score assumed for an unseen question
+PRIOR_WEIGHT = 3        # ... worth this many attempts
+SPREAD = 0.15           # std-dev of the preference around the target difficulty
+MAX_TRIES = 20          # random picks per wanted question before falling back to a scan
+
+
+class QuestionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}        # question_id -> [attempts, technical_sum, empty_answers]
+        self._seen = set()      # interview ids already counted
+        # Store version the index reflects; see app.save_data
+        self.synced_version = None
+
+    def build(self, data: dict, version=None):
+        """Recount every evaluated interview in the store, dropping deleted candidates' interviews."""
+        with self._lock:
+            self._stats = {}
+            self._seen = set()
+            for cand in data.get('candidates', {}).values():
+                for iv in cand.get('interviews', []):
+                    if iv.get('result') in ('selected', 'rejected'):
+                        self._count(iv, 1)
+            self.synced_version = version
+
+    def add_interview(self, iv: dict):
+        with self._lock:
+            self._count(iv, 1)
+
+    def remove_interview(self, iv: dict):
+        with self._lock:
+            self._count(iv, -1)
+
+    def _count(self, iv: dict, sign: int):
+        if (iv['id'] in self._seen) == (sign > 0):
+            return
+        if sign > 0:
+            self._seen.add(iv['id'])
+        else:
+            self._seen.discard(iv['id'])
+        per_question = iv.get('scores', {}).get('per_question', [])
+        for q, pq in zip(iv.get('questions', []), per_question):
+            qid = q.get('id') or question_id(q['question'])
+            s = self._stats.setdefault(qid, [0, 0.0, 0])
+            s[0] += sign
+            s[1] += sign * float(pq.get('technical_score', 0))
+            if not (q.get('answer') or '').strip():
+                s[2] += sign
+            if s[0] <= 0:
+                del self._stats[qid]
+
+    def difficulty(self, qid: str) -> float:
+        s = self._stats.get(qid)
+        attempts, total = (s[0], s[1]) if s else (0, 0.0)
+        mean = (total + PRIOR_MEAN * PRIOR_WEIGHT) / (attempts + PRIOR_WEIGHT)
+        return min(1.0, max(0.0, 1 - mean / 100))
+
+    def stats(self, qid: str) -> dict:
+        with self._lock:
+            attempts, total, empty = self._stats.get(qid, (0, 0.0, 0))
+        return {
+            'attempts': attempts,
+            'mean_technical': round(total / attempts, 1) if attempts else None,
+            'empty_rate': round(empty / attempts, 3) if attempts else None,
+            'difficulty': round(self.difficulty(qid), 3),
+        }
+
+
+def target_for_score(last_score) -> float:
+    """Target difficulty for a candidate: harder questions after a stronger last interview."""
+    if last_score is None:
+        return 0.5
+    return 0.3 + 0.4 * min(100.0, max(0.0, float(last_score))) / 100
+
+
+class DifficultySampler:
+    def __init__(self, stats: QuestionStats, buckets: int = BUCKETS, spread: float = SPREAD):
+        self.stats = stats
+        self.buckets = buckets
+        self.spread = spread
+        self._lock = threading.Lock()
+        self._sources = {}      # pool key -> (bank list object, its length when bucketed)
+        self._cells = {}        # pool key -> [array of positions in the bank list, per bucket]
+
+    def _bucket(self, qid: str) -> int:
+        return min(self.buckets - 1, int(self.stats.difficulty(qid) * self.buckets))
+
+    # ----------------------------------------------------------------- sync
+    def _index_pool(self, key, questions):
+        cells = [array('I') for _ in range(self.buckets)]
+        for pos, q in enumerate(questions):
+            cells[self._bucket(question_id(q))].append(pos)
+        self._cells[key] = cells
+        self._sources[key] = (questions, len(questions))
+
+    def _sync(self, pools: list):
+        for key, questions in pools:
+            source = self._sources.get(key)
+            if source is None or source[0] is not questions or source[1] != len(questions):
+                self._index_pool(key, questions)
+
+    # --------------------------------------------------------------- sample
+    def sample(self, pools: list, count: int, target: float, accept) -> list:
+        """
+        Up to `count` distinct questions from pools ([(key, bank list)]) that
+        pass accept(question), preferring difficulty near `target` (0-1).
+        The lock is held to snapshot the buckets and for each draw, never
+        while accept() runs.
+        """
+        if count <= 0:
+            return []
+        with self._lock:
+            self._sync(pools)
+            cells, weights = [], []
+            for key, questions in pools:
+                pool_cells = self._cells[key]
+                for b, cell in enumerate(pool_cells):
+                    if cell:
+                        centre = (b + 0.5) / self.buckets
+                        cells.append((questions, pool_cells, b))
+                        weights.append(len(cell) * math.exp(-((centre - target) ** 2) / (2 * self.spread ** 2)))
+        if not cells:
+            return []
+
+        picked, tried = [], set()
+        for _ in range(count * MAX_TRIES):
+            q = self._draw(cells, weights, tried)
+            if q is None:
+                continue
+            tried.add(q)
+            if accept(q):
+                picked.append(q)
+                if len(picked) == count:
+                    return picked
+
+        # Pool nearly exhausted by used/vetoed questions: scan what's left, nearest buckets first
+        order = sorted(range(len(cells)), key=lambda i: weights[i], reverse=True)
+        for i in order:
+            questions, pool_cells, b = cells[i]
+            with self._lock:
+                positions = list(pool_cells[b])
+            rest = [q for q in map(questions.__getitem__, positions) if q not in tried]
+            random.shuffle(rest)
+            for q in rest:
+                tried.add(q)
+                if accept(q):
+                    picked.append(q)
+                    if len(picked) == count:
+                        return picked
+        return picked
+
+    def _draw(self, cells: list, weights: list, tried: set):
+        """One weighted pick from the snapshot, or None to draw again."""
+        with self._lock:
+            questions, pool_cells, b = random.choices(cells, weights)[0]
+            cell = pool_cells[b]
+            if not cell:
+                return None
+            i = random.randrange(len(cell))
+            q = questions[cell[i]]
+            if q in tried:
+                return None
+            actual = self._bucket(question_id(q))
+            if actual != b:
+                # Its difficulty moved since bucketing: swap-remove it into the right bucket, draw again
+                pool_cells[actual].append(cell[i])
+                cell[i] = cell[-1]
+                cell.pop()
+                return None
+            return q
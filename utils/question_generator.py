@@ -1,56 +1,120 @@
 """
 question_generator.py
 Uses the 500+ question bank to generate non-repeating, skill-matched questions.
-Falls back to Gemini AI for skills not in the bank.
+Skills not in the bank are served from the generated bank, which Gemini refills
+in the background (see utils/generated_bank.py). When the banks can't fill an
+interview, Gemini generates for it once, synchronously.
 """
-import os
 import json
 import random
 
-from utils.questions_bank import get_technical_questions, get_management_questions
+from utils import generated_bank, similarity
+from utils.questions_bank import (get_technical_questions, get_technical_question_sets, get_management_questions,
+                                  has_bank_coverage)
+# Optional: Gemini AI for skills not covered by bank (imported on first use)
+from utils.integrations import gemini_available, gemini_model
+from utils.metrics import instrument
 
-# Optional: Gemini AI for skills not covered by bank
-try:
-    import google.generativeai as genai
-    GEMINI_KEY = os.environ.get('GEMINI_API_KEY', '')
-    if GEMINI_KEY:
-        genai.configure(api_key=GEMINI_KEY)
-    GEMINI_AVAILABLE = bool(GEMINI_KEY)
-except ImportError:
-    GEMINI_AVAILABLE = False
 
-
-def generate_questions(skills: list, interview_type: str, used_questions: list = None, count: int = 5) -> list:
+@instrument('generate_questions', size=lambda questions, args, kwargs: len(questions))
+def generate_questions(skills: list, interview_type: str, used_questions: list = None, count: int = 5,
+                       target_difficulty: float = None) -> list:
     """
     Generate 'count' unique interview questions.
-    - Pulls from local bank first (no API cost, no repeats).
-    - Falls back to Gemini for niche skills not in bank.
-    - used_questions: list of question strings already asked to this candidate.
+    - Pulls from the static and generated banks (no API cost, no repeats).
+    - Niche skills running low are queued for a background Gemini refill.
+      Only if the banks can't fill the set does this call wait for one
+      Gemini generation; generic questions are the last resort.
+    - used_questions: list of question strings already asked to this candidate;
+      paraphrases of them are rejected too (see utils/similarity.py).
+    - target_difficulty: 0-1, preferred difficulty of technical questions
+      (see utils/question_difficulty.py).
     """
     used_questions = used_questions or []
+    accept = similarity.history_filter(used_questions)
 
     if interview_type == 'management':
-        return get_management_questions(count=count, used_questions=used_questions)
+        return get_management_questions(count=count, used_questions=used_questions, accept=accept)
 
-    # Technical: try bank first
-    questions = get_technical_questions(skills, count=count, used_questions=used_questions)
+    # Technical: static + generated banks
+    generated_bank.refresh()
+    questions = get_technical_questions(skills, count=count, used_questions=used_questions, accept=accept,
+                                        target_difficulty=target_difficulty)
+    request_refill(skills)
+    return _top_up(questions, skills, used_questions, accept, count)
 
-    # If we didn't get enough from the bank, top up with Gemini
-    if len(questions) < count and GEMINI_AVAILABLE:
-        remaining = count - len(questions)
-        extra = _generate_with_gemini(skills, interview_type, remaining, used_questions + questions)
-        questions.extend(extra)
 
-    # Last resort fallback
-    if not questions:
-        questions = _fallback_questions(skills, count)
+@instrument('generate_question_sets', size=lambda sets, args, kwargs: len(sets))
+def generate_question_sets(members: list, interview_type: str, count: int = 5) -> list:
+    """
+    generate_questions for a batch of candidates (e.g. a cohort) in one pass.
+    - members: [(skills, used_questions, target_difficulty)]; returns one
+      question list per member, in order.
+    - The bank is read once for the whole batch (see
+      get_technical_question_sets), and the generated bank is refreshed and
+      refills requested once rather than per member. A skill is generated
+      for synchronously at most once per batch.
+    """
+    filters = [similarity.history_filter(used or []) for _, used, _ in members]
+
+    if interview_type == 'management':
+        return [get_management_questions(count=count, used_questions=used, accept=accept)
+                for (_, used, _), accept in zip(members, filters)]
+
+    generated_bank.refresh()
+    sets = get_technical_question_sets(
+        [(skills, used, accept, target) for (skills, used, target), accept in zip(members, filters)], count)
+    request_refill(list(dict.fromkeys(s for skills, _, _ in members for s in skills)))
+    generated = {}
+    return [_top_up(questions, skills, used or [], accept, count, generated)
+            for (skills, used, _), accept, questions in zip(members, filters, sets)]
+
+
+def _top_up(questions: list, skills: list, used_questions: list, accept, count: int, generated: dict = None) -> list:
+    # Generate now rather than start a short interview; generic questions if that fails too
+    for source in (lambda: _generate_now(skills, count - len(questions), used_questions + questions, generated),
+                   lambda: _fallback_questions(skills, count)):
+        if len(questions) >= count:
+            break
+        asked = set(used_questions) | set(questions)
+        questions.extend(q for q in dict.fromkeys(source())
+                         if q not in asked and (accept is None or accept(q)))
 
     return questions[:count]
 
 
+def _generate_now(skills: list, shortfall: int, asked: list, generated: dict = None) -> list:
+    """
+    One synchronous Gemini generation for the first niche skill, saved to the
+    generated bank like a refill. generated caches it per skill for a batch.
+    """
+    niche = [s.lower() for s in skills if not has_bank_coverage(s)]
+    if not niche or not gemini_available():
+        return []
+    skill = niche[0]
+    if generated is not None and skill in generated:
+        return generated[skill]
+    questions = [q.strip() for q in _generate_for_skill(skill, max(shortfall, generated_bank.REFILL_BATCH), asked)
+                 if isinstance(q, str) and q.strip()]
+    generated_bank.add(skill, questions)
+    if generated is not None:
+        generated[skill] = questions
+    return questions
+
+
+def request_refill(skills: list):
+    """Queue background generation for niche skills whose generated stock is low."""
+    if gemini_available():
+        generated_bank.request_refill(skills, _generate_for_skill)
+
+
+def _generate_for_skill(skill: str, count: int, existing: list) -> list:
+    return _generate_with_gemini([skill], 'technical', count, existing)
+
+
 def _generate_with_gemini(skills: list, interview_type: str, count: int, used_questions: list) -> list:
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = gemini_model('gemini-2.0-flash')
         skills_str = ', '.join(skills[:8])
         used_str = '\n'.join(f'- {q}' for q in used_questions[:20])
         prompt = f"""Generate exactly {count} unique {interview_type} interview questions for a candidate with skills: {skills_str}.
@@ -0,0 +1,211 @@
+"""
+rate_limit.py
+Per-user rate limits and per-route concurrency caps for expensive endpoints.
+
+Each limited route has a rule: a token bucket per (route, user) that refills
+at `per_minute` requests a minute and holds up to `burst` of them, and a
+cap of `concurrency` requests of that route running at once, across users.
+A request over either limit is refused straight away with RateLimited
+(-> 429 with Retry-After) instead of queueing for a worker, so a burst of
+uploads or interview starts can't occupy every worker and stall the cheap
+routes. The limit is checked before login_required, keyed on the session's
+user id, so a refused request doesn't read the store.
+
+The counters live in a backend:
+  MemoryBackend   this process only (a single worker process)
+  SQLiteBackend   a SQLite file shared by every worker process on the host;
+                  running slots are leases that expire, so a crashed worker
+                  can't leak them
+"""
+import functools
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import session
+
+
+class RateLimited(Exception):
+    """Raised when a request is over its limit; retry_after is in whole seconds."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f'{reason}; retry in {retry_after}s')
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}      # key -> [tokens, monotonic time of last update]
+        self._running = {}      # route -> running requests
+
+    def take(self, key: str, per_second: float, burst: int) -> float:
+        """Take a token; 0 if there was one, else seconds until there will be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * per_second)
+            if tokens >= 1:
+                self._buckets[key] = [tokens - 1, now]
+                return 0.0
+            self._buckets[key] = [tokens, now]
+            return (1 - tokens) / per_second
+
+    def acquire(self, route: str, limit: int):
+        with self._lock:
+            if self._running.get(route, 0) >= limit:
+                return None
+            self._running[route] = self._running.get(route, 0) + 1
+            return route
+
+    def release(self, route: str, slot):
+        with self._lock:
+            self._running[route] -= 1
+
+    def prune(self, idle_seconds: float):
+        """Forget buckets untouched for idle_seconds (they are full again by then)."""
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            for key in [k for k, (_, stamp) in self._buckets.items() if stamp < cutoff]:
+                del self._buckets[key]
+
+
+class SQLiteBackend:
+    def __init__(self, path: str, lease: float = 300):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, stamp REAL)')
+            db.execute('CREATE TABLE IF NOT EXISTS slots '
+                       '(id INTEGER PRIMARY KEY AUTOINCREMENT, route TEXT, pid INTEGER, expires REAL)')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')    # counters, not records: losing the last writes is fine
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Immediate(self._db())
+
+    def take(self, key: str, per_second: float, burst: int) -> float:
+        now = time.time()   # wall clock: shared between processes
+        with self._transaction() as db:
+            row = db.execute('SELECT tokens, stamp FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * per_second)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / per_second
+            db.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)',
+                       (key, tokens - 1 if wait == 0 else tokens, now))
+        return wait
+
+    def acquire(self, route: str, limit: int):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM slots WHERE expires < ?', (now,))
+            running = db.execute('SELECT COUNT(*) FROM slots WHERE route = ?', (route,)).fetchone()[0]
+            if running >= limit:
+                return None
+            return db.execute('INSERT INTO slots (route, pid, expires) VALUES (?, ?, ?)',
+                              (route, os.getpid(), now + self.lease)).lastrowid
+
+    def release(self, route: str, slot):
+        with self._transaction() as db:
+            db.execute('DELETE FROM slots WHERE id = ?', (slot,))
+
+    def prune(self, idle_seconds: float):
+        with self._transaction() as db:
+            db.execute('DELETE FROM buckets WHERE stamp < ?', (time.time() - idle_seconds,))
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT: the read-modify-write of a counter is atomic across processes."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+class Limiter:
+    PRUNE_EVERY = 1000      # requests between sweeps of idle buckets
+
+    def __init__(self, backend, rules: dict, enabled: bool = True):
+        self.backend = backend
+        self.rules = rules      # route -> {'per_minute', 'burst', 'concurrency'}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._avg_seconds = {}  # route -> running average duration, for Retry-After of a full route
+        self._requests = 0
+        self.rejected = {}      # route -> refused requests
+
+    def limit(self, route: str):
+        """Decorator for a view; apply outside login_required, which turns away requests without a user."""
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapped(*args, **kwargs):
+                rule = self.rules.get(route)
+                if not self.enabled or rule is None or 'user_id' not in session:
+                    return f(*args, **kwargs)
+                slot = self._admit(route, rule)
+                started = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.backend.release(route, slot)
+                    elapsed = time.perf_counter() - started
+                    with self._lock:
+                        self._avg_seconds[route] = 0.8 * self._avg_seconds.get(route, elapsed) + 0.2 * elapsed
+            return wrapped
+        return decorator
+
+    def _admit(self, route: str, rule: dict):
+        self._maybe_prune()
+        per_second = rule['per_minute'] / 60
+        wait = self.backend.take(f"{route}:{session.get('user_id')}", per_second, rule['burst'])
+        if wait > 0:
+            self._reject(route)
+            raise RateLimited(max(1, math.ceil(wait)), 'too many requests')
+        slot = self.backend.acquire(route, rule['concurrency'])
+        if slot is None:
+            self._reject(route)
+            with self._lock:
+                avg = self._avg_seconds.get(route, 1.0)
+            raise RateLimited(max(1, math.ceil(avg)), 'server busy')
+        return slot
+
+    def _reject(self, route: str):
+        with self._lock:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+
+    def _maybe_prune(self):
+        with self._lock:
+            self._requests += 1
+            due = self._requests % self.PRUNE_EVERY == 0
+        if due:
+            # A bucket idle for longer than a full refill is indistinguishable from a new one
+            self.backend.prune(max(r['burst'] / (r['per_minute'] / 60) for r in self.rules.values()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'rejected': dict(self.rejected),
+                    'avg_seconds': {r: round(s, 3) for r, s in self._avg_seconds.items()}}
+
+
+def make_backend(name: str, path: str = None, lease: float = 300):
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend(path, lease)
+    raise ValueError(f'unknown rate limit backend: {name}')
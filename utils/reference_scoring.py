@@ -0,0 +1,115 @@
+"""
+reference_scoring.py
+Offline technical-accuracy scoring against reference key points.
+
+Every technical bank question with an entry in the "references" section of
+question_bank.json (key points keyed by question_id) gets a TF-IDF vector
+over its key-point terms (content-word unigrams and bigrams, IDF
+taken across all references). Each vector is kept sparse, as a dict of
+only the reference's own terms, already divided by its total weight: a
+reference has a few dozen terms out of thousands in the vocabulary. An
+answer is scored by how much of its question's reference weight it covers:
+coverage = ref . present(answer) / sum(ref), so long answers aren't
+penalised and padding earns nothing. get_scorer() rebuilds the scorer when
+the bank reloads (see questions_bank.current_bank).
+"""
+import math
+import re
+import threading
+
+from utils.questions_bank import bank_references, current_bank, question_id
+
+# Coverage at which an answer earns full technical marks
+FULL_MARKS_COVERAGE = 0.5
+# Reference terms that already appear in the question are worth less: echoing the question isn't knowledge
+QUESTION_TERM_WEIGHT = 0.3
+
+_WORDS = re.compile(r'[a-z0-9+#]+')
+_STOP_WORDS = frozenset("""
+a an the is are was were be been being of in on at to for from by with as and or but if then than so that this
+these those it its it's they them their there what which who whom how why when where do does did doing done
+can could would should will shall may might must you your i me my we our he she his her not no yes also just
+very more most such into over under about between through each other some any all both only own same too
+""".split())
+
+
+def _stem(word: str) -> str:
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def features(text: str) -> set:
+    """Content-word unigrams and bigrams of text."""
+    words = [_stem(w) for w in _WORDS.findall((text or '').lower()) if w not in _STOP_WORDS]
+    grams = set(words)
+    grams.update(f'{a} {b}' for a, b in zip(words, words[1:]))
+    return grams
+
+
+class ReferenceScorer:
+    def __init__(self, references: dict):
+        """references: question text -> its key points."""
+        docs = {q: features(points) for q, points in references.items()}
+        df = {}
+        for doc in docs.values():
+            for f in doc:
+                df[f] = df.get(f, 0) + 1
+        n = len(docs)
+        idf = {f: math.log((1 + n) / (1 + c)) + 1 for f, c in df.items()}
+
+        self.weights = {}       # question_id -> {feature: weight / total weight}
+        for q, doc in docs.items():
+            echoed = features(q)
+            weights = {f: idf[f] * (QUESTION_TERM_WEIGHT if f in echoed else 1.0) for f in doc}
+            total = sum(weights.values()) or 1.0
+            self.weights[question_id(q)] = {f: w / total for f, w in weights.items()}
+
+    def coverage(self, questions: list) -> list:
+        """
+        Reference coverage (0-1) of each {question, answer} dict's answer, or
+        None for questions without reference key points.
+        """
+        result = []
+        for q in questions:
+            weights = self.weights.get(q.get('id') or question_id(q.get('question', '')))
+            if weights is None:
+                result.append(None)
+                continue
+            result.append(sum(weights.get(f, 0.0) for f in features(q.get('answer', ''))))
+        return result
+
+    def technical_scores(self, questions: list) -> list:
+        """0-100 technical score per question (None where there is no reference)."""
+        return [None if c is None else min(100.0, 100.0 * c / FULL_MARKS_COVERAGE)
+                for c in self.coverage(questions)]
+
+
+_scorer = None
+_scored_bank = None     # the CompiledBank _scorer was built for
+_lock = threading.Lock()
+
+
+def _references(bank) -> dict:
+    """Question text -> key points for the bank's technical questions that have references."""
+    points = bank_references()
+    return {q: points[qid] for questions in bank.technical.values() for q in questions
+            for qid in (question_id(q),) if qid in points}
+
+
+def get_scorer() -> ReferenceScorer:
+    """Shared scorer over the bank references, rebuilt when the bank reloads (app.py builds it at startup)."""
+    global _scorer, _scored_bank
+    bank = current_bank()
+    if _scored_bank is not bank:
+        with _lock:
+            if _scored_bank is not bank:
+                try:
+                    _scorer = ReferenceScorer(_references(bank))
+                except (OSError, ValueError):
+                    if _scorer is None:
+                        raise
+                    # source unreadable or invalid: keep the last good scorer until the next reload
+                _scored_bank = bank
+    return _scorer
@@ -0,0 +1,80 @@
+"""
+result_pages.py
+Rendered result bodies of evaluated interviews, cached until they are
+re-evaluated or deleted.
+
+The scores and feedback of an evaluated interview only change when it is
+evaluated again, which bumps its 'evaluation' counter (see
+app._apply_evaluation). ResultPages keeps, per evaluated interview,
+(candidate id, evaluation), so /results/<id> can authorise the viewer,
+compute its ETag and answer a conditional request without loading the
+store. Rendered bodies are kept in a cache backend (utils/backends.py:
+an in-process LRU, or one shared by workers and nodes) keyed by interview,
+evaluation and viewer variant, so a re-evaluated interview simply stops
+matching its old bodies, which age out. Like the other store indexes the
+interview table is rebuilt when another process writes the store.
+"""
+import threading
+
+from utils.backends import MemoryCache
+
+
+def evaluation_of(iv: dict) -> int:
+    """Evaluation counter of an interview (0 for ones evaluated before it existed)."""
+    return iv.get('evaluation', 0)
+
+
+class ResultPages:
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else MemoryCache(512)
+        self._lock = threading.Lock()
+        self._interviews = {}       # interview_id -> (candidate_id, evaluation), evaluated ones only
+        self._admins = frozenset()
+        # Store version the index reflects; see app.save_data
+        self.synced_version = None
+
+    def build(self, data: dict, version=None):
+        users = data.get('users', {})
+        interviews = {}
+        for cid, cand in data.get('candidates', {}).items():
+            if cid not in users:
+                continue
+            for iv in cand.get('interviews', []):
+                if iv.get('result') in ('selected', 'rejected'):
+                    interviews[iv['id']] = (cid, evaluation_of(iv))
+        admins = frozenset(uid for uid, u in users.items() if u.get('role') == 'admin')
+        with self._lock:
+            self._interviews, self._admins = interviews, admins
+            self.synced_version = version
+
+    # ---------------------------------------------------------------- updates
+    def set_evaluated(self, candidate_id: str, iv: dict):
+        with self._lock:
+            self._interviews[iv['id']] = (candidate_id, evaluation_of(iv))
+
+    def remove_candidate(self, candidate_id: str):
+        with self._lock:
+            gone = {iid for iid, (cid, _) in self._interviews.items() if cid == candidate_id}
+            for iid in gone:
+                del self._interviews[iid]
+
+    # ---------------------------------------------------------------- lookups
+    def lookup(self, interview_id: str):
+        """(candidate_id, evaluation) of an evaluated interview, or None."""
+        return self._interviews.get(interview_id)
+
+    def is_admin(self, user_id: str) -> bool:
+        return user_id in self._admins
+
+    def body(self, key: tuple):
+        """Cached body for (interview_id, evaluation, variant), or None."""
+        return self.cache.get(_cache_key(key))
+
+    def store(self, key: tuple, html: str):
+        if self._interviews.get(key[0], (None, None))[1] != key[1]:
+            return      # re-evaluated while it was being rendered
+        self.cache.set(_cache_key(key), html)
+
+
+def _cache_key(key: tuple) -> str:
+    return 'result-page:' + ':'.join(str(part) for part in key)
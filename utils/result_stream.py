@@ -0,0 +1,114 @@
+"""
+result_stream.py
+In-process fan-out of evaluation progress to Server-Sent Event clients.
+
+The background evaluation of a submitted interview publishes one event per
+scored question and a final 'done' event. Any number of /results/<id>/stream
+requests can subscribe; each replays the events published so far and then
+waits for new ones, so a page opened (or reconnected) mid-evaluation still
+gets every question. Closed streams are kept for `linger` seconds for late
+subscribers, after which the stored interview is the source of truth.
+
+subscribe() blocks its thread; coroutines (asgi.py) instead watch() a
+stream for a wake-up callback and read new events with snapshot().
+"""
+import json
+import threading
+import time
+
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Events message."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class EvaluationStreams:
+    def __init__(self, linger: float = 60):
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._streams = {}      # key -> {'events': [(event, data)], 'closed_at': float | None, 'cond': Condition,
+                                #         'watchers': [callback]}
+
+    def open(self, key: str):
+        with self._lock:
+            now = time.monotonic()
+            for old in [k for k, s in self._streams.items()
+                        if s['closed_at'] is not None and now - s['closed_at'] > self.linger]:
+                del self._streams[old]
+            self._streams[key] = {'events': [], 'closed_at': None, 'cond': threading.Condition(self._lock),
+                                  'watchers': []}
+
+    def publish(self, key: str, event: str, data):
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                stream['events'].append((event, data))
+                self._notify(stream)
+
+    def close(self, key: str):
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                stream['closed_at'] = time.monotonic()
+                self._notify(stream)
+
+    @staticmethod
+    def _notify(stream):
+        stream['cond'].notify_all()
+        for callback in stream['watchers']:
+            callback()
+
+    def active(self, key: str) -> bool:
+        with self._lock:
+            return key in self._streams
+
+    def watch(self, key: str, callback) -> bool:
+        """
+        Call callback() whenever the stream gets an event or closes, until
+        unwatch(). It runs under the streams' lock: it should only schedule
+        a wake-up. False if the stream is unknown.
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                return False
+            stream['watchers'].append(callback)
+            return True
+
+    def unwatch(self, key: str, callback):
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None and callback in stream['watchers']:
+                stream['watchers'].remove(callback)
+
+    def snapshot(self, key: str, start: int = 0):
+        """(events from index `start` on, closed) without waiting, or None if the stream is unknown."""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                return None
+            return stream['events'][start:], stream['closed_at'] is not None
+
+    def subscribe(self, key: str, keepalive: float = 15):
+        """
+        Generator of (event, data) for the stream, from its first event until
+        it closes, yielding None every `keepalive` seconds without news.
+        Yields nothing if the stream is unknown.
+        """
+        sent = 0
+        while True:
+            with self._lock:
+                stream = self._streams.get(key)
+                if stream is None:
+                    return
+                if sent == len(stream['events']) and stream['closed_at'] is None:
+                    stream['cond'].wait(keepalive)
+                pending = stream['events'][sent:]
+                closed = stream['closed_at'] is not None
+            sent += len(pending)
+            if not pending and not closed:
+                yield None
+            for item in pending:
+                yield item
+            if closed:
+                return
@@ -4,11 +4,7 @@ Extracts text from PDF resumes and identifies skills.
 """
 import re
 
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+from utils.metrics import instrument
 
 
 # Comprehensive skills list
@@ -32,9 +28,13 @@ KNOWN_SKILLS = [
 ]
 
 
+@instrument('extract_text_from_pdf', size=lambda text, args, kwargs: len(text))
 def extract_text_from_pdf(filepath: str) -> str:
     """Extract all text from a PDF file."""
-    if not PYPDF2_AVAILABLE:
+    # Imported on first use so worker boot doesn't pay for PyPDF2
+    try:
+        import PyPDF2
+    except ImportError:
         return ""
     try:
         text = ""
@@ -49,6 +49,7 @@ def extract_text_from_pdf(filepath: str) -> str:
         return ""
 
 
+@instrument('extract_skills', size=lambda skills, args, kwargs: len(args[0] or '') if args else 0)
 def extract_skills(text: str) -> list:
     """Extract skills from resume text by matching against known skills list."""
     if not text:
@@ -0,0 +1,152 @@
+"""
+similarity.py
+Near-duplicate detection for interview questions (MinHash + LSH).
+
+Each question becomes a set of character shingles; a MinHash signature of
+that set is split into bands and every band is hashed into a bucket, so
+finding questions similar to a given one only touches the few questions that
+share a bucket with it. Candidates from the buckets are confirmed with the
+exact Jaccard similarity of their shingle sets against `threshold`.
+
+Questions are indexed the first time they are seen (as history or as a
+candidate). The index keeps at most `max_size` questions, evicting the
+least recently used, so its memory doesn't follow the size of the bank.
+"""
+import random
+import re
+import threading
+from collections import OrderedDict
+
+from utils.questions_bank import question_id
+
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+BANDS = 16          # 2 rows per band: pairs with Jaccard ~0.3+ almost always share a bucket
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 61) - 1
+
+_rng = random.Random(1234)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_NON_WORD = re.compile(r'[^a-z0-9+#=]+')
+# Question framing that paraphrases swap freely ("What is X?" vs "Explain X with an example.")
+_STOP_WORDS = frozenset("""
+a an the is are was were what which how why when do does did you your explain describe between
+difference with example examples of in on for to and or can could would should tell me about give
+""".split())
+
+
+def normalise(text: str) -> str:
+    words = _NON_WORD.sub(' ', text.lower()).split()
+    content = [w[:-1] if w.endswith('s') and len(w) > 3 else w for w in words if w not in _STOP_WORDS]
+    return ' '.join(content or words)
+
+
+def shingles(text: str) -> frozenset:
+    """Character shingles of the question's content words."""
+    text = f' {normalise(text)} '
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset([text])
+    return frozenset(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def minhash(shingle_set: frozenset) -> tuple:
+    hashes = [hash(s) & _MASK for s in shingle_set]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+class QuestionSimilarityIndex:
+    def __init__(self, threshold: float = 0.7, max_size: int = 20000):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._shingles = OrderedDict()  # question_id -> shingle set, least recently used first
+        self._signatures = {}   # question_id -> MinHash signature
+        self._buckets = {}      # (band, band hash) -> set of question_ids
+        self._rows = NUM_PERM // BANDS
+
+    def add(self, question: str) -> str:
+        """Index question (if new) and return its id."""
+        qid = question_id(question)
+        with self._lock:
+            if qid in self._shingles:
+                self._shingles.move_to_end(qid)
+                return qid
+        sh = shingles(question)
+        signature = minhash(sh)
+        with self._lock:
+            if qid in self._shingles:
+                return qid
+            self._shingles[qid] = sh
+            self._signatures[qid] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(qid)
+            while len(self._shingles) > self.max_size:
+                old, _ = self._shingles.popitem(last=False)
+                for key in self._band_keys(self._signatures.pop(old)):
+                    bucket = self._buckets[key]
+                    bucket.discard(old)
+                    if not bucket:
+                        del self._buckets[key]
+        return qid
+
+    def _band_keys(self, signature: tuple):
+        return [(band, hash(signature[band * self._rows:(band + 1) * self._rows])) for band in range(BANDS)]
+
+    def add_many(self, questions):
+        for q in questions:
+            self.add(q)
+
+    def similar_ids(self, question: str) -> set:
+        """Ids of indexed questions whose Jaccard similarity to question is >= threshold."""
+        qid = self.add(question)
+        with self._lock:
+            sh, signature = self._shingles.get(qid), self._signatures.get(qid)
+            if sh is None:      # evicted straight away by concurrent additions
+                sh = shingles(question)
+                signature = minhash(sh)
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            return {c for c in candidates
+                    if c == qid or jaccard(sh, self._shingles[c]) >= self.threshold}
+
+    def history_filter(self, history: list):
+        """
+        Return accept(question) -> bool that rejects near-duplicates of the
+        history questions and of anything it has already accepted.
+        """
+        seen = {self.add(q) for q in history}
+
+        def accept(question: str) -> bool:
+            similar = self.similar_ids(question)
+            if similar & seen:
+                return False
+            seen.add(question_id(question))
+            return True
+        return accept
+
+    def __len__(self):
+        return len(self._shingles)
+
+
+_index = None
+
+
+def configure(threshold: float, max_size: int = 20000):
+    """Create the shared index (call once at startup)."""
+    global _index
+    _index = QuestionSimilarityIndex(threshold, max_size)
+
+
+def history_filter(history: list):
+    """accept(question) for the shared index; accepts everything if it isn't configured."""
+    if _index is None:
+        return None
+    return _index.history_filter(history)
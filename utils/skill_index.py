@@ -0,0 +1,192 @@
+"""
+skill_index.py
+Inverted index from skill to candidates for admin search.
+
+Every candidate gets a dense slot number; each skill maps to a bitmap (a
+Python int, bit n = slot n) of the candidates that list it. Last scores are
+kept both per slot and as one bitmap per integer score, so a query like
+"java AND spring AND sql, scored >= 70" is a handful of big-int ANDs/ORs
+followed by decoding only the matching bits.
+"""
+import heapq
+import threading
+
+# Set-bit positions for every byte value, used to decode bitmaps quickly
+_BYTE_BITS = [tuple(i for i in range(8) if b >> i & 1) for b in range(256)]
+
+
+def iter_bits(bitmap: int):
+    """Yield the positions of the set bits of bitmap in ascending order."""
+    if not bitmap:
+        return
+    raw = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(raw):
+        if byte:
+            base = byte_index * 8
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+def last_score(candidate: dict):
+    """Overall score of the candidate's most recent evaluated interview, or None."""
+    for iv in reversed(candidate.get('interviews', [])):
+        if iv.get('result') in ('selected', 'rejected'):
+            return iv['scores']['overall']
+    return None
+
+
+class SkillIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+        # Store version (data file mtime) the index reflects; see app.save_data
+        self.synced_version = None
+
+    def _clear(self):
+        self._slots = {}          # candidate_id -> slot
+        self._ids = []            # slot -> candidate_id (None once freed)
+        self._free = []           # reusable slots
+        self._info = []           # slot -> (name, email, skills)
+        self._scores = []         # slot -> last score or None
+        self._skill_bitmaps = {}  # skill -> bitmap of slots
+        self._score_bitmaps = [0] * 101   # int(score) -> bitmap of slots
+        self._all = 0             # bitmap of live slots
+
+    # ---------------------------------------------------------------- updates
+    def build(self, data: dict, version=None):
+        with self._lock:
+            self._clear()
+            for cid, cand in data.get('candidates', {}).items():
+                user = data.get('users', {}).get(cid)
+                if not user:
+                    continue
+                self._upsert(cid, user, cand.get('skills', []), last_score(cand))
+            self.synced_version = version
+
+    def upsert(self, candidate_id: str, user: dict, skills: list, score=None):
+        with self._lock:
+            self._upsert(candidate_id, user, skills, score)
+
+    def _upsert(self, candidate_id, user, skills, score):
+        slot = self._slots.get(candidate_id)
+        if slot is None:
+            slot = self._free.pop() if self._free else len(self._ids)
+            if slot == len(self._ids):
+                self._ids.append(None)
+                self._info.append(None)
+                self._scores.append(None)
+            self._ids[slot] = candidate_id
+            self._slots[candidate_id] = slot
+            self._all |= 1 << slot
+        else:
+            self._unset_skills(slot)
+            self._unset_score(slot)
+        skills = tuple(dict.fromkeys(s.lower() for s in skills))
+        self._info[slot] = (user.get('name', ''), user.get('email', ''), skills)
+        bit = 1 << slot
+        for skill in skills:
+            self._skill_bitmaps[skill] = self._skill_bitmaps.get(skill, 0) | bit
+        self._set_score(slot, score)
+
+    def set_skills(self, candidate_id: str, skills: list):
+        with self._lock:
+            slot = self._slots.get(candidate_id)
+            if slot is None:
+                return
+            name, email, _ = self._info[slot]
+            self._upsert(candidate_id, {'name': name, 'email': email}, skills, self._scores[slot])
+
+    def set_score(self, candidate_id: str, score):
+        with self._lock:
+            slot = self._slots.get(candidate_id)
+            if slot is None:
+                return
+            self._unset_score(slot)
+            self._set_score(slot, score)
+
+    def remove(self, candidate_id: str):
+        with self._lock:
+            slot = self._slots.pop(candidate_id, None)
+            if slot is None:
+                return
+            self._unset_skills(slot)
+            self._unset_score(slot)
+            self._ids[slot] = None
+            self._info[slot] = None
+            self._all &= ~(1 << slot)
+            self._free.append(slot)
+
+    def _unset_skills(self, slot):
+        mask = ~(1 << slot)
+        for skill in self._info[slot][2] if self._info[slot] else ():
+            remaining = self._skill_bitmaps.get(skill, 0) & mask
+            if remaining:
+                self._skill_bitmaps[skill] = remaining
+            else:
+                self._skill_bitmaps.pop(skill, None)
+
+    def _set_score(self, slot, score):
+        self._scores[slot] = score
+        if score is not None:
+            bucket = max(0, min(100, int(score)))
+            self._score_bitmaps[bucket] |= 1 << slot
+
+    def _unset_score(self, slot):
+        score = self._scores[slot]
+        if score is not None:
+            bucket = max(0, min(100, int(score)))
+            self._score_bitmaps[bucket] &= ~(1 << slot)
+        self._scores[slot] = None
+
+    # ---------------------------------------------------------------- queries
+    def _match_slots(self, skills, min_score):
+        result = self._all
+        for skill in dict.fromkeys(s.strip().lower() for s in skills if s.strip()):
+            result &= self._skill_bitmaps.get(skill, 0)
+            if not result:
+                return []
+        if min_score is None:
+            return list(iter_bits(result))
+        scored = 0
+        for bucket in range(max(0, int(min_score)), 101):
+            scored |= self._score_bitmaps[bucket]
+        # Buckets are integer floors; drop e.g. 70.2 for min_score=70.5
+        scores = self._scores
+        return [slot for slot in iter_bits(result & scored) if scores[slot] >= min_score]
+
+    def candidate_ids(self, skills: list, min_score: float = None) -> set:
+        with self._lock:
+            return {self._ids[slot] for slot in self._match_slots(skills, min_score)}
+
+    def query(self, skills: list, min_score: float = None, limit: int = None) -> tuple:
+        """
+        Candidates having ALL of skills (case-insensitive) and, if given, a
+        last score >= min_score. Returns (total_matches, rows) with rows
+        sorted by last score, best first, truncated to limit.
+        """
+        with self._lock:
+            slots = self._match_slots(skills, min_score)
+            scores = self._scores
+
+            def rank(slot):
+                return -1 if scores[slot] is None else scores[slot]
+
+            if limit and limit < len(slots):
+                top = heapq.nlargest(limit, slots, key=rank)
+            else:
+                top = sorted(slots, key=rank, reverse=True)
+            rows = []
+            for slot in top:
+                name, email, cand_skills = self._info[slot]
+                rows.append({'id': self._ids[slot], 'name': name, 'email': email,
+                             'skills': list(cand_skills), 'last_score': scores[slot]})
+        return len(slots), rows
+
+    def info(self, candidate_id: str):
+        """(name, email, skills) of an indexed candidate, or None."""
+        with self._lock:
+            slot = self._slots.get(candidate_id)
+            return None if slot is None else self._info[slot]
+
+    def __len__(self):
+        return len(self._slots)
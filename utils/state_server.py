@@ -0,0 +1,216 @@
+"""
+state_server.py
+Stand-in state server for the remote backends (utils/backends.py), so
+several app nodes can share one store, lock table, job queue and cache.
+
+The protocol is a sequence of frames over one TCP connection per client
+thread: a JSON header line with the operation, its fields and the size of
+the payload, followed by that many payload bytes (the document, a job or a
+cached value). Each request frame gets one reply frame; a header with an
+'error' field is raised as BackendError by the client. Blocking operations
+(lock.acquire, queue.get) wait on the server for up to their timeout.
+
+State is held in memory, in the backends' in-process implementations: it
+is a stand-in for a real shared service, for local multi-node testing and
+benchmarks, and is lost when the server stops (--seed loads a data.json
+into the store at start).
+
+Usage:
+    python -m utils.state_server --port 7070 --seed data.json
+"""
+import argparse
+import json
+import socket
+import socketserver
+import threading
+
+from utils.backends import (BackendError, LockTimeout, MemoryCache, MemoryLocks, MemoryQueue, MemoryStore)
+
+
+def send_frame(f, header: dict, payload: bytes = b''):
+    f.write(json.dumps(dict(header, size=len(payload))).encode('utf-8') + b'\n' + payload)
+    f.flush()
+
+
+def read_frame(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    header = json.loads(line)
+    size = header.pop('size', 0)
+    payload = f.read(size) if size else b''
+    if len(payload) != size:
+        raise ConnectionError('connection closed mid-frame')
+    return header, payload
+
+
+# ------------------------------------------------------------------- server
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        state = self.server
+        while True:
+            try:
+                header, payload = read_frame(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            op = header.pop('op', None)
+            handler = state.OPS.get(op)
+            try:
+                if handler is None:
+                    raise BackendError(f'unknown operation: {op}')
+                reply, body = handler(state, payload, **header)
+            except Exception as e:
+                reply, body = {'error': f'{type(e).__name__}: {e}'}, b''
+            try:
+                send_frame(self.wfile, reply, body)
+            except OSError:
+                return
+
+
+class StateServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple, cache_items: int = 10000):
+        super().__init__(address, _Handler)
+        self.store = MemoryStore()
+        self.locks = MemoryLocks()
+        self.jobs = MemoryQueue()
+        self.cache = MemoryCache(cache_items)
+
+    def _store_read(self, payload, known=None):
+        version, text = self.store.read()
+        if version is not None and version == known:
+            return {'version': version, 'unchanged': True}, b''
+        return {'version': version, 'unchanged': False}, (text or '').encode('utf-8')
+
+    def _store_version(self, payload):
+        return {'version': self.store.version()}, b''
+
+    def _store_write(self, payload):
+        previous, version = self.store.write(payload.decode('utf-8'))
+        return {'previous': previous, 'version': version}, b''
+
+    def _lock_acquire(self, payload, name, timeout, lease):
+        try:
+            return {'token': self.locks.acquire(name, timeout, lease)}, b''
+        except LockTimeout:
+            return {'token': None}, b''
+
+    def _lock_release(self, payload, name, token):
+        self.locks.release(name, token)
+        return {}, b''
+
+    def _queue_put(self, payload, name):
+        self.jobs.put(name, payload)
+        return {}, b''
+
+    def _queue_get(self, payload, name, timeout):
+        job = self.jobs.get(name, timeout)
+        return {'found': job is not None}, job or b''
+
+    def _cache_get(self, payload, key):
+        value = self.cache.get(key)
+        return {'found': value is not None}, value or b''
+
+    def _cache_set(self, payload, key, ttl=None):
+        self.cache.set(key, payload, ttl)
+        return {}, b''
+
+    def _cache_delete(self, payload, key):
+        self.cache.delete(key)
+        return {}, b''
+
+    OPS = {
+        'ping': lambda self, payload: ({}, b''),
+        'store.read': _store_read,
+        'store.version': _store_version,
+        'store.write': _store_write,
+        'lock.acquire': _lock_acquire,
+        'lock.release': _lock_release,
+        'queue.put': _queue_put,
+        'queue.get': _queue_get,
+        'cache.get': _cache_get,
+        'cache.set': _cache_set,
+        'cache.delete': _cache_delete,
+    }
+
+
+def serve_in_thread(host: str = '127.0.0.1', port: int = 0) -> StateServer:
+    """Start a server on a background thread; port 0 picks a free one (see server.server_address)."""
+    server = StateServer((host, port))
+    threading.Thread(target=server.serve_forever, name='state-server', daemon=True).start()
+    return server
+
+
+# ------------------------------------------------------------------- client
+class StateClient:
+    def __init__(self, address: str, timeout: float = 10):
+        host, _, port = address.rpartition(':')
+        self.address = (host or '127.0.0.1', int(port))
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile('rwb'))
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def call(self, op: str, payload: bytes = b'', wait: float = 0, **fields):
+        """
+        Send one request and return (reply header, reply payload). wait is
+        how long the server may block on it. A connection that went stale
+        while idle is reopened once.
+        """
+        reused = getattr(self._local, 'conn', None) is not None
+        while True:
+            sock, f = self._connection()
+            try:
+                sock.settimeout(self.timeout + wait)
+                send_frame(f, dict(fields, op=op), payload)
+                header, body = read_frame(f)
+                break
+            except (ConnectionError, OSError):
+                self._close()
+                if not reused:
+                    raise
+                reused = False
+        if 'error' in header:
+            raise BackendError(header['error'])
+        return header, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in state server for the remote backends.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7070)
+    parser.add_argument('--seed', help='data.json to load into the store at start')
+    args = parser.parse_args()
+
+    server = StateServer((args.host, args.port))
+    if args.seed:
+        with open(args.seed) as f:
+            server.store.write(f.read())
+    print(f'state server listening on {args.host}:{server.server_address[1]}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
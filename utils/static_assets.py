@@ -0,0 +1,141 @@
+"""
+static_assets.py
+Build-free asset pipeline: content-hashed static URLs, precompressed
+variants and year-long caching.
+
+At startup every file under the app's static folder is read once, hashed,
+and (for text types) gzip-compressed in memory, plus brotli when the
+optional `brotli` package is installed. url_for('static', filename=...) is
+rewritten to a fingerprinted name (css/style.1a2b3c4d5e.css). Requests for
+that name are answered from memory with the best encoding the client
+accepts and `Cache-Control: public, max-age=31536000, immutable`, so repeat
+visits don't request assets at all and an edited file simply gets a new
+name. A stale fingerprint (e.g. a page rendered before a deploy) still gets
+the current file, but without the long cache lifetime. Only the files found
+at startup are served from here; anything else falls through to Flask's
+normal static handler. In debug mode, those files are re-read when their
+mtime changes.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:     # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 512
+MAX_AGE = 365 * 24 * 3600
+_FINGERPRINTED = re.compile(r'^(.*)\.[0-9a-f]{10}(\.[^./]+)$')
+
+
+class _Asset:
+    __slots__ = ('url', 'digest', 'mtime', 'mimetype', 'bodies')
+
+    def __init__(self, url, digest, mtime, mimetype, bodies):
+        self.url, self.digest, self.mtime, self.mimetype, self.bodies = url, digest, mtime, mimetype, bodies
+
+
+class StaticAssets:
+    def __init__(self, app):
+        self.app = app
+        self.folder = app.static_folder
+        self._lock = threading.Lock()
+        self._assets = {}       # filename -> _Asset
+        self._by_url = {}       # fingerprinted filename -> filename
+        self._fallback = app.view_functions['static']
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                self._load(os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/'))
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self.serve
+
+    # ----------------------------------------------------------------- build
+    def _load(self, filename: str):
+        path = os.path.join(self.folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        bodies = {'identity': data}
+        if len(data) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE):
+            bodies['gzip'] = gzip.compress(data, 9, mtime=0)
+            if brotli is not None:
+                bodies['br'] = brotli.compress(data, quality=11)
+            bodies = {k: v for k, v in bodies.items() if k == 'identity' or len(v) < len(data)}
+        base, ext = os.path.splitext(filename)
+        asset = _Asset(f'{base}.{digest}{ext}', digest, mtime, mimetype, bodies)
+        with self._lock:
+            old = self._assets.get(filename)
+            if old is not None:
+                self._by_url.pop(old.url, None)
+            self._assets[filename] = asset
+            self._by_url[asset.url] = filename
+        return asset
+
+    def _get(self, filename: str):
+        # Never a name from the request alone: only files walked at startup
+        asset = self._assets.get(filename)
+        if asset is None:
+            return None
+        if self.app.debug:
+            path = safe_join(self.folder, filename)
+            if path is None:
+                return None
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+            if asset.mtime != mtime:
+                asset = self._load(filename)
+        return asset
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            asset = self._get(values['filename'])
+            if asset is not None:
+                values['filename'] = asset.url
+
+    # ----------------------------------------------------------------- serve
+    def serve(self, filename):
+        original = self._by_url.get(filename)
+        if original is None:
+            match = _FINGERPRINTED.match(filename)
+            original = match.group(1) + match.group(2) if match else None
+        asset = self._get(original) if original else None
+        if asset is None:
+            return self._fallback(filename=filename)
+
+        encoding = next((e for e in ('br', 'gzip') if e in asset.bodies and request.accept_encodings[e]),
+                        'identity')
+        etag = f'{asset.digest}.{encoding}'
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        if asset.url == filename:
+            response.headers['Cache-Control'] = f'public, max-age={MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'public, no-cache'
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: {'url': a.url, **{enc: len(body) for enc, body in a.bodies.items()}}
+                    for name, a in self._assets.items()}
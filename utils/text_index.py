@@ -0,0 +1,498 @@
+"""
+text_index.py
+On-disk BM25 full-text index over resumes and interview answers.
+
+Layout (one directory, SEARCH_INDEX_DIR):
+  manifest.json     live segments (oldest first) and per-segment tombstones
+  <seg>.terms       sorted term dictionary: uint32 term count n, uint32[n + 1]
+                    byte offsets of the terms in the trailing UTF-8 blob, and
+                    uint32[n * 2] (offset, count) into <seg>.post per term
+  <seg>.post        uint32 (docnum, term frequency) pairs, grouped by term
+  <seg>.docs.json   per docnum: [key, length, text_offset, text_length, meta]
+  <seg>.store       UTF-8 document texts, used for snippets
+
+Every update writes a small new segment and atomically swaps the manifest;
+a newer document with the same key tombstones the older one. Term
+dictionaries, postings and texts are memory-mapped, so workers share them
+through the page cache instead of each loading the index; a term is found by
+binary search over the dictionary. Only the per-document table (docs.json)
+is loaded by each worker. Segments are merged in the background once there
+are more than MERGE_AT of them.
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import threading
+from array import array
+from contextlib import contextmanager
+
+from markupsafe import Markup, escape
+
+try:
+    import fcntl
+except ImportError:   # Windows: fall back to in-process locking only
+    fcntl = None
+
+MERGE_AT = 8
+_BIG_ENDIAN = array('I', [1]).tobytes() != (1).to_bytes(4, 'little')
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#]*')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have i in is it its of on or that the this to was were will with'.split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _u32(data) -> array:
+    values = array('I')
+    values.frombytes(data)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _TermTable:
+    """Memory-mapped <seg>.terms: term -> (offset, count) by binary search."""
+
+    def __init__(self, path: str):
+        self._map = _map(path)
+        self._n = _u32(self._map[:4])[0] if self._map else 0
+        self._entries = 4 + (self._n + 1) * 4
+        self._blob = self._entries + self._n * 8
+
+    def _offset(self, i: int) -> int:
+        return int.from_bytes(self._map[4 + i * 4:8 + i * 4], 'little')
+
+    def get(self, term: str, default=None):
+        key, m = term.encode('utf-8'), self._map
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = m[self._blob + self._offset(mid):self._blob + self._offset(mid + 1)]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                entry = self._entries + mid * 8
+                return tuple(_u32(m[entry:entry + 8]))
+        return default
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+def _term_table(terms: list) -> bytes:
+    """[(term, offset, count)] sorted by UTF-8 term -> the <seg>.terms layout."""
+    offsets, entries, blob = array('I', [len(terms), 0]), array('I'), bytearray()
+    for term, offset, count in terms:
+        blob += term.encode('utf-8')
+        offsets.append(len(blob))
+        entries.append(offset)
+        entries.append(count)
+    if _BIG_ENDIAN:
+        offsets.byteswap()
+        entries.byteswap()
+    return offsets.tobytes() + entries.tobytes() + bytes(blob)
+
+
+class _Segment:
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        base = os.path.join(directory, name)
+        self.terms = _TermTable(base + '.terms')
+        with open(base + '.docs.json') as f:
+            self.docs = json.load(f)
+        self._post = _map(base + '.post')
+        self._store = _map(base + '.store')
+
+    def postings(self, term: str):
+        entry = self.terms.get(term)
+        if not entry:
+            return ()
+        offset, count = entry
+        pairs = _u32(self._post[offset * 8:(offset + count) * 8])
+        return zip(pairs[0::2], pairs[1::2])
+
+    def text(self, docnum: int) -> str:
+        _, _, offset, length, _ = self.docs[docnum]
+        return bytes(self._store[offset:offset + length]).decode('utf-8')
+
+    def close(self):
+        self.terms.close()
+        for m in (self._post, self._store):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+
+def _write_segment(directory: str, name: str, documents: list):
+    """documents: [(key, text, meta)] -> segment files (renamed into place last)."""
+    postings = {}
+    docs = []
+    store = bytearray()
+    for docnum, (key, text, meta) in enumerate(documents):
+        tokens = tokenize(text)
+        counts = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for t, tf in counts.items():
+            postings.setdefault(t, []).append((docnum, tf))
+        raw = text.encode('utf-8')
+        docs.append([key, len(tokens), len(store), len(raw), meta])
+        store += raw
+
+    terms = []
+    post = array('I')
+    for term in sorted(postings, key=lambda t: t.encode('utf-8')):
+        terms.append((term, len(post) // 2, len(postings[term])))
+        for docnum, tf in postings[term]:
+            post.append(docnum)
+            post.append(tf)
+    if _BIG_ENDIAN:
+        post.byteswap()
+
+    base = os.path.join(directory, name)
+    for suffix, payload in (('.post', post.tobytes()), ('.store', bytes(store)),
+                            ('.terms', _term_table(terms)),
+                            ('.docs.json', json.dumps(docs).encode())):
+        with open(base + suffix + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(base + suffix + '.tmp', base + suffix)
+
+
+class TextIndex:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_path = os.path.join(directory, 'manifest.json')
+        self._lock = threading.RLock()
+        self._merging = threading.Lock()
+        self._segments = {}        # name -> _Segment
+        self._order = []           # segment names, oldest first
+        self._tombstones = {}      # name -> set(docnum)
+        self._live = {}            # key -> (segment, docnum)
+        self._manifest_mtime = None
+        self._total_length = 0
+
+    # -------------------------------------------------------------- manifest
+    @contextmanager
+    def _manifest_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, 'LOCK'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _merge_lock(self):
+        """Non-blocking, cross-process: yields False if another merge is running."""
+        if not self._merging.acquire(blocking=False):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            with open(os.path.join(self.directory, 'MERGE_LOCK'), 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._merging.release()
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'segments': [], 'next_id': 1, 'tombstones': {}}
+
+    def _write_manifest(self, manifest: dict):
+        tmp = self._manifest_path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    def refresh(self):
+        """Pick up segments and tombstones written by this or other processes."""
+        try:
+            mtime = os.stat(self._manifest_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return
+            manifest = self._read_manifest()
+            segments = manifest['segments']
+            tombstones = {k: set(v) for k, v in manifest.get('tombstones', {}).items()}
+            if segments[:len(self._order)] == self._order:
+                # Common case: segments were appended and/or documents deleted
+                for name in self._order:
+                    for docnum in tombstones.get(name, set()) - self._tombstones.get(name, set()):
+                        self._drop_live(name, docnum)
+                new_segments = segments[len(self._order):]
+            else:
+                # A merge replaced segments: reload everything
+                for seg in self._segments.values():
+                    seg.close()
+                self._segments, self._live, self._total_length = {}, {}, 0
+                new_segments = segments
+            self._tombstones = tombstones
+            for name in new_segments:
+                seg = self._segments[name] = _Segment(self.directory, name)
+                dead = tombstones.get(name, ())
+                for docnum, doc in enumerate(seg.docs):
+                    if docnum not in dead:
+                        previous = self._live.get(doc[0])
+                        if previous:
+                            self._drop_live(*previous)
+                        self._live[doc[0]] = (name, docnum)
+                        self._total_length += doc[1]
+            self._order = list(segments)
+            self._manifest_mtime = mtime
+
+    def _drop_live(self, name, docnum):
+        doc = self._segments[name].docs[docnum]
+        if self._live.get(doc[0]) == (name, docnum):
+            del self._live[doc[0]]
+            self._total_length -= doc[1]
+
+    def __len__(self):
+        self.refresh()
+        return len(self._live)
+
+    # -------------------------------------------------------------- updates
+    def add(self, documents: list):
+        """Index [(key, text, meta)]; replaces earlier documents with the same keys."""
+        if not documents:
+            return
+        # Last write wins within the batch too
+        documents = list({key: (key, text, meta) for key, text, meta in documents}.values())
+        with self._manifest_lock():
+            self.refresh()
+            manifest = self._read_manifest()
+            name = f"seg-{manifest['next_id']:08d}"
+            manifest['next_id'] += 1
+            _write_segment(self.directory, name, documents)
+            self._tombstone(manifest, [key for key, _, _ in documents])
+            manifest['segments'].append(name)
+            self._write_manifest(manifest)
+            self.refresh()
+            should_merge = len(manifest['segments']) > MERGE_AT
+        if should_merge:
+            self.merge_in_background()
+
+    def delete(self, keys: list):
+        with self._manifest_lock():
+            self.refresh()
+            manifest = self._read_manifest()
+            if self._tombstone(manifest, keys):
+                self._write_manifest(manifest)
+                self.refresh()
+
+    def delete_where(self, **meta):
+        """Delete every live document whose meta contains all the given items."""
+        self.refresh()
+        with self._lock:
+            keys = [key for key, (name, docnum) in self._live.items()
+                    if all(self._segments[name].docs[docnum][4].get(k) == v for k, v in meta.items())]
+        self.delete(keys)
+
+    def _tombstone(self, manifest, keys) -> bool:
+        changed = False
+        for key in keys:
+            live = self._live.get(key)
+            if live:
+                manifest.setdefault('tombstones', {}).setdefault(live[0], []).append(live[1])
+                changed = True
+        return changed
+
+    # -------------------------------------------------------------- merging
+    def merge_in_background(self):
+        if self._merging.locked():
+            return
+        threading.Thread(target=self.merge, name='text-index-merge', daemon=True).start()
+
+    def merge(self):
+        """Rewrite all current segments into one, dropping deleted documents."""
+        with self._merge_lock() as acquired:
+            if acquired:
+                self._merge()
+
+    def _merge(self):
+        with self._manifest_lock():
+            self.refresh()
+            snapshot = self._read_manifest()
+            merged = list(snapshot['segments'])
+            if len(merged) < 2:
+                return
+            name = f"seg-{snapshot['next_id']:08d}"
+            snapshot['next_id'] += 1
+            self._write_manifest(snapshot)   # reserve the merged segment's name
+            segments = {n: self._segments[n] for n in merged}
+            dead = {n: set(snapshot.get('tombstones', {}).get(n, ())) for n in merged}
+
+        # The slow part runs without the lock; new segments may be added meanwhile
+        documents, new_docnum = [], {}
+        for seg_name in merged:
+            for docnum, doc in enumerate(segments[seg_name].docs):
+                if docnum not in dead[seg_name]:
+                    new_docnum[(seg_name, docnum)] = len(documents)
+                    documents.append((doc[0], segments[seg_name].text(docnum), doc[4]))
+        _write_segment(self.directory, name, documents)
+
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            tombstones = manifest.get('tombstones', {})
+            carried = []
+            for seg_name in merged:
+                for docnum in tombstones.pop(seg_name, ()):
+                    if docnum not in dead[seg_name]:   # deleted while we were merging
+                        carried.append(new_docnum[(seg_name, docnum)])
+            if carried:
+                tombstones[name] = carried
+            manifest['tombstones'] = tombstones
+            manifest['segments'] = [name] + [s for s in manifest['segments'] if s not in merged]
+            self._write_manifest(manifest)
+            self.refresh()
+            for seg_name in merged:
+                for suffix in ('.terms', '.docs.json', '.post', '.store'):
+                    try:
+                        os.remove(os.path.join(self.directory, seg_name + suffix))
+                    except OSError:
+                        pass
+
+    # -------------------------------------------------------------- search
+    def search(self, query: str, limit: int = 20) -> list:
+        """BM25-ranked [{key, score, meta, snippet}] for a free-text query."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        self.refresh()
+        with self._lock:
+            n_docs = len(self._live)
+            if not terms or not n_docs:
+                return []
+            avgdl = self._total_length / n_docs or 1.0
+            scores = {}
+            for term in terms:
+                df = sum(seg.terms.get(term, (0, 0))[1] for seg in self._segments.values())
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for name in self._order:
+                    seg = self._segments[name]
+                    dead = self._tombstones.get(name, ())
+                    docs = seg.docs
+                    for docnum, tf in seg.postings(term):
+                        if docnum in dead:
+                            continue
+                        length = docs[docnum][1]
+                        s = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avgdl))
+                        scores[(name, docnum)] = scores.get((name, docnum), 0.0) + s
+            top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+            results = []
+            for (name, docnum), score in top:
+                seg = self._segments[name]
+                key, _, _, _, meta = seg.docs[docnum]
+                results.append({'key': key, 'score': round(score, 4), 'meta': meta,
+                                'snippet': snippet(seg.text(docnum), terms)})
+        return results
+
+
+def snippet(text: str, terms: list, width: int = 220) -> Markup:
+    """HTML-escaped window of text around the densest run of query terms, terms in <mark>."""
+    lowered = text.lower()
+    hits = sorted(m.start() for t in terms for m in re.finditer(r'\b' + re.escape(t), lowered))
+    start = 0
+    if hits:
+        # Two pointers: hits[i:j] are the hits within `width` of hits[i]
+        best, most, j = 0, 0, 0
+        for i, h in enumerate(hits):
+            while j < len(hits) and hits[j] - h < width:
+                j += 1
+            if j - i > most:
+                best, most = i, j - i
+        start = max(0, hits[best] - width // 4)
+    window = text[start:start + width]
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in terms) + r')\w*', re.I) if terms else None
+    out, last = [], 0
+    for m in (pattern.finditer(window) if pattern else ()):
+        out.append(escape(window[last:m.start()]))
+        out.append(Markup('<mark>') + escape(m.group(0)) + Markup('</mark>'))
+        last = m.end()
+    out.append(escape(window[last:]))
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return Markup(prefix) + Markup('').join(out) + Markup(suffix)
+
+
+def documents_from_store(data: dict) -> list:
+    """Every indexable document in a data.json store."""
+    documents = []
+    for cid, cand in data.get('candidates', {}).items():
+        documents.extend(candidate_documents(cid, cand))
+    return documents
+
+
+def candidate_documents(candidate_id: str, candidate: dict) -> list:
+    documents = []
+    if candidate.get('resume_text'):
+        documents.append(resume_document(candidate_id, candidate['resume_text']))
+    for iv in candidate.get('interviews', []):
+        if iv.get('result') in ('selected', 'rejected'):
+            documents.extend(answer_documents(candidate_id, iv))
+    return documents
+
+
+def resume_document(candidate_id: str, text: str) -> tuple:
+    return (f'resume:{candidate_id}', text, {'candidate_id': candidate_id, 'field': 'resume'})
+
+
+def answer_documents(candidate_id: str, iv: dict) -> list:
+    return [
+        (f"answer:{iv['id']}:{i}", q['answer'],
+         {'candidate_id': candidate_id, 'field': 'answer', 'interview_id': iv['id'],
+          'q_index': i, 'question': q['question']})
+        for i, q in enumerate(iv.get('questions', []))
+        if q.get('answer', '').strip()
+    ]
+
+
+if __name__ == '__main__':
+    # Rebuild the index from a store: python -m utils.text_index [data.json] [index_dir]
+    import shutil
+    import sys
+    data_file = sys.argv[1] if len(sys.argv) > 1 else 'data.json'
+    directory = sys.argv[2] if len(sys.argv) > 2 else 'search_index'
+    with open(data_file) as f:
+        store = json.load(f)
+    shutil.rmtree(directory, ignore_errors=True)
+    index = TextIndex(directory)
+    index.add(documents_from_store(store))
+    print(f'Indexed {len(index)} documents into {directory}')
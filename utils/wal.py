@@ -0,0 +1,444 @@
+"""
+wal.py
+Write-ahead-logged store: the data.json document kept as periodic snapshots
+plus an append-only log of what each save changed, with incremental
+backups, point-in-time restore and log compaction.
+
+Each save is diffed against the current document and appended as one
+JSON line to the active log segment (fsynced before the save returns):
+
+    {"lsn": 42, "time": 1760870000.1, "label": "save_answer",
+     "ops": [["set", ["candidates", "<id>", "interviews", 0, "questions", 2, "answer"], "..."]]}
+
+ops are "set" path value, "del" path and "add" path items (list append),
+paths being lists of keys and list indexes. An autosave therefore writes
+a few hundred bytes instead of the whole document. Every snapshot_every
+records the document is written out as snapshot-<lsn>.json and a new
+segment, segment-<first lsn>.log, is started; snapshots and segments
+older than the newest `keep` snapshots are then deleted (compaction). On
+start the newest snapshot is loaded and only the records after it are
+replayed, so recovery time is bounded by the snapshot interval, not the
+size of the data. A torn last line from a crash mid-append is dropped.
+
+Backups copy into another directory what it doesn't have yet: new
+snapshots, new segments and the tail of the active one. Restoring replays
+a backup (or the live directory) up to a time or lsn. A backup keeps every
+record it copied, so the restore window is that of the backup schedule;
+backing up at least once per snapshot interval keeps every record.
+
+The log belongs to one process (it is locked while open); use the sqlite
+or remote store to share state between workers.
+
+Usage:
+    python -m utils.wal status wal
+    python -m utils.wal backup wal backups/wal
+    python -m utils.wal log backups/wal --since 2026-10-19T09:00
+    python -m utils.wal restore backups/wal --until 2026-10-19T10:30 --out data.json
+    python -m utils.wal compact backups/wal --keep 7
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows: no advisory lock, one process is up to the deployment
+    fcntl = None
+
+from utils.backends import BackendError
+
+_SNAPSHOT = 'snapshot-{:012d}.json'
+_SEGMENT = 'segment-{:012d}.log'
+
+
+# --------------------------------------------------------------------- diffs
+def diff(old, new, path=()):
+    """Yield the ops that turn `old` into `new`."""
+    if old is new:
+        return
+    if type(old) is dict and type(new) is dict:
+        for key, value in new.items():
+            if key not in old:
+                yield ['set', list(path) + [key], value]
+            elif old[key] is not value and old[key] != value:
+                yield from diff(old[key], value, path + (key,))
+        for key in old:
+            if key not in new:
+                yield ['del', list(path) + [key]]
+    elif type(old) is list and type(new) is list and len(old) <= len(new):
+        for i, value in enumerate(old):
+            if value != new[i]:
+                yield from diff(value, new[i], path + (i,))
+        if len(new) > len(old):
+            yield ['add', list(path), new[len(old):]]
+    elif old != new:
+        yield ['set', list(path), new]
+
+
+def apply(doc, ops):
+    """Apply ops to doc in place; returns the document (a new one if the root was set)."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            doc = op[2]
+            continue
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        if kind == 'set':
+            parent[path[-1]] = op[2]
+        elif kind == 'del':
+            del parent[path[-1]]
+        elif kind == 'add':
+            parent[path[-1]].extend(op[2])
+    return doc
+
+
+# ----------------------------------------------------------------- directory
+def _numbered(directory: str, prefix: str, suffix: str) -> list:
+    """[(number, path)] of prefix-<n>suffix files, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        if name.startswith(prefix) and name.endswith(suffix):
+            try:
+                found.append((int(name[len(prefix):-len(suffix)]), os.path.join(directory, name)))
+            except ValueError:
+                pass
+    return sorted(found)
+
+
+def snapshots(directory: str) -> list:
+    return _numbered(directory, 'snapshot-', '.json')
+
+
+def segments(directory: str) -> list:
+    return _numbered(directory, 'segment-', '.log')
+
+
+def read_snapshot(path: str):
+    """(header {'lsn', 'time'}, document) of a snapshot file."""
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        return header, json.loads(f.read())
+
+
+def _segment_records(path: str):
+    """Yield (record, end offset) of a segment's complete records."""
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                return      # torn by a crash mid-append
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield record, offset
+
+
+def records(directory: str, after: int = 0):
+    """Yield every complete record with lsn > after, in order."""
+    found = segments(directory)
+    for i, (first, path) in enumerate(found):
+        if i + 1 < len(found) and found[i + 1][0] <= after + 1:
+            continue    # wholly at or before `after`
+        for record, _ in _segment_records(path):
+            if record['lsn'] > after:
+                yield record
+
+
+def load(directory: str, until_lsn: int = None, until_time: float = None):
+    """
+    (document, lsn, time) of the directory's state after the last record at
+    or before until_lsn / until_time (the latest state by default): the
+    newest snapshot that early, plus the records after it.
+    """
+    base = None
+    for lsn, path in reversed(snapshots(directory)):
+        if until_lsn is not None and lsn > until_lsn:
+            continue
+        header, doc = read_snapshot(path)
+        if until_time is not None and header['time'] > until_time:
+            continue
+        base = (doc, header['lsn'], header['time'])
+        break
+    if base is None:
+        found = segments(directory)
+        if found and found[0][0] > 1:
+            raise ValueError('no snapshot that early: the log has been compacted past it')
+        base = (None, 0, 0.0)
+    doc, lsn, at = base
+    for record in records(directory, lsn):
+        if record['lsn'] != lsn + 1:
+            raise BackendError(f'log gap after lsn {lsn} in {directory}')
+        if (until_lsn is not None and record['lsn'] > until_lsn) or \
+                (until_time is not None and record['time'] > until_time):
+            break
+        doc = apply(doc, record['ops'])
+        lsn, at = record['lsn'], record['time']
+    return doc, lsn, at
+
+
+def _write_snapshot(directory: str, lsn: int, at: float, text: str):
+    # `at` is the time of record `lsn`: the snapshot is the state from then on
+    path = os.path.join(directory, _SNAPSHOT.format(lsn))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps({'lsn': lsn, 'time': at}) + '\n')
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def compact(directory: str, keep: int = 2) -> dict:
+    """Delete all but the newest `keep` snapshots and the segments only they needed."""
+    found = snapshots(directory)
+    if len(found) <= keep:
+        return {'snapshots': 0, 'segments': 0}
+    oldest_kept = found[-keep][0]
+    removed = {'snapshots': 0, 'segments': 0}
+    for _, path in found[:-keep]:
+        os.remove(path)
+        removed['snapshots'] += 1
+    segs = segments(directory)
+    for i, (first, path) in enumerate(segs):
+        # A segment is only needed if it holds records after the oldest kept snapshot
+        if i + 1 < len(segs) and segs[i + 1][0] <= oldest_kept + 1:
+            os.remove(path)
+            removed['segments'] += 1
+    return removed
+
+
+def backup(source: str, dest: str) -> dict:
+    """
+    Bring dest up to date with source, copying only what it lacks: new
+    snapshots and segments whole, and the new tail of segments it has a
+    prefix of (the active one). Safe while the store is being written.
+    """
+    os.makedirs(dest, exist_ok=True)
+    shipped = {'files': 0, 'bytes': 0}
+    have = {os.path.basename(p) for _, p in snapshots(dest)}
+    for _, path in snapshots(source):
+        name = os.path.basename(path)
+        if name not in have:
+            shutil.copyfile(path, os.path.join(dest, name + '.tmp'))
+            os.replace(os.path.join(dest, name + '.tmp'), os.path.join(dest, name))
+            shipped['files'] += 1
+            shipped['bytes'] += os.path.getsize(path)
+    for _, path in segments(source):
+        target = os.path.join(dest, os.path.basename(path))
+        copied = os.path.getsize(target) if os.path.exists(target) else 0
+        with open(path, 'rb') as src:
+            src.seek(copied)
+            tail = src.read()
+        end = tail.rfind(b'\n') + 1     # whole records only; the rest ships next time
+        if end:
+            with open(target, 'ab') as out:
+                out.write(tail[:end])
+                out.flush()
+                os.fsync(out.fileno())
+            shipped['files'] += 1
+            shipped['bytes'] += end
+    return shipped
+
+
+# --------------------------------------------------------------------- store
+class WALStore:
+    """
+    Store backend (see utils/backends.py). Versions are log sequence
+    numbers. The directory is opened, and recovered, on first use, so a
+    process that never serves requests (the debug reloader's parent)
+    doesn't take its lock.
+    """
+
+    def __init__(self, directory: str, seed: str = None, segment_bytes: int = 8 << 20,
+                 snapshot_every: int = 1000, keep: int = 2, fsync: bool = True):
+        self.directory = directory
+        self.seed = seed
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.keep = keep
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._opened = False
+        self._doc = None
+        self._text = None       # compact JSON of _doc, rendered on demand
+        self._lsn = 0
+        self._at = 0.0          # time of the last record
+        self._since_snapshot = 0
+        self._segment = None
+        self._lockfile = None
+
+    # ---- opening / recovery
+    def _open(self):
+        if self._opened:
+            return
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._lockfile = open(os.path.join(self.directory, 'LOCK'), 'a')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    raise BackendError(f'{self.directory} is open in another process; '
+                                       'the wal store is for one process (use sqlite or remote)') from None
+            self._recover()
+            self._opened = True
+
+    def _recover(self):
+        found = snapshots(self.directory)
+        if not found and not segments(self.directory) and self.seed and os.path.exists(self.seed):
+            # First start on an existing data.json: it becomes snapshot 0
+            with open(self.seed) as f:
+                text = f.read()
+            _write_snapshot(self.directory, 0, time.time(), json.dumps(json.loads(text)))
+        self._doc, self._lsn, self._at = load(self.directory)
+        base = snapshots(self.directory)
+        self._since_snapshot = self._lsn - (base[-1][0] if base else 0)
+        last = segments(self.directory)[-1:]
+        if last:
+            # Drop a torn tail, so new records follow the last complete one
+            first, path = last[0]
+            end = 0
+            for _, end in _segment_records(path):
+                pass
+            if os.path.getsize(path) != end:
+                with open(path, 'r+b') as f:
+                    f.truncate(end)
+        self._start_segment(last[0][0] if last else self._lsn + 1)
+
+    def _start_segment(self, first: int):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = open(os.path.join(self.directory, _SEGMENT.format(first)), 'ab')
+
+    # ---- store interface
+    def read(self):
+        self._open()
+        with self._lock:
+            if self._doc is None:
+                return None, None
+            if self._text is None:
+                self._text = json.dumps(self._doc)
+            return self._lsn, self._text
+
+    def version(self):
+        self._open()
+        return self._lsn or None
+
+    def write(self, text: str):
+        return self.write_data(json.loads(text))
+
+    def write_data(self, data, label: str = None):
+        """Log what changed between the current document and data; returns (previous lsn, new lsn)."""
+        self._open()
+        with self._lock:
+            before = self._lsn or None
+            ops = [['set', [], data]] if self._doc is None else list(diff(self._doc, data))
+            if not ops:
+                return before, before
+            record = {'lsn': self._lsn + 1, 'time': time.time(), 'label': label, 'ops': ops}
+            line = json.dumps(record, separators=(',', ':')) + '\n'
+            self._segment.write(line.encode('utf-8'))
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            # Applied from the logged line: the caller's objects are never shared with the store
+            self._doc = apply(self._doc, json.loads(line)['ops'])
+            self._text = None
+            self._lsn, self._at = record['lsn'], record['time']
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot()
+            elif self._segment.tell() >= self.segment_bytes:
+                self._start_segment(self._lsn + 1)
+            return before, self._lsn
+
+    def snapshot(self):
+        """Write the document out, start a new segment and compact."""
+        self._open()
+        with self._lock:
+            _write_snapshot(self.directory, self._lsn, self._at, json.dumps(self._doc))
+            self._since_snapshot = 0
+            self._start_segment(self._lsn + 1)
+            compact(self.directory, self.keep)
+
+    def size(self) -> int:
+        """Bytes on disk: the snapshots and log segments."""
+        return sum(os.path.getsize(p) for _, p in snapshots(self.directory) + segments(self.directory))
+
+
+# ----------------------------------------------------------------------- CLI
+def _when(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _stamp(at: float) -> str:
+    return datetime.datetime.fromtimestamp(at).isoformat(timespec='seconds')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up, inspect, restore and compact a wal store directory.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('status', help='snapshots, segments and the last record')
+    p.add_argument('directory')
+    p = sub.add_parser('backup', help='copy what the backup lacks (incremental)')
+    p.add_argument('directory')
+    p.add_argument('dest')
+    p = sub.add_parser('log', help='list records: lsn, time, label and changed paths')
+    p.add_argument('directory')
+    p.add_argument('--since', type=_when, help='ISO time or epoch seconds')
+    p = sub.add_parser('restore', help='replay to a point in time and write the document out')
+    p.add_argument('directory')
+    p.add_argument('--until', type=_when, help='ISO time or epoch seconds (default: latest)')
+    p.add_argument('--lsn', type=int, help='last record to apply')
+    p.add_argument('--out', required=True, help='data.json to write; seeds a new wal directory on first start')
+    p = sub.add_parser('compact', help='keep only the newest snapshots and the log they need')
+    p.add_argument('directory')
+    p.add_argument('--keep', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        snaps, segs = snapshots(args.directory), segments(args.directory)
+        last = None
+        for last in records(args.directory, snaps[-1][0] if snaps else 0):
+            pass
+        print(f'{len(snaps)} snapshot(s): {[n for n, _ in snaps]}')
+        print(f'{len(segs)} segment(s), {sum(os.path.getsize(p) for _, p in segs)} bytes')
+        if last:
+            print(f"last record: lsn {last['lsn']} at {_stamp(last['time'])} ({last.get('label')})")
+    elif args.command == 'backup':
+        shipped = backup(args.directory, args.dest)
+        print(f"shipped {shipped['files']} file(s), {shipped['bytes']} bytes")
+    elif args.command == 'log':
+        for record in records(args.directory):
+            if args.since is None or record['time'] >= args.since:
+                paths = ', '.join('/'.join(str(k) for k in op[1][:4]) for op in record['ops'])
+                print(f"{record['lsn']:>8}  {_stamp(record['time'])}  {record.get('label') or '-':<18} {paths}")
+    elif args.command == 'restore':
+        doc, lsn, at = load(args.directory, args.lsn, args.until)
+        with open(args.out, 'w') as f:
+            json.dump(doc if doc is not None else {'users': {}, 'candidates': {}}, f, indent=2)
+        print(f'restored lsn {lsn} ({_stamp(at) if at else "empty"}) to {args.out}')
+    elif args.command == 'compact':
+        removed = compact(args.directory, args.keep)
+        print(f"removed {removed['snapshots']} snapshot(s) and {removed['segments']} segment(s)")
+
+
+if __name__ == '__main__':
+    main()